@@ -1,10 +1,13 @@
 # Secure Password Generator for DEM-2 JIRA Requirement
 import argparse
 import logging
-import string
 import secrets
 import sys
 
+from password_output import stream_passwords
+from password_policy import compile_policy
+from secure_password_generator import iter_password_batches
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
@@ -23,15 +26,8 @@ def generate_password(length, use_upper=True, use_lower=True, use_digits=True, u
     - str: Generated password
     """
 
-    char_sets = []
-    if use_upper:
-        char_sets.append(string.ascii_uppercase)
-    if use_lower:
-        char_sets.append(string.ascii_lowercase)
-    if use_digits:
-        char_sets.append(string.digits)
-    if use_symbols:
-        char_sets.append(string.punctuation)
+    policy = compile_policy(use_upper, use_lower, use_digits, use_symbols)
+    char_sets = policy.classes
 
     if not char_sets:
         raise ValueError("At least one character type must be included.")
@@ -40,7 +36,7 @@ def generate_password(length, use_upper=True, use_lower=True, use_digits=True, u
     password = [secrets.choice(char_set) for char_set in char_sets]
 
     # Fill the rest of the password length with random choices from all allowed chars
-    all_chars = ''.join(char_sets)
+    all_chars = policy.chars
     if length < len(password):
         raise ValueError(f"Password length must be at least {len(password)} (to include one of each type).")
 
@@ -73,11 +69,26 @@ def parse_args():
         "--no-symbols", action="store_true",
         help="Exclude symbols"
     )
+    parser.add_argument(
+        "--count", type=int, default=1,
+        help="Number of passwords to generate, one per line (default: 1)"
+    )
     return parser.parse_args()
 
 def main():
     args = parse_args()
     try:
+        if args.count < 1:
+            raise ValueError("Password count must be at least 1.")
+        if args.count > 1:
+            written = stream_passwords(iter_password_batches(
+                args.count,
+                args.length,
+                compile_policy(not args.no_upper, not args.no_lower,
+                               not args.no_digits, not args.no_symbols)
+            ))
+            logging.info("%d passwords generated successfully!", written)
+            return
         password = generate_password(
             length=args.length,
             use_upper=not args.no_upper,
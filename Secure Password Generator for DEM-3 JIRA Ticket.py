@@ -3,9 +3,12 @@
 import argparse
 import logging
 import secrets
-import string
 import sys
 
+from password_output import stream_passwords
+from password_policy import compile_policy
+from secure_password_generator import iter_password_batches
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -33,15 +36,8 @@ def generate_password(length, use_uppercase, use_lowercase, use_digits, use_symb
     logging.debug("Generating password with length=%d, uppercase=%s, lowercase=%s, digits=%s, symbols=%s",
                   length, use_uppercase, use_lowercase, use_digits, use_symbols)
 
-    charset = ''
-    if use_uppercase:
-        charset += string.ascii_uppercase
-    if use_lowercase:
-        charset += string.ascii_lowercase
-    if use_digits:
-        charset += string.digits
-    if use_symbols:
-        charset += string.punctuation
+    policy = compile_policy(use_uppercase, use_lowercase, use_digits, use_symbols)
+    charset = policy.chars
 
     if not charset:
         raise ValueError("At least one character type must be included.")
@@ -49,16 +45,8 @@ def generate_password(length, use_uppercase, use_lowercase, use_digits, use_symb
     if length <= 0:
         raise ValueError("Password length must be a positive integer.")
 
-    # To ensure at least one character from each selected set, gather individual pools
-    pools = []
-    if use_uppercase:
-        pools.append(string.ascii_uppercase)
-    if use_lowercase:
-        pools.append(string.ascii_lowercase)
-    if use_digits:
-        pools.append(string.digits)
-    if use_symbols:
-        pools.append(string.punctuation)
+    # To ensure at least one character from each selected set, use the individual pools
+    pools = policy.classes
 
     password_chars = [
         secrets.choice(pool) for pool in pools
@@ -100,6 +88,10 @@ def main():
         "--no-symbols", action="store_true",
         help="Exclude symbols from the password"
     )
+    parser.add_argument(
+        "--count", type=int, default=1,
+        help="Number of passwords to generate, one per line (default: 1)"
+    )
     parser.add_argument(
         "-v", "--verbose", action="store_true",
         help="Enable verbose logging"
@@ -111,6 +103,19 @@ def main():
         logging.getLogger().setLevel(logging.DEBUG)
 
     try:
+        if args.count < 1:
+            raise ValueError("Password count must be at least 1.")
+        if args.count > 1:
+            if args.length <= 0:
+                raise ValueError("Password length must be a positive integer.")
+            written = stream_passwords(iter_password_batches(
+                args.count,
+                args.length,
+                compile_policy(not args.no_uppercase, not args.no_lowercase,
+                               not args.no_digits, not args.no_symbols)
+            ))
+            logging.info("%d passwords generated successfully.", written)
+            return
         password = generate_password(
             length=args.length,
             use_uppercase=not args.no_uppercase,
@@ -2,9 +2,12 @@
 import argparse
 import sys
 import secrets
-import string
 import logging
 
+from password_output import stream_passwords
+from password_policy import compile_policy
+from secure_password_generator import iter_password_batches
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
@@ -18,21 +21,14 @@ def generate_password(length, use_upper, use_lower, use_digits, use_symbols):
     :param use_symbols: Include symbols
     :return: Password string
     """
-    char_sets = []
-    if use_upper:
-        char_sets.append(string.ascii_uppercase)
-    if use_lower:
-        char_sets.append(string.ascii_lowercase)
-    if use_digits:
-        char_sets.append(string.digits)
-    if use_symbols:
-        char_sets.append(string.punctuation)
-    
+    policy = compile_policy(use_upper, use_lower, use_digits, use_symbols)
+    char_sets = policy.classes
+
     if not char_sets:
         logging.error("At least one character type must be included (upper, lower, digits, symbols).")
         raise ValueError("No character types selected.")
 
-    all_chars = "".join(char_sets)
+    all_chars = policy.chars
 
     # Ensure at least one character from each selected set is present
     password = [secrets.choice(char_set) for char_set in char_sets]
@@ -62,6 +58,8 @@ def main():
                         help='Exclude digits')
     parser.add_argument('--no-symbols', action='store_true',
                         help='Exclude symbols')
+    parser.add_argument('--count', type=int, default=1,
+                        help='Number of passwords to generate (default: 1)')
 
     args = parser.parse_args()
 
@@ -72,6 +70,14 @@ def main():
     use_symbols = not args.no_symbols
 
     try:
+        if args.count < 1:
+            raise ValueError("Password count must be at least 1.")
+        if args.count > 1:
+            written = stream_passwords(iter_password_batches(
+                args.count, length,
+                compile_policy(use_upper, use_lower, use_digits, use_symbols)))
+            logging.info(f"Generated {written} passwords")
+            return
         password = generate_password(length, use_upper, use_lower, use_digits, use_symbols)
         logging.info(f"Generated password: {password}")
         print(password)
@@ -2,9 +2,12 @@
 import argparse
 import logging
 import secrets
-import string
 import sys
 
+from password_output import stream_passwords
+from password_policy import compile_policy
+from secure_password_generator import iter_password_batches
+
 def setup_logging():
     """Configure logging for the application."""
     logging.basicConfig(
@@ -35,15 +38,8 @@ def generate_password(length: int,
     Raises:
         ValueError: If no character sets are selected.
     """
-    char_pools = []
-    if use_upper:
-        char_pools.append(string.ascii_uppercase)
-    if use_lower:
-        char_pools.append(string.ascii_lowercase)
-    if use_digits:
-        char_pools.append(string.digits)
-    if use_symbols:
-        char_pools.append(string.punctuation)
+    policy = compile_policy(use_upper, use_lower, use_digits, use_symbols)
+    char_pools = policy.classes
 
     if not char_pools:
         raise ValueError("At least one character type must be included.")
@@ -51,7 +47,7 @@ def generate_password(length: int,
     # Ensure at least one character from each selected set
     mandatory_chars = [secrets.choice(pool) for pool in char_pools]
 
-    all_chars = ''.join(char_pools)
+    all_chars = policy.chars
 
     if length < len(mandatory_chars):
         raise ValueError(
@@ -96,6 +92,12 @@ def parse_args():
         action='store_true',
         help="Exclude symbols"
     )
+    parser.add_argument(
+        "--count",
+        type=int,
+        default=1,
+        help="Number of passwords to generate, one per line (default: 1)"
+    )
     return parser.parse_args()
 
 def main():
@@ -110,6 +112,16 @@ def main():
                  not args.no_symbols)
 
     try:
+        if args.count < 1:
+            raise ValueError("Password count must be at least 1.")
+        if args.count > 1:
+            stream_passwords(iter_password_batches(
+                args.count,
+                args.length,
+                compile_policy(not args.no_upper, not args.no_lower,
+                               not args.no_digits, not args.no_symbols)
+            ))
+            return
         password = generate_password(
             length=args.length,
             use_upper=not args.no_upper,
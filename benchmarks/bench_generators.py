@@ -0,0 +1,277 @@
+# bench_generators.py
+"""
+Benchmark every generate_password implementation in the repository.
+
+Each generator script is imported by file path (the DEM scripts have
+spaces in their names) and driven through a small adapter, so they are
+measured exactly as shipped. For every implementation and every cell of a
+length x character-class matrix the benchmark records:
+
+- throughput: passwords/s and chars/s over a timed run
+- latency: per-call p50/p90/p99/max in microseconds
+- peak memory: tracemalloc peak across a fixed number of calls
+- entropy: os.urandom bytes consumed per password
+
+The bulk (generate_passwords) and exact-sampler paths are included as
+extra rows for comparison. Results are written as JSON; pass --baseline
+with an earlier results file to print per-cell throughput ratios and flag
+regressions.
+
+Usage:
+    python benchmarks/bench_generators.py --output bench_results.json
+    python benchmarks/bench_generators.py --quick --baseline bench_results.json
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCRIPTS = {
+    'secure_password_generator': 'secure_password_generator.py',
+    'dem2_requirement': 'Secure Password Generator for DEM-2 JIRA Requirement.py',
+    'jira_dem2': 'Secure Password Generator for JIRA DEM-2.py',
+    'dem3_ticket': 'Secure Password Generator for DEM-3 JIRA Ticket.py',
+    'jira_dem3': 'Secure Password Generator for JIRA DEM-3.py',
+}
+
+LENGTHS = (8, 16, 32, 64)
+CLASS_SETS = {
+    'lower': (False, True, False, False),
+    'lower+digits': (False, True, True, False),
+    'alnum': (True, True, True, False),
+    'all': (True, True, True, True),
+}
+
+# Calls per measurement pass.
+DEFAULT_CALLS = 5000
+QUICK_CALLS = 500
+# Throughput drop (relative to baseline) reported as a regression.
+REGRESSION_THRESHOLD = 0.10
+
+
+def load_script(name, filename):
+    """Import a generator script by file path under a safe module name."""
+    spec = importlib.util.spec_from_file_location(f'bench_{name}', os.path.join(ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_adapters():
+    """
+    Return {name: make(length, flags) -> zero-arg callable producing one password}.
+
+    Importing the scripts runs their module-level logging.basicConfig; the
+    root level is raised afterwards so per-call logging.info calls are
+    filtered instead of written to the terminal.
+    """
+    modules = {name: load_script(name, filename) for name, filename in SCRIPTS.items()}
+    logging.getLogger().setLevel(logging.WARNING)
+
+    spg = modules['secure_password_generator']
+    from password_policy import compile_policy
+    from password_sampler import compile_sampler
+
+    def flags_positional(module):
+        def make(length, flags):
+            fn = module.generate_password
+            return lambda: fn(length, *flags)
+        return make
+
+    def spg_single(length, flags):
+        charsets = spg.build_charsets(*flags)
+        return lambda: spg.generate_password(length, charsets)
+
+    def spg_bulk(length, flags):
+        # One bulk call of 1000 amortized; the adapter hands out one per call.
+        policy = compile_policy(*flags)
+        pool = []
+
+        def next_password():
+            if not pool:
+                pool.extend(spg.generate_passwords(1000, length, policy))
+            return pool.pop()
+        return next_password
+
+    def exact(length, flags):
+        sampler = compile_sampler(length, compile_policy(*flags))
+        return sampler.sample
+
+    adapters = {
+        'secure_password_generator': spg_single,
+        'secure_password_generator.bulk': spg_bulk,
+        'password_sampler.exact': exact,
+    }
+    for name in ('dem2_requirement', 'jira_dem2', 'dem3_ticket', 'jira_dem3'):
+        adapters[name] = flags_positional(modules[name])
+    return adapters
+
+
+class UrandomCounter:
+    """Context manager counting bytes requested from os.urandom."""
+
+    def __init__(self):
+        self.bytes = 0
+
+    def __enter__(self):
+        self._os_urandom = os.urandom
+        self._random_urandom = random._urandom
+
+        def counting(n):
+            self.bytes += n
+            return self._os_urandom(n)
+        os.urandom = counting
+        random._urandom = counting
+        return self
+
+    def __exit__(self, *exc):
+        os.urandom = self._os_urandom
+        random._urandom = self._random_urandom
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def measure(fn, length, calls):
+    """Run every measurement pass for one generator callable."""
+    for _ in range(min(calls, 100)):
+        fn()
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    elapsed = time.perf_counter() - start
+
+    clock = time.perf_counter_ns
+    samples = []
+    for _ in range(calls):
+        t0 = clock()
+        fn()
+        samples.append(clock() - t0)
+    samples.sort()
+
+    tracemalloc.start()
+    for _ in range(calls):
+        fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    with UrandomCounter() as counter:
+        for _ in range(calls):
+            fn()
+
+    return {
+        'passwords_per_s': calls / elapsed,
+        'chars_per_s': calls * length / elapsed,
+        'latency_us': {
+            'p50': percentile(samples, 50) / 1000,
+            'p90': percentile(samples, 90) / 1000,
+            'p99': percentile(samples, 99) / 1000,
+            'max': samples[-1] / 1000,
+        },
+        'peak_memory_bytes': peak,
+        'urandom_bytes_per_password': counter.bytes / calls,
+    }
+
+
+def run(calls, lengths, class_sets, only=None):
+    adapters = build_adapters()
+    results = []
+    for name, make in adapters.items():
+        if only and name not in only:
+            continue
+        for length in lengths:
+            for set_name, flags in class_sets.items():
+                cell = measure(make(length, flags), length, calls)
+                cell.update(implementation=name, length=length, charset=set_name)
+                results.append(cell)
+                print(f"{name:34} len={length:<3} {set_name:13} "
+                      f"{cell['passwords_per_s']:>12,.0f} pw/s  "
+                      f"p99={cell['latency_us']['p99']:8.1f}us  "
+                      f"urandom={cell['urandom_bytes_per_password']:7.1f}B/pw",
+                      file=sys.stderr)
+    return results
+
+
+def compare(results, baseline_path, threshold=REGRESSION_THRESHOLD):
+    """Print throughput ratios against a baseline file; return regressed cells."""
+    with open(baseline_path) as fh:
+        baseline = json.load(fh)
+    previous = {
+        (r['implementation'], r['length'], r['charset']): r['passwords_per_s']
+        for r in baseline['results']
+    }
+    regressions = []
+    for r in results:
+        key = (r['implementation'], r['length'], r['charset'])
+        if key not in previous:
+            continue
+        ratio = r['passwords_per_s'] / previous[key]
+        flag = ''
+        if ratio < 1 - threshold:
+            regressions.append(key)
+            flag = '  REGRESSION'
+        print(f"{key[0]:34} len={key[1]:<3} {key[2]:13} x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark generate_password implementations')
+    parser.add_argument('-o', '--output', default='bench_results.json',
+                        help='JSON results file (default: bench_results.json)')
+    parser.add_argument('--calls', type=int, default=None,
+                        help=f'Calls per measurement pass (default: {DEFAULT_CALLS})')
+    parser.add_argument('--quick', action='store_true',
+                        help=f'Use {QUICK_CALLS} calls and lengths 8 and 16 only')
+    parser.add_argument('--only', action='append', default=None, metavar='NAME',
+                        help='Benchmark only this implementation (repeatable)')
+    parser.add_argument('--baseline', default=None,
+                        help='Earlier results file to compare throughput against')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    calls = args.calls or (QUICK_CALLS if args.quick else DEFAULT_CALLS)
+    lengths = LENGTHS[:2] if args.quick else LENGTHS
+    results = run(calls, lengths, CLASS_SETS, only=args.only)
+
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': numpy_version,
+        'calls': calls,
+        'results': results,
+    }
+    with open(args.output, 'w') as fh:
+        json.dump(report, fh, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}", file=sys.stderr)
+
+    if args.baseline and compare(results, args.baseline):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
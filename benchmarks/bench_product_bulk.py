@@ -0,0 +1,206 @@
+# bench_product_bulk.py
+"""
+Benchmark the bulk NDJSON endpoint of product_api against single requests.
+
+For each backend (product_store.MemoryStore and SQLiteStore on a temporary
+database file), through the Flask test client:
+
+- single: POST /products once per product, the import path before the
+  bulk endpoint (--single requests)
+- create, upsert, delete: POST /products/bulk with --rows lines each,
+  rows per second including parsing, store and index updates and the
+  streamed per-row results
+
+Then the transient memory of a bulk request: the request body is generated
+as it is read and the response consumed as it is streamed, and the
+tracemalloc peak above what the store and its indexes keep afterwards is
+reported for --rows and 10 x --rows lines. It should not grow with the
+number of lines.
+
+Usage:
+    python benchmarks/bench_product_bulk.py --rows 200000
+    python benchmarks/bench_product_bulk.py --rows 50000 --output bulk.json
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_ROWS = 100_000
+DEFAULT_SINGLE = 5_000
+CATEGORIES = ('books', 'garden', 'home', 'kitchen', 'music', 'outdoor', 'toys', 'tools')
+
+
+def create_line(i):
+    return json.dumps({'name': f'Product {i}', 'description': f'Description of product {i}',
+                       'price': float(i % 500), 'category': CATEGORIES[i % len(CATEGORIES)]})
+
+
+def upsert_line(i):
+    return json.dumps({'op': 'upsert', 'id': i + 1, 'price': float(i % 300)})
+
+
+def delete_line(i):
+    return json.dumps({'op': 'delete', 'id': i + 1})
+
+
+class LineSource(io.RawIOBase):
+    """
+    A request body of `rows` NDJSON lines, generated as it is read.
+
+    The test client measures the body by seeking to its end and back, so
+    the size is computed up front and those two seeks are answered without
+    moving.
+    """
+
+    def __init__(self, make_line, rows):
+        self._size = sum(len(make_line(i).encode()) + 1 for i in range(rows))
+        self._lines = (make_line(i).encode() + b'\n' for i in range(rows))
+        self._pending = b''
+        self._read = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._read
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_END and offset == 0:
+            return self._size
+        if whence == io.SEEK_SET and offset == self._read:
+            return offset
+        raise io.UnsupportedOperation("LineSource only reads forward.")
+
+    def readinto(self, buffer):
+        while len(self._pending) < len(buffer):
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._pending += line
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        self._read += n
+        return n
+
+
+def bulk(client, make_line, rows):
+    """POST rows lines to /products/bulk; returns the final summary line."""
+    response = client.post('/products/bulk', input_stream=LineSource(make_line, rows),
+                           content_type='application/x-ndjson', buffered=False)
+    last = b''
+    for chunk in response.response:
+        last = chunk
+    response.close()
+    return json.loads(last.splitlines()[-1])
+
+
+def rate(fn, rows):
+    t0 = time.perf_counter()
+    fn()
+    return rows / (time.perf_counter() - t0)
+
+
+def transient_peak(client, rows):
+    """Peak memory of a create + delete bulk run, above what remains after it."""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    bulk(client, create_line, rows)
+    bulk(client, lambda i: json.dumps({'op': 'delete', 'id': i + 1}), 2 * rows)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return max(peak - max(current, base), 0)
+
+
+def bench_store(store, args):
+    import product_api
+    from product_search import open_index
+
+    product_api.store = store
+    product_api.search_index = open_index(store)
+    client = product_api.app.test_client()
+
+    single = rate(lambda: [client.post('/products', data=create_line(i),
+                                       content_type='application/json')
+                           for i in range(args.single)], args.single)
+    bulk(client, delete_line, args.single)
+
+    results = {'single_per_s': single}
+    for name, make_line in (('create', create_line), ('upsert', upsert_line),
+                            ('delete', delete_line)):
+        # Ids continue after the single creates, which were deleted again.
+        if name != 'create':
+            first = args.single
+
+            def make_line(i, make=make_line):
+                return make(first + i)
+        summary = {}
+        results[name + '_per_s'] = rate(
+            lambda: summary.update(bulk(client, make_line, args.rows)), args.rows)
+        results[name + '_failed'] = summary['failed']
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark bulk NDJSON product imports')
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS,
+                        help=f'Lines per bulk request (default: {DEFAULT_ROWS})')
+    parser.add_argument('--single', type=int, default=DEFAULT_SINGLE,
+                        help=f'Single POST /products requests timed (default: {DEFAULT_SINGLE})')
+    parser.add_argument('-o', '--output', default=None, help='Write results as JSON to this file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    import product_api
+    from product_store import MemoryStore, SQLiteStore
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, make in (('memory', MemoryStore),
+                            ('sqlite', lambda: SQLiteStore(os.path.join(tmp, 'catalog.db')))):
+            store = make()
+            try:
+                results[label] = bench_store(store, args)
+            finally:
+                store.close()
+
+        memory = {}
+        for rows in (args.rows // 10, args.rows):
+            store = MemoryStore()
+            product_api.store = store
+            memory[rows] = transient_peak(product_api.app.test_client(), rows)
+
+    print(f"{'backend':<8} {'single/s':>10} {'create/s':>10} {'upsert/s':>10} {'delete/s':>10} "
+          f"{'speedup':>8}")
+    for label, row in results.items():
+        print(f"{label:<8} {row['single_per_s']:>10.0f} {row['create_per_s']:>10.0f} "
+              f"{row['upsert_per_s']:>10.0f} {row['delete_per_s']:>10.0f} "
+              f"{row['create_per_s'] / row['single_per_s']:>7.1f}x")
+    print()
+    for rows, peak in memory.items():
+        print(f"transient peak, {rows} lines: {peak / 1e6:.2f} MB")
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({'rows': args.rows, 'python': sys.version.split()[0],
+                       'results': results, 'transient_peak_bytes': memory}, fh, indent=2)
+        print(f"Wrote results to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
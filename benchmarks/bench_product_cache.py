@@ -0,0 +1,133 @@
+# bench_product_cache.py
+"""
+Benchmark cached product reads of product_api (product_cache.ResponseCache).
+
+A product_store.MemoryStore with --products synthetic products is served
+through the Flask test client, and --requests reads are timed for each of:
+
+- GET /products/<id> (random ids)
+- GET /products?limit=100&category=C (a page of a category)
+- GET /products?min_price=X&max_price=Y&sort=price (an unpaged price range)
+
+each in three modes: uncached (a cache of 0 bytes, so every read queries
+the store and serializes), cached (a warm cache), and revalidated (a warm
+cache and an If-None-Match with the current ETag, answered with 304).
+Then the cost of invalidation: reads interleaved with one price update
+per --write-every reads, through the store listener.
+
+Usage:
+    python benchmarks/bench_product_cache.py --products 200000
+    python benchmarks/bench_product_cache.py --requests 20000 --output cache.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_PRODUCTS = 100_000
+DEFAULT_REQUESTS = 10_000
+DEFAULT_WRITE_EVERY = 100
+CATEGORIES = ('books', 'garden', 'home', 'kitchen', 'music', 'outdoor', 'toys', 'tools')
+
+
+def make_urls(products, requests, rng):
+    """The URLs read per kind, drawn from a small hot set as a real catalog would be."""
+    return {
+        'product': [f'/products/{rng.randint(1, min(products, 1000))}' for _ in range(requests)],
+        'page': [f'/products?limit=100&category={rng.choice(CATEGORIES)}'
+                 for _ in range(requests)],
+        'range': [f'/products?min_price={p}&max_price={p + 1}&sort=price'
+                  for p in (rng.randint(0, 20) for _ in range(requests))],
+    }
+
+
+def timed_reads(client, urls, revalidate=False):
+    """Requests per second reading `urls`; with `revalidate`, send the last ETag."""
+    etags = {}
+    if revalidate:
+        for url in set(urls):
+            etags[url] = client.get(url).headers['ETag']
+    t0 = time.perf_counter()
+    for url in urls:
+        headers = {'If-None-Match': etags[url]} if revalidate else None
+        response = client.get(url, headers=headers)
+        response.close()
+    return len(urls) / (time.perf_counter() - t0)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark cached product reads')
+    parser.add_argument('--products', type=int, default=DEFAULT_PRODUCTS,
+                        help=f'Products in the catalog (default: {DEFAULT_PRODUCTS})')
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS,
+                        help=f'Reads timed per kind and mode (default: {DEFAULT_REQUESTS})')
+    parser.add_argument('--write-every', type=int, default=DEFAULT_WRITE_EVERY,
+                        help=f'Reads per update in the mixed run (default: {DEFAULT_WRITE_EVERY})')
+    parser.add_argument('-o', '--output', default=None, help='Write results as JSON to this file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    import product_api
+    from product_cache import open_cache
+    from product_store import MemoryStore
+
+    rng = random.Random(42)
+    store = MemoryStore()
+    store.create_many({'name': f'Product {i}', 'price': float(rng.randint(0, 2000)) / 10,
+                       'category': CATEGORIES[i % len(CATEGORIES)],
+                       'description': f'Description of product {i}'}
+                      for i in range(args.products))
+    product_api.store = store
+    client = product_api.app.test_client()
+    urls = make_urls(args.products, args.requests, rng)
+
+    results = {}
+    for kind, kind_urls in urls.items():
+        product_api.response_cache = open_cache(store, 0)
+        uncached = timed_reads(client, kind_urls)
+        product_api.response_cache = cache = open_cache(store)
+        timed_reads(client, kind_urls)
+        cached = timed_reads(client, kind_urls)
+        revalidated = timed_reads(client, kind_urls, revalidate=True)
+        results[kind] = {'uncached_per_s': uncached, 'cached_per_s': cached,
+                         'revalidated_per_s': revalidated, 'cache_bytes': cache.size}
+
+    # Mixed reads and writes: each update drops the entries it affects.
+    product_api.response_cache = cache = open_cache(store)
+    reads = [url for kind_urls in urls.values() for url in kind_urls]
+    rng.shuffle(reads)
+    t0 = time.perf_counter()
+    for i, url in enumerate(reads):
+        if i % args.write_every == 0:
+            store.update(rng.randint(1, args.products), {'price': float(rng.randint(0, 2000)) / 10})
+        client.get(url).close()
+    results['mixed'] = {'reads_per_s': len(reads) / (time.perf_counter() - t0),
+                        'entries': len(cache), 'cache_bytes': cache.size}
+
+    print(f"{'read':<8} {'uncached/s':>11} {'cached/s':>10} {'304/s':>10} {'speedup':>8}")
+    for kind in urls:
+        row = results[kind]
+        print(f"{kind:<8} {row['uncached_per_s']:>11.0f} {row['cached_per_s']:>10.0f} "
+              f"{row['revalidated_per_s']:>10.0f} "
+              f"{row['cached_per_s'] / row['uncached_per_s']:>7.1f}x")
+    print()
+    print(f"mixed, 1 update per {args.write_every} reads: "
+          f"{results['mixed']['reads_per_s']:.0f} reads/s")
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({'products': args.products, 'requests': args.requests,
+                       'python': sys.version.split()[0], 'results': results}, fh, indent=2)
+        print(f"Wrote results to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# bench_product_changes.py
+"""
+Benchmark syncing by change feed against re-downloading the catalog.
+
+A product_store.MemoryStore of --products products is served through the
+Flask test client. A consumer that last synced --changes changes ago
+catches up two ways, each timed over --runs runs:
+
+- full: GET /products, the whole listing, as pollers did before the feed
+- delta: GET /products/changes?since=N, following next_since while more
+
+with the response bytes of each. Also measured: store updates per second
+with and without the change log subscribed.
+
+Usage:
+    python benchmarks/bench_product_changes.py --products 200000
+    python benchmarks/bench_product_changes.py --changes 5000 --output changes.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_PRODUCTS = 100_000
+DEFAULT_CHANGES = 1000
+DEFAULT_RUNS = 5
+CATEGORIES = ('books', 'garden', 'home', 'kitchen', 'music', 'outdoor', 'toys', 'tools')
+
+
+def full_sync(client):
+    response = client.get('/products')
+    return len(response.data)
+
+
+def delta_sync(client, since, log_id):
+    size = 0
+    more = True
+    while more:
+        response = client.get(f'/products/changes?since={since}&log={log_id}')
+        size += len(response.data)
+        body = response.get_json()
+        since, more = body['next_since'], body['more']
+    return size
+
+
+def timed(fn, runs):
+    """(seconds per run, result of the last run)."""
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        result = fn()
+    return (time.perf_counter() - t0) / runs, result
+
+
+def update_rate(store, updates, rng):
+    t0 = time.perf_counter()
+    for _ in range(updates):
+        store.update(rng.randint(1, store.count()), {'price': round(rng.uniform(1, 500), 2)})
+    return updates / (time.perf_counter() - t0)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the product change feed')
+    parser.add_argument('--products', type=int, default=DEFAULT_PRODUCTS,
+                        help=f'Products in the catalog (default: {DEFAULT_PRODUCTS})')
+    parser.add_argument('--changes', type=int, default=DEFAULT_CHANGES,
+                        help=f'Changes the consumer is behind by (default: {DEFAULT_CHANGES})')
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS,
+                        help=f'Syncs timed per way (default: {DEFAULT_RUNS})')
+    parser.add_argument('-o', '--output', default=None, help='Write results as JSON to this file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    import product_api
+    from product_cache import open_cache
+    from product_changes import open_change_log
+    from product_store import MemoryStore
+
+    rng = random.Random(42)
+    store = MemoryStore()
+    store.create_many({'name': f'Product {i}', 'price': round(rng.uniform(1, 500), 2),
+                       'category': rng.choice(CATEGORIES)} for i in range(args.products))
+    bare = update_rate(store, args.changes, rng)
+    log = open_change_log(store, max(args.changes, 1))
+    since = log.last_seq
+    logged = update_rate(store, args.changes, rng)
+
+    product_api.store = store
+    product_api.change_log = log
+    # An uncached listing: pollers see a changed catalog every time.
+    product_api.response_cache = open_cache(store, 0)
+    client = product_api.app.test_client()
+    full_s, full_bytes = timed(lambda: full_sync(client), args.runs)
+    delta_s, delta_bytes = timed(lambda: delta_sync(client, since, log.log_id), args.runs)
+
+    results = {
+        'full': {'seconds': full_s, 'bytes': full_bytes},
+        'delta': {'seconds': delta_s, 'bytes': delta_bytes},
+        'updates_per_s': {'without_log': bare, 'with_log': logged},
+    }
+    print(f"{'sync':<6} {'ms':>10} {'bytes':>12}")
+    for way in ('full', 'delta'):
+        print(f"{way:<6} {results[way]['seconds'] * 1e3:>10.1f} {results[way]['bytes']:>12}")
+    print(f"\ndelta is {full_s / delta_s:.0f}x faster and {full_bytes / delta_bytes:.0f}x "
+          f"smaller for {args.changes} changes in {args.products} products")
+    print(f"updates/s {bare:.0f} without the log, {logged:.0f} with")
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({'products': args.products, 'changes': args.changes,
+                       'python': sys.version.split()[0], 'results': results}, fh, indent=2)
+        print(f"Wrote results to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+# bench_product_concurrency.py
+"""
+Stress test and benchmark of product_store.MemoryStore under threads.
+
+For each thread count in --threads, a fresh store (with a product_search
+index subscribed, as in product_api) is hammered by that many threads for
+--ops operations each: a mix of create, update, get and a filtered page,
+--write-ratio of them writes. Then measured:
+
+- throughput: operations per second, and the speedup over one thread.
+  Under the GIL the store's locks are not the limit; what this shows is
+  that they do not make it worse as threads are added (on a free-threaded
+  build the shards let it grow)
+
+and checked, failing the run when any check does:
+
+- unique ids: every create returned an id no other create returned
+- no torn reads: updates write name, description and price from one
+  number, and every product read must have all three agree
+- final state: count() matches the creates, the listing is in id order
+  without duplicates, the category index returns exactly the products of
+  each category, and the search index finds a sample of 200 products by
+  their current names
+
+Usage:
+    python benchmarks/bench_product_concurrency.py --threads 1 2 4 8
+    python benchmarks/bench_product_concurrency.py --ops 50000 --output concurrency.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_THREADS = (1, 2, 4, 8)
+DEFAULT_OPS = 20_000
+DEFAULT_WRITE_RATIO = 0.3
+DEFAULT_PRELOAD = 10_000
+CATEGORIES = ('books', 'garden', 'home', 'kitchen', 'music', 'outdoor', 'toys', 'tools')
+
+
+def fields(n):
+    """A product whose name, description and price all encode n."""
+    return {'name': f'item{n}', 'description': f'item{n}', 'price': float(n),
+            'category': CATEGORIES[n % len(CATEGORIES)]}
+
+
+def torn(prod):
+    """True when a product's fields do not come from one write."""
+    return not (prod['name'] == prod['description'] == f"item{int(prod['price'])}")
+
+
+def worker(store, args, seed, created, errors, start):
+    ops, write_ratio = args.ops, args.write_ratio
+    rng = random.Random(seed)
+    mine = []
+    start.wait()
+    for _ in range(ops):
+        r = rng.random()
+        if r < write_ratio / 2:
+            mine.append(store.create(fields(rng.randrange(1 << 30)))['id'])
+        elif r < write_ratio:
+            store.update(rng.randint(1, args.preload), fields(rng.randrange(1 << 30)))
+        elif r < 0.9:
+            prod = store.get(rng.randint(1, args.preload))
+            if prod is not None and torn(prod):
+                errors.append(f"torn read: {prod}")
+        else:
+            for prod in store.query(category=rng.choice(CATEGORIES), limit=20):
+                if torn(prod):
+                    errors.append(f"torn read: {prod}")
+    created.append(mine)
+
+
+def check_final(store, index, created, preload):
+    """The final-state checks; returns a list of failures."""
+    errors = []
+    ids = [pid for mine in created for pid in mine]
+    if len(set(ids)) != len(ids):
+        errors.append(f"{len(ids) - len(set(ids))} duplicate ids")
+    if store.count() != preload + len(ids):
+        errors.append(f"count {store.count()} != {preload + len(ids)}")
+    listed = [p['id'] for p in store.list()]
+    if listed != sorted(set(listed)) or len(listed) != store.count():
+        errors.append("listing out of order, duplicated or incomplete")
+    by_category = {}
+    for prod in store.list():
+        by_category.setdefault(prod['category'], set()).add(prod['id'])
+    for category, expected in by_category.items():
+        got = [p['id'] for p in store.query(category=category, limit=None)]
+        if set(got) != expected or len(got) != len(expected):
+            errors.append(f"category index wrong for {category}")
+    for prod in random.Random(0).sample(store.list(), 200):
+        if prod['id'] not in {pid for pid, _ in index.search(prod['name'] + ' ', 50)[1]}:
+            errors.append(f"search misses product {prod['id']}")
+    return errors
+
+
+def run(threads, args):
+    from product_search import open_index
+    from product_store import MemoryStore
+
+    store = MemoryStore()
+    store.create_many(fields(n) for n in range(args.preload))
+    index = open_index(store)
+    created, errors = [], []
+    start = threading.Barrier(threads + 1)
+    pool = [threading.Thread(target=worker, args=(store, args, seed, created, errors, start))
+            for seed in range(threads)]
+    for t in pool:
+        t.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    errors += check_final(store, index, created, args.preload)
+    return {'ops_per_s': threads * args.ops / elapsed, 'errors': errors[:10],
+            'error_count': len(errors)}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Stress test the in-memory product store')
+    parser.add_argument('--threads', type=int, nargs='+', default=list(DEFAULT_THREADS),
+                        help=f'Thread counts to run (default: {DEFAULT_THREADS})')
+    parser.add_argument('--ops', type=int, default=DEFAULT_OPS,
+                        help=f'Operations per thread (default: {DEFAULT_OPS})')
+    parser.add_argument('--write-ratio', type=float, default=DEFAULT_WRITE_RATIO,
+                        help=f'Fraction of operations that write (default: {DEFAULT_WRITE_RATIO})')
+    parser.add_argument('--preload', type=int, default=DEFAULT_PRELOAD,
+                        help=f'Products created before the threads start '
+                             f'(default: {DEFAULT_PRELOAD})')
+    parser.add_argument('-o', '--output', default=None, help='Write results as JSON to this file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = {threads: run(threads, args) for threads in args.threads}
+    base = results[args.threads[0]]['ops_per_s']
+    print(f"{'threads':>7} {'ops/s':>10} {'speedup':>8} {'errors':>7}")
+    for threads, row in results.items():
+        print(f"{threads:>7} {row['ops_per_s']:>10.0f} {row['ops_per_s'] / base:>7.2f}x "
+              f"{row['error_count']:>7}")
+    failed = [e for row in results.values() for e in row['errors']]
+    for error in failed:
+        print(f"FAIL: {error}", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({'ops': args.ops, 'write_ratio': args.write_ratio,
+                       'python': sys.version.split()[0], 'results': results}, fh, indent=2)
+        print(f"Wrote results to {args.output}", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
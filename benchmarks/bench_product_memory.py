@@ -0,0 +1,132 @@
+# bench_product_memory.py
+"""
+Benchmark memory per product and lookup latency of the in-memory stores.
+
+product_store.MemoryStore (a dict per product) and CompactStore (columns,
+an interned category table and a text arena) are each loaded with
+--products products, with names and descriptions of typical catalog
+length, and measured for:
+
+- memory: bytes per product allocated by the store (tracemalloc, the
+  catalog index included), next to the bytes of text each product holds
+- latency, p50/p99 in microseconds: store.get of random ids, a 100-product
+  page in id order, and a 100-product page of one category sorted by price
+
+The dict layout is the baseline of the ratio column.
+
+Usage:
+    python benchmarks/bench_product_memory.py --products 1000000
+    python benchmarks/bench_product_memory.py --reads 20000 --output memory.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_generators import percentile  # noqa: E402
+
+DEFAULT_PRODUCTS = 500_000
+DEFAULT_READS = 10_000
+CATEGORIES = ('books', 'garden', 'home', 'kitchen', 'music', 'outdoor', 'toys', 'tools')
+WORDS = ('desk', 'lamp', 'steel', 'oak', 'chair', 'led', 'garden', 'hose', 'cotton', 'mug',
+         'kettle', 'blue', 'large', 'compact', 'cordless', 'drill', 'set', 'pack', 'pro')
+
+
+def product_fields(rng):
+    return {
+        'name': ' '.join(rng.choice(WORDS) for _ in range(3)).title(),
+        'description': ' '.join(rng.choice(WORDS) for _ in range(12)),
+        'price': round(rng.uniform(1, 500), 2),
+        'category': rng.choice(CATEGORIES),
+    }
+
+
+def load(make_store, products):
+    """Build a store of `products` products; returns it and the bytes it allocated."""
+    rng = random.Random(42)
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    store = make_store()
+    for _ in range(products):
+        store.create(product_fields(rng))
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return store, used
+
+
+def latencies(fn, args):
+    samples = []
+    for arg in args:
+        t0 = time.perf_counter()
+        fn(arg)
+        samples.append((time.perf_counter() - t0) * 1e6)
+    samples.sort()
+    return {'p50_us': percentile(samples, 50), 'p99_us': percentile(samples, 99)}
+
+
+def bench(make_store, args):
+    store, used = load(make_store, args.products)
+    rng = random.Random(7)
+    text = sum(len(p['name']) + len(p['description']) for p in store.page(0, 10_000))
+    reads = [rng.randint(1, args.products) for _ in range(args.reads)]
+    pages = reads[:max(args.reads // 10, 1)]
+    return {
+        'bytes_per_product': used / args.products,
+        'text_bytes_per_product': text / min(args.products, 10_000),
+        'get': latencies(store.get, reads),
+        'page': latencies(lambda after: store.page(after, 100), pages),
+        'category_page': latencies(
+            lambda i: store.query(category=CATEGORIES[i % len(CATEGORIES)], sort='price',
+                                  limit=100), pages),
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark in-memory product store layouts')
+    parser.add_argument('--products', type=int, default=DEFAULT_PRODUCTS,
+                        help=f'Products loaded into each store (default: {DEFAULT_PRODUCTS})')
+    parser.add_argument('--reads', type=int, default=DEFAULT_READS,
+                        help=f'Lookups timed per operation (default: {DEFAULT_READS})')
+    parser.add_argument('-o', '--output', default=None, help='Write results as JSON to this file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    from product_store import CompactStore, MemoryStore
+
+    results = {}
+    for label, make in (('dict', MemoryStore), ('compact', CompactStore)):
+        results[label] = bench(make, args)
+        gc.collect()
+
+    base = results['dict']
+    print(f"{'layout':<8} {'bytes/prod':>10} {'ratio':>6} {'get p50':>8} {'get p99':>8} "
+          f"{'page p50':>9} {'cat p50':>8}")
+    for label, row in results.items():
+        print(f"{label:<8} {row['bytes_per_product']:>10.0f} "
+              f"{row['bytes_per_product'] / base['bytes_per_product']:>6.2f} "
+              f"{row['get']['p50_us']:>8.2f} {row['get']['p99_us']:>8.2f} "
+              f"{row['page']['p50_us']:>9.1f} {row['category_page']['p50_us']:>8.1f}")
+    print(f"\n(text is {base['text_bytes_per_product']:.0f} bytes per product; "
+          f"latencies in microseconds)")
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({'products': args.products, 'python': sys.version.split()[0],
+                       'results': results}, fh, indent=2)
+        print(f"Wrote results to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+# bench_product_search.py
+"""
+Benchmark full-text product search (product_search.SearchIndex).
+
+--products synthetic products are indexed, with names and descriptions
+drawn from a Zipf-distributed vocabulary (a few very common words, a long
+tail of rare ones). Then measured:
+
+- build: products indexed per second, and index memory per product
+  (postings arrays, term dictionary, sorted term list and lengths)
+- query latency, p50/p99 in microseconds, for a rare word, a common word,
+  two words (AND), and a three-letter prefix; next to the same query as a
+  substring scan of every product (the cost without an index)
+- incremental updates per second: a product's name changed through the
+  store listener, i.e. its old postings removed and the new ones added
+
+Usage:
+    python benchmarks/bench_product_search.py --products 1000000
+    python benchmarks/bench_product_search.py --queries 2000 --output search.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_generators import percentile  # noqa: E402
+
+DEFAULT_PRODUCTS = 200_000
+DEFAULT_QUERIES = 1000
+VOCABULARY = 20_000
+# Substring scans are slow; each query kind is scanned this many times.
+SCANS = 3
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def make_vocabulary(rng, n):
+    words = set()
+    while len(words) < n:
+        words.add(''.join(rng.choice(LETTERS) for _ in range(rng.randrange(3, 10))))
+    words = sorted(words)
+    rng.shuffle(words)
+    return words
+
+
+def make_products(rng, words, n):
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    products = []
+    for i in range(n):
+        text = rng.choices(words, weights, k=rng.randrange(4, 24))
+        products.append({'id': i + 1, 'name': ' '.join(text[:3]),
+                         'description': ' '.join(text[3:]), 'price': 1.0, 'category': ''})
+    return products
+
+
+def index_bytes(index):
+    """Approximate memory held by a SearchIndex."""
+    size = sys.getsizeof(index._postings) + sys.getsizeof(index._terms)
+    size += sys.getsizeof(index._lengths)
+    for term, entry in index._postings.items():
+        size += sys.getsizeof(term) + sys.getsizeof(entry)
+        size += sys.getsizeof(entry[0]) + sys.getsizeof(entry[1])
+    return size
+
+
+def latency_us(fn, args):
+    """Per-call latency of fn(arg) for every arg, sorted, in microseconds."""
+    samples = []
+    clock = time.perf_counter
+    for arg in args:
+        t0 = clock()
+        fn(arg)
+        samples.append((clock() - t0) * 1e6)
+    samples.sort()
+    return samples
+
+
+def scan(products, query):
+    """Substring matching of every query word, the unindexed baseline."""
+    words = query.lower().split()
+    return [p['id'] for p in products
+            if all(w in (p['name'] + ' ' + p['description']).lower() for w in words)][:20]
+
+
+def run(args):
+    from product_search import SearchIndex
+    from product_store import MemoryStore
+
+    rng = random.Random(1)
+    words = make_vocabulary(rng, VOCABULARY)
+    products = make_products(rng, words, args.products)
+
+    index = SearchIndex()
+    t0 = time.perf_counter()
+    for prod in products:
+        index.add(prod)
+    build = args.products / (time.perf_counter() - t0)
+    memory = index_bytes(index) / args.products
+
+    rare = words[VOCABULARY // 2:]
+    kinds = {
+        'rare': lambda i: rare[i % len(rare)] + ' ',
+        'common': lambda i: words[i % 10] + ' ',
+        'two_words': lambda i: f'{words[i % 100]} {words[100 + i % 1000]} ',
+        'prefix': lambda i: words[i % 1000][:3],
+    }
+    queries = {}
+    for name, make in kinds.items():
+        samples = latency_us(lambda q: index.search(q, 20), [make(i) for i in range(args.queries)])
+        scans = latency_us(lambda q: scan(products, q), [make(i) for i in range(SCANS)])
+        queries[name] = {'p50': percentile(samples, 50), 'p99': percentile(samples, 99),
+                         'scan_p50': percentile(scans, 50)}
+
+    store = MemoryStore()
+    store.create_many(products[:10_000])
+    index = SearchIndex()
+    for prod in store.list():
+        index.add(prod)
+    store.subscribe(index.apply)
+    updates = max(1, args.queries)
+    t0 = time.perf_counter()
+    for i in range(updates):
+        store.update(1 + i % 10_000, {'name': ' '.join(rng.choices(words[:5000], k=3))})
+    update = updates / (time.perf_counter() - t0)
+
+    return {'build_per_s': build, 'bytes_per_product': memory, 'terms': len(index._terms),
+            'query_us': queries, 'update_per_s': update}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark product full-text search')
+    parser.add_argument('--products', type=int, default=DEFAULT_PRODUCTS,
+                        help=f'Products indexed (default: {DEFAULT_PRODUCTS})')
+    parser.add_argument('--queries', type=int, default=DEFAULT_QUERIES,
+                        help=f'Queries timed per kind (default: {DEFAULT_QUERIES})')
+    parser.add_argument('-o', '--output', default=None, help='Write results as JSON to this file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = run(args)
+
+    print(f"indexed {args.products} products: {results['build_per_s']:.0f}/s, "
+          f"{results['bytes_per_product']:.0f} bytes/product, "
+          f"{results['update_per_s']:.0f} updates/s")
+    print(f"\n{'query':<10} {'p50':>10} {'p99':>10} {'scan p50':>12} {'speedup':>9}")
+    for name, row in results['query_us'].items():
+        print(f"{name:<10} {row['p50']:>8.0f}us {row['p99']:>8.0f}us {row['scan_p50']:>10.0f}us "
+              f"{row['scan_p50'] / row['p50']:>8.0f}x")
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({'products': args.products, 'queries': args.queries,
+                       'python': sys.version.split()[0], 'results': results}, fh, indent=2)
+        print(f"Wrote results to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
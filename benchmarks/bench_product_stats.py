@@ -0,0 +1,120 @@
+# bench_product_stats.py
+"""
+Benchmark catalog statistics (product_stats.CatalogStats).
+
+A product_store.MemoryStore of --products products is loaded and the
+aggregates opened on it. Then measured:
+
+- query latency, p50/p99 in microseconds: the whole-catalog summary, and
+  one category's summary with three percentiles; next to the same figures
+  computed by scanning store.list(), as dashboards did from GET /products
+- update cost: price updates per second through the store, with and
+  without the aggregates subscribed
+
+Usage:
+    python benchmarks/bench_product_stats.py --products 1000000
+    python benchmarks/bench_product_stats.py --queries 2000 --output stats.json
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_generators import percentile  # noqa: E402
+
+DEFAULT_PRODUCTS = 200_000
+DEFAULT_QUERIES = 1000
+DEFAULT_UPDATES = 50_000
+# Full scans are slow; each is run this many times.
+SCANS = 3
+CATEGORIES = tuple(f'category{i}' for i in range(50))
+
+
+def scan_summary(store, category=None):
+    """The stats of one category (or all products) by scanning the catalog."""
+    prices = sorted(p['price'] for p in store.list()
+                    if category is None or p['category'] == category)
+    return {'count': len(prices), 'min': prices[0], 'max': prices[-1],
+            'avg': sum(prices) / len(prices),
+            'percentiles': {p: prices[math.ceil(p / 100 * len(prices)) - 1] for p in (50, 90, 99)}}
+
+
+def latencies(fn, runs):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1e6)
+    samples.sort()
+    return {'p50_us': percentile(samples, 50), 'p99_us': percentile(samples, 99)}
+
+
+def update_rate(store, updates, rng):
+    t0 = time.perf_counter()
+    for _ in range(updates):
+        store.update(rng.randint(1, store.count()), {'price': round(rng.uniform(1, 500), 2)})
+    return updates / (time.perf_counter() - t0)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark catalog statistics')
+    parser.add_argument('--products', type=int, default=DEFAULT_PRODUCTS,
+                        help=f'Products in the catalog (default: {DEFAULT_PRODUCTS})')
+    parser.add_argument('--queries', type=int, default=DEFAULT_QUERIES,
+                        help=f'Stats queries timed per kind (default: {DEFAULT_QUERIES})')
+    parser.add_argument('--updates', type=int, default=DEFAULT_UPDATES,
+                        help=f'Price updates timed (default: {DEFAULT_UPDATES})')
+    parser.add_argument('-o', '--output', default=None, help='Write results as JSON to this file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    from product_stats import open_stats
+    from product_store import MemoryStore
+
+    rng = random.Random(42)
+    store = MemoryStore()
+    store.create_many({'name': f'Product {i}', 'price': round(rng.uniform(1, 500), 2),
+                       'category': rng.choice(CATEGORIES)} for i in range(args.products))
+    bare = update_rate(store, args.updates, rng)
+    t0 = time.perf_counter()
+    stats = open_stats(store)
+    load_s = time.perf_counter() - t0
+    maintained = update_rate(store, args.updates, rng)
+
+    results = {
+        'load_s': load_s,
+        'updates_per_s': {'without_stats': bare, 'with_stats': maintained},
+        'catalog': {'stats': latencies(stats.summary, args.queries),
+                    'scan': latencies(lambda: scan_summary(store), SCANS)},
+        'category': {'stats': latencies(lambda: stats.summary(CATEGORIES[0], (50, 90, 99)),
+                                        args.queries),
+                     'scan': latencies(lambda: scan_summary(store, CATEGORIES[0]), SCANS)},
+    }
+
+    print(f"{'query':<10} {'stats p50':>10} {'stats p99':>10} {'scan p50':>12} {'speedup':>9}")
+    for kind in ('catalog', 'category'):
+        row = results[kind]
+        print(f"{kind:<10} {row['stats']['p50_us']:>10.1f} {row['stats']['p99_us']:>10.1f} "
+              f"{row['scan']['p50_us']:>12.0f} "
+              f"{row['scan']['p50_us'] / row['stats']['p50_us']:>8.0f}x")
+    print(f"\nload {load_s:.2f} s; updates/s {bare:.0f} without stats, "
+          f"{maintained:.0f} with (latencies in microseconds)")
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({'products': args.products, 'python': sys.version.split()[0],
+                       'results': results}, fh, indent=2)
+        print(f"Wrote results to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+# bench_product_store.py
+"""
+Benchmark the product_api storage backends.
+
+Each backend (product_store.MemoryStore and SQLiteStore on a temporary
+database file) is loaded with --products products, then measured for:
+
+- read latency: store.get of random ids, and GET /products/<id> through
+  the Flask test client, p50/p90/p99 in microseconds
+- filtered query latency: a 100-product page of one category, and of a
+  price range sorted by price, next to the same filter as a scan of
+  store.list() (the cost before the secondary indexes)
+- write throughput: create() one at a time, create_many() in one batch,
+  and update() one at a time
+
+Memory is the baseline for the ratio column; the point is that a
+persistent, cross-process store keeps read latency in the same range.
+
+Usage:
+    python benchmarks/bench_product_store.py --products 100000
+    python benchmarks/bench_product_store.py --reads 20000 --output store.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_generators import percentile  # noqa: E402
+
+DEFAULT_PRODUCTS = 100_000
+DEFAULT_READS = 10_000
+# Filtered queries timed per kind; scans are much slower and run fewer times.
+QUERIES = 200
+SCANS = 5
+CATEGORIES = ('books', 'garden', 'home', 'kitchen', 'music', 'outdoor', 'toys', 'tools')
+
+
+def sample_product(rng, i):
+    return {
+        'name': f'Product {i}',
+        'description': f'Description of product {i} ' + 'lorem ipsum ' * rng.randrange(1, 8),
+        'price': round(rng.uniform(1, 500), 2),
+        'category': rng.choice(CATEGORIES),
+    }
+
+
+def latency_us(fn, args):
+    """Per-call latency of fn(arg) for every arg, sorted, in microseconds."""
+    samples = []
+    clock = time.perf_counter
+    for arg in args:
+        t0 = clock()
+        fn(arg)
+        samples.append((clock() - t0) * 1e6)
+    samples.sort()
+    return samples
+
+
+def throughput(fn, n):
+    """Calls per second of fn(i) for i in range(n)."""
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return n / (time.perf_counter() - t0)
+
+
+def bench_store(store, args):
+    """Run every measurement on an empty store."""
+    import product_api
+
+    rng = random.Random(1)
+    rows = [sample_product(rng, i) for i in range(args.products)]
+    t0 = time.perf_counter()
+    store.create_many(rows)
+    create_many = args.products / (time.perf_counter() - t0)
+
+    ids = [rng.randrange(1, args.products + 1) for _ in range(args.reads)]
+    get = latency_us(store.get, ids)
+
+    product_api.store = store
+    client = product_api.app.test_client()
+    http = latency_us(lambda pid: client.get(f'/products/{pid}'), ids[:args.reads // 4])
+
+    def by_category(i):
+        return store.query(category=CATEGORIES[i % len(CATEGORIES)], limit=100)
+
+    def scan_category(i):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        return [p for p in store.list() if p['category'] == category][:100]
+
+    def by_price(i):
+        return store.query(min_price=100 + i % 50, max_price=110 + i % 50, sort='price',
+                           limit=100)
+
+    def scan_price(i):
+        lo, hi = 100 + i % 50, 110 + i % 50
+        matches = [p for p in store.list() if lo <= p['price'] <= hi]
+        return sorted(matches, key=lambda p: (p['price'], p['id']))[:100]
+
+    queries = [('category', by_category, scan_category), ('price', by_price, scan_price)]
+    query_us = {}
+    for name, indexed, scan in queries:
+        query_us[name] = percentile(latency_us(indexed, range(QUERIES)), 50)
+        query_us[name + '_scan'] = percentile(latency_us(scan, range(SCANS)), 50)
+
+    writes = max(1, args.reads // 4)
+    create = throughput(lambda i: store.create(rows[i % len(rows)]), writes)
+    update = throughput(lambda i: store.update(ids[i], {'price': float(i)}), writes)
+    return {
+        'get_us': {q: percentile(get, q) for q in (50, 90, 99)},
+        'http_get_us': {q: percentile(http, q) for q in (50, 90, 99)},
+        'query_us': query_us,
+        'create_many_per_s': create_many,
+        'create_per_s': create,
+        'update_per_s': update,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark product_api storage backends')
+    parser.add_argument('--products', type=int, default=DEFAULT_PRODUCTS,
+                        help=f'Products loaded before measuring (default: {DEFAULT_PRODUCTS})')
+    parser.add_argument('--reads', type=int, default=DEFAULT_READS,
+                        help=f'Random reads per backend (default: {DEFAULT_READS})')
+    parser.add_argument('-o', '--output', default=None, help='Write results as JSON to this file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    from product_store import MemoryStore, SQLiteStore
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, make in (('memory', MemoryStore),
+                            ('sqlite', lambda: SQLiteStore(os.path.join(tmp, 'catalog.db')))):
+            store = make()
+            try:
+                results[label] = bench_store(store, args)
+            finally:
+                store.close()
+
+    base = results['memory']
+    print(f"{'backend':<8} {'get p50':>9} {'get p99':>9} {'http p50':>9} {'http p99':>9} "
+          f"{'ratio':>6} {'create/s':>10} {'batch/s':>10} {'update/s':>10}")
+    for label, row in results.items():
+        print(f"{label:<8} {row['get_us'][50]:>7.1f}us {row['get_us'][99]:>7.1f}us "
+              f"{row['http_get_us'][50]:>7.1f}us {row['http_get_us'][99]:>7.1f}us "
+              f"{row['http_get_us'][50] / base['http_get_us'][50]:>6.2f} "
+              f"{row['create_per_s']:>10.0f} {row['create_many_per_s']:>10.0f} "
+              f"{row['update_per_s']:>10.0f}")
+
+    print(f"\n{'backend':<8} {'query p50':>14} {'indexed':>10} {'scan':>10}")
+    for label, row in results.items():
+        for name in ('category', 'price'):
+            print(f"{label:<8} {name:>14} {row['query_us'][name]:>8.0f}us "
+                  f"{row['query_us'][name + '_scan']:>8.0f}us")
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({'products': args.products, 'reads': args.reads,
+                       'python': sys.version.split()[0], 'results': results}, fh, indent=2)
+        print(f"Wrote results to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
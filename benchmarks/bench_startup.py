@@ -0,0 +1,92 @@
+# bench_startup.py
+"""
+Cold-start benchmark for the command line entry points.
+
+Runs each command --runs times as a fresh process, as a shell loop would,
+and reports the median and p90 wall time per invocation next to a bare
+`python -c pass`, so interpreter startup can be told apart from the
+scripts' own import and setup cost. The ratio column compares every
+command with secure_password_generator.py.
+
+Run it with bytecode caching enabled (PYTHONDONTWRITEBYTECODE unset, or
+after `python -m compileall`); otherwise every run also recompiles the
+modules and the numbers measure the compiler.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 50
+    python benchmarks/bench_startup.py --output startup.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_generators import SCRIPTS, percentile  # noqa: E402
+
+DEFAULT_RUNS = 30
+
+
+def commands():
+    """Return {label: argv} for every entry point to time."""
+    cmds = {'python -c pass': [sys.executable, '-c', 'pass']}
+    for name, filename in SCRIPTS.items():
+        cmds[name] = [sys.executable, os.path.join(ROOT, filename), '--length', '16']
+    # What the installed console script runs (python -m adds runpy's imports).
+    passgen = [sys.executable, '-c', 'from passgen.cli import main; main()']
+    cmds['passgen'] = passgen
+    cmds['passgen --count 100'] = passgen + ['--count', '100']
+    cmds['passgen (full parser)'] = passgen + ['--min-digits', '2']
+    return cmds
+
+
+def time_command(argv, runs):
+    """Wall time in milliseconds of `runs` sequential invocations, sorted."""
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run(argv, cwd=ROOT, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return samples
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark CLI cold-start time')
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS,
+                        help=f'Invocations per command (default: {DEFAULT_RUNS})')
+    parser.add_argument('-o', '--output', default=None, help='Write results as JSON to this file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = {}
+    for label, argv in commands().items():
+        samples = time_command(argv, args.runs)
+        results[label] = {
+            'median_ms': percentile(samples, 50),
+            'p90_ms': percentile(samples, 90),
+        }
+
+    reference = results['secure_password_generator']['median_ms']
+    print(f"{'command':<28} {'median':>9} {'p90':>9} {'ratio':>7}")
+    for label, row in results.items():
+        print(f"{label:<28} {row['median_ms']:>7.1f}ms {row['p90_ms']:>7.1f}ms "
+              f"{row['median_ms'] / reference:>7.2f}")
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({'runs': args.runs, 'python': sys.version.split()[0],
+                       'results': results}, fh, indent=2)
+        print(f"Wrote results to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
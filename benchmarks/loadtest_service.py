@@ -0,0 +1,153 @@
+# loadtest_service.py
+"""
+Load test for the password service (password_service.py).
+
+Opens --concurrency connections and has each one issue requests back to
+back until --requests have completed in total, timing every round trip.
+Reports throughput and per-request latency p50/p90/p99/max, and the same
+for a cold process-per-password baseline (one CLI invocation per
+password) when --cli-baseline is given, so the two can be compared.
+
+The service must already be running:
+
+    python password_service.py --warm 16 &
+    python benchmarks/loadtest_service.py --concurrency 32 --requests 20000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_generators import percentile  # noqa: E402
+from password_client import DEFAULT_SOCKET  # noqa: E402
+
+
+async def connect(socket_path, port):
+    if port is None:
+        return await asyncio.open_unix_connection(socket_path)
+    return await asyncio.open_connection('127.0.0.1', port)
+
+
+async def worker(socket_path, port, payload, budget, samples):
+    """Issue requests on one connection while the shared budget lasts."""
+    reader, writer = await connect(socket_path, port)
+    clock = time.perf_counter_ns
+    try:
+        while budget[0] > 0:
+            budget[0] -= 1
+            t0 = clock()
+            writer.write(payload)
+            await writer.drain()
+            line = await reader.readline()
+            samples.append(clock() - t0)
+            if b'"error"' in line:
+                raise RuntimeError(json.loads(line)['error'])
+    finally:
+        writer.close()
+
+
+async def load(socket_path, port, concurrency, requests, request):
+    payload = json.dumps(request).encode('utf-8') + b'\n'
+    budget = [requests]
+    samples = []
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(socket_path, port, payload, budget, samples)
+                           for _ in range(concurrency)))
+    return samples, time.perf_counter() - start
+
+
+def cli_baseline(runs, length):
+    """Time `runs` cold invocations of the generator CLI."""
+    cmd = [sys.executable, os.path.join(ROOT, 'secure_password_generator.py'),
+           '--length', str(length)]
+    samples = []
+    start = time.perf_counter()
+    for _ in range(runs):
+        t0 = time.perf_counter_ns()
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter_ns() - t0)
+    return samples, time.perf_counter() - start
+
+
+def summarize(samples, elapsed, passwords_per_request):
+    samples.sort()
+    return {
+        'requests': len(samples),
+        'requests_per_s': len(samples) / elapsed,
+        'passwords_per_s': len(samples) * passwords_per_request / elapsed,
+        'latency_us': {
+            'p50': percentile(samples, 50) / 1000,
+            'p90': percentile(samples, 90) / 1000,
+            'p99': percentile(samples, 99) / 1000,
+            'max': samples[-1] / 1000 if samples else 0.0,
+        },
+    }
+
+
+def print_summary(label, summary):
+    lat = summary['latency_us']
+    print(f"{label:<10} {summary['requests_per_s']:>10.0f} req/s  "
+          f"{summary['passwords_per_s']:>12.0f} pw/s  "
+          f"p50 {lat['p50']:>9.1f}us  p90 {lat['p90']:>9.1f}us  "
+          f"p99 {lat['p99']:>9.1f}us  max {lat['max']:>9.1f}us")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Load test the password service')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET,
+                        help=f'Service Unix socket (default: {DEFAULT_SOCKET})')
+    parser.add_argument('--port', type=int, default=None,
+                        help='Connect to 127.0.0.1:PORT over TCP instead')
+    parser.add_argument('--concurrency', type=int, default=16,
+                        help='Concurrent connections (default: 16)')
+    parser.add_argument('--requests', type=int, default=10000,
+                        help='Total requests (default: 10000)')
+    parser.add_argument('--length', type=int, default=16, help='Password length (default: 16)')
+    parser.add_argument('--count', type=int, default=1,
+                        help='Passwords per request (default: 1)')
+    parser.add_argument('--cli-baseline', type=int, default=0, metavar='RUNS',
+                        help='Also time RUNS process-per-password CLI invocations')
+    parser.add_argument('-o', '--output', default=None, help='Write results as JSON to this file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.concurrency < 1 or args.requests < 1:
+        print("ERROR: --concurrency and --requests must be positive.", file=sys.stderr)
+        sys.exit(1)
+    request = {'op': 'generate', 'count': args.count, 'length': args.length}
+    try:
+        samples, elapsed = asyncio.run(
+            load(args.socket, args.port, args.concurrency, args.requests, request))
+    except (OSError, RuntimeError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'concurrency': args.concurrency,
+        'length': args.length,
+        'count': args.count,
+        'service': summarize(samples, elapsed, args.count),
+    }
+    print_summary('service', report['service'])
+    if args.cli_baseline:
+        report['cli'] = summarize(*cli_baseline(args.cli_baseline, args.length), 1)
+        print_summary('cli', report['cli'])
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(report, fh, indent=2)
+        print(f"Wrote results to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# passgen/__init__.py
+"""
+Secure password generation: one importable package for the generators.
+
+Re-exports the public API of the password_* modules and
+secure_password_generator. Names are resolved on first access, so
+`import passgen` costs nothing beyond this file and only the module that
+provides a name is imported when it is used.
+
+Usage:
+    import passgen
+    passgen.generate_passwords(10, 16, passgen.compile_policy(include_symbols=False))
+
+    $ passgen -l 20 --count 5
+"""
+
+__version__ = '1.0.0'
+
+_EXPORTS = {
+    'build_charsets': 'secure_password_generator',
+    'generate_password': 'secure_password_generator',
+    'generate_passwords': 'secure_password_generator',
+    'generate_password_bytes': 'secure_password_generator',
+    'iter_password_batches': 'secure_password_generator',
+    'PasswordPolicy': 'password_policy',
+    'compile_policy': 'password_policy',
+    'as_policy': 'password_policy',
+    'generate_password_exact': 'password_sampler',
+    'compile_sampler': 'password_sampler',
+    'iter_password_batches_parallel': 'password_parallel',
+    'stream_passwords': 'password_output',
+    'score_passwords': 'password_strength',
+    'policy_entropy_bits': 'password_strength',
+    'open_denylist': 'password_denylist',
+    'open_wordlist': 'password_passphrase',
+    'generate_passphrase': 'password_passphrase',
+    'generate_passphrases': 'password_passphrase',
+    'PasswordClient': 'password_client',
+    'get_backend': 'password_rng',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'passgen' has no attribute '{name}'")
+    import importlib
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
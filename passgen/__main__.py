@@ -0,0 +1,6 @@
+# passgen/__main__.py
+"""Allow `python -m passgen`."""
+
+from passgen.cli import main
+
+main()
@@ -0,0 +1,127 @@
+# passgen/cli.py
+"""
+The `passgen` command: one entry point for every generator script.
+
+Accepts the union of the scripts' flag spellings (--length/-l,
+--no-uppercase/--no-upper, --no-lowercase/--no-lower, --no-digits,
+--no-symbols, --count, -v/--verbose) plus every option of
+secure_password_generator.py. Passwords are written one per line, without
+a "Generated password:" prefix, so the output can be consumed directly by
+shell loops; the default length is 16.
+
+Cold start is what matters when the command runs thousands of times from a
+shell loop, so the common invocations take a fast path: the arguments are
+matched by hand instead of building an argparse parser, logging is never
+configured, and only sys, password_policy and the bulk generator are
+imported. Anything else (another option, -v, --help, an invalid value) is
+handed to the full argparse CLI, which produces the same errors and help
+text as secure_password_generator.py.
+
+Usage:
+    passgen                          # one 16-character password
+    passgen -l 24 --no-symbols --count 5
+    passgen --min-digits 3 --max-repeat 2 -v
+    python -m passgen --help
+"""
+
+import sys
+
+DEFAULT_LENGTH = 16
+# Smallest --count for which the NumPy path is worth its import time.
+NUMPY_MIN_COUNT = 100_000
+
+_EXCLUDE_FLAGS = {
+    '--no-uppercase': 0, '--no-upper': 0,
+    '--no-lowercase': 1, '--no-lower': 1,
+    '--no-digits': 2,
+    '--no-symbols': 3,
+}
+_INT_FLAGS = {'-l': 'length', '--length': 'length', '--count': 'count'}
+
+
+def parse_fast(argv):
+    """
+    Match argv against the common flags without argparse.
+
+    Returns:
+        tuple: (length, count, include flags), or None when argv needs the
+        full parser
+    """
+    length, count = DEFAULT_LENGTH, 1
+    include = [True, True, True, True]
+    args = iter(argv)
+    for arg in args:
+        if arg in _EXCLUDE_FLAGS:
+            include[_EXCLUDE_FLAGS[arg]] = False
+            continue
+        name, eq, value = arg.partition('=')
+        if name not in _INT_FLAGS:
+            return None
+        if not eq:
+            value = next(args, None)
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            return None
+        if _INT_FLAGS[name] == 'length':
+            length = value
+        else:
+            count = value
+    return length, count, tuple(include)
+
+
+def run_fast(length, count, include):
+    """
+    Generate and write passwords for the fast path.
+
+    Returns:
+        bool: False, without writing anything, when the request is invalid
+        and should be reported by the full CLI instead
+    """
+    from password_policy import compile_policy
+
+    policy = compile_policy(*include)
+    if length < 4 or count < 1 or not policy or length < len(policy):
+        return False
+
+    from secure_password_generator import iter_password_batches
+    batches = iter_password_batches(count, length, policy,
+                                    use_numpy=None if count >= NUMPY_MIN_COUNT else False)
+    if count == 1:
+        sys.stdout.write(next(batches)[0] + '\n')
+    else:
+        from password_output import stream_passwords
+        stream_passwords(batches)
+    return True
+
+
+def run_full(argv):
+    """Run the full argparse CLI with passgen's defaults."""
+    import secure_password_generator as spg
+
+    parser = spg.build_parser()
+    parser.prog = 'passgen'
+    parser.set_defaults(length=DEFAULT_LENGTH, format='plain')
+    args = parser.parse_args(argv)
+    if args.verbose:
+        spg.setup_logging(verbose=True)
+    else:
+        # The module-level logging calls would otherwise configure a stderr
+        # handler on first use; errors are still printed as "ERROR: ...".
+        import logging
+        logging.getLogger().addHandler(logging.NullHandler())
+    spg.run(args)
+
+
+def main(argv=None):
+    """Console entry point."""
+    if argv is None:
+        argv = sys.argv[1:]
+    fast = parse_fast(argv)
+    if fast is not None and run_fast(*fast):
+        return
+    run_full(argv)
+
+
+if __name__ == '__main__':
+    main()
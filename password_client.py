@@ -0,0 +1,128 @@
+# password_client.py
+"""
+Thin client for the password service (password_service.py).
+
+Keeps one connection open and speaks the service's newline-delimited JSON
+protocol. It imports only the standard socket and json modules, so
+shell loops that call it pay little more than interpreter startup.
+
+Usage:
+    python password_client.py --length 20 --count 5 --no-symbols
+
+    with PasswordClient() as client:
+        client.generate(count=10, length=16, symbols=False)
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+
+DEFAULT_SOCKET = os.path.join(os.environ.get('XDG_RUNTIME_DIR') or '/tmp', 'passgen.sock')
+
+
+class ServiceError(Exception):
+    """The service rejected a request."""
+
+
+class PasswordClient:
+    """
+    Blocking client holding one connection to the service.
+
+    Connects to the Unix socket `socket_path` unless `port` is given, in
+    which case it connects to host:port over TCP.
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, host='127.0.0.1', port=None, timeout=5.0):
+        if port is None:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            address = socket_path
+        else:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            address = (host, port)
+        self._sock.settimeout(timeout)
+        self._sock.connect(address)
+        self._reader = self._sock.makefile('rb')
+
+    def request(self, payload):
+        """Send one request object and return the decoded response object."""
+        self._sock.sendall(json.dumps(payload).encode('utf-8') + b'\n')
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Password service closed the connection.")
+        response = json.loads(line)
+        if 'error' in response:
+            raise ServiceError(response['error'])
+        return response
+
+    def generate(self, count=1, length=16, uppercase=True, lowercase=True, digits=True,
+                 symbols=True, minimums=None, max_repeat=None):
+        """Request `count` passwords for a policy; returns a list of str."""
+        payload = {
+            'op': 'generate', 'count': count, 'length': length,
+            'uppercase': uppercase, 'lowercase': lowercase,
+            'digits': digits, 'symbols': symbols,
+        }
+        if minimums:
+            payload['minimums'] = minimums
+        if max_repeat is not None:
+            payload['max_repeat'] = max_repeat
+        return self.request(payload)['passwords']
+
+    def stats(self):
+        """Return the service's reservoir statistics."""
+        return self.request({'op': 'stats'})
+
+    def close(self):
+        self._reader.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Request passwords from the password service')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET,
+                        help=f'Service Unix socket (default: {DEFAULT_SOCKET})')
+    parser.add_argument('--port', type=int, default=None,
+                        help='Connect to 127.0.0.1:PORT over TCP instead')
+    parser.add_argument('-l', '--length', type=int, default=16,
+                        help='Password length (default: 16)')
+    parser.add_argument('--count', type=int, default=1,
+                        help='Number of passwords (default: 1)')
+    parser.add_argument('--no-uppercase', '--no-upper', action='store_true',
+                        help='Exclude uppercase letters')
+    parser.add_argument('--no-lowercase', '--no-lower', action='store_true',
+                        help='Exclude lowercase letters')
+    parser.add_argument('--no-digits', action='store_true', help='Exclude digits')
+    parser.add_argument('--no-symbols', action='store_true', help='Exclude symbols')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    try:
+        with PasswordClient(args.socket, port=args.port) as client:
+            passwords = client.generate(
+                count=args.count,
+                length=args.length,
+                uppercase=not args.no_uppercase,
+                lowercase=not args.no_lowercase,
+                digits=not args.no_digits,
+                symbols=not args.no_symbols
+            )
+    except (OSError, ServiceError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    sys.stdout.write('\n'.join(passwords) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,357 @@
+# password_denylist.py
+"""
+Breached-password denylist backed by a memory-mapped SHA-1 index.
+
+A denylist is built once from a breached-hash corpus -- one SHA-1 hex
+digest per line, optionally followed by ':count' as in the Have I Been
+Pwned downloads -- into two files:
+
+- <index>       the distinct digests as sorted, fixed-width 20-byte records
+- <index>.bloom a Bloom filter over the same digests
+
+Opening a denylist memory-maps both files, so startup costs two mmap
+calls however large the corpus is, and the operating system pages in only
+what lookups touch. A lookup hashes the candidate, checks the Bloom filter
+(k bit probes, derived from the digest itself) and only on a possible hit
+binary-searches the sorted records. Nearly every freshly generated
+password is rejected by the filter alone.
+
+Building uses an external sort bounded by --chunk-size digests in memory:
+sorted runs are spilled to a temporary directory and merged into the
+final index while the Bloom filter is filled.
+
+Usage:
+    python password_denylist.py build pwned-passwords-sha1.txt breached.idx
+    python password_denylist.py check breached.idx < candidates.txt
+
+    denylist = open_denylist('breached.idx')
+    generate_password(16, charsets, denylist=denylist)
+"""
+
+import argparse
+import hashlib
+import heapq
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+RECORD_SIZE = 20
+BLOOM_MAGIC = b'PWBF'
+# magic, number of probes k, number of bits m
+BLOOM_HEADER = struct.Struct('<4sIQ')
+# Filter bits per stored digest; 10 bits with 7 probes is ~1% false positives.
+BLOOM_BITS_PER_ENTRY = 10
+# Digests sorted in memory per run while building.
+BUILD_CHUNK_SIZE = 2_000_000
+# Regeneration attempts before a generator gives up on a denied policy.
+MAX_DENYLIST_RETRIES = 1000
+
+_MASK64 = (1 << 64) - 1
+
+
+def password_digest(password):
+    """SHA-1 digest of a password's UTF-8 encoding (the breach-corpus form)."""
+    return hashlib.sha1(password.encode('utf-8')).digest()
+
+
+def _bloom_probes(digest, k, m):
+    h1 = int.from_bytes(digest[0:8], 'little')
+    h2 = int.from_bytes(digest[8:16], 'little') | 1
+    return [((h1 + i * h2) & _MASK64) % m for i in range(k)]
+
+
+def _bloom_size(count, bits_per_entry):
+    m = max(64, count * bits_per_entry)
+    k = max(1, round(bits_per_entry * math.log(2)))
+    return k, m
+
+
+class Denylist:
+    """
+    Read-only view of a built denylist index.
+
+    Supports `password in denylist` and contains_digest(); pickles as its
+    path so worker processes reopen (and share the page cache for) the same
+    files instead of copying them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._files = []
+        self._records = self._map(path)
+        self.count = len(self._records) // RECORD_SIZE if self._records else 0
+        bloom = self._map(path + '.bloom')
+        magic, self._k, self._m = BLOOM_HEADER.unpack_from(bloom, 0)
+        if magic != BLOOM_MAGIC:
+            raise ValueError(f"{path}.bloom is not a denylist Bloom filter.")
+        self._bloom = bloom
+        self._bits_offset = BLOOM_HEADER.size
+
+    def _map(self, path):
+        fh = open(path, 'rb')
+        self._files.append(fh)
+        if os.fstat(fh.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __reduce__(self):
+        return open_denylist, (self.path,)
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, password):
+        return self.contains_digest(password_digest(password))
+
+    def might_contain(self, digest):
+        """Bloom filter check: False means definitely absent."""
+        bloom = self._bloom
+        offset = self._bits_offset
+        for bit in _bloom_probes(digest, self._k, self._m):
+            if not bloom[offset + (bit >> 3)] >> (bit & 7) & 1:
+                return False
+        return True
+
+    def contains_digest(self, digest):
+        """Exact membership test for a 20-byte SHA-1 digest."""
+        if not self.might_contain(digest):
+            return False
+        records = self._records
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = mid * RECORD_SIZE
+            record = records[start:start + RECORD_SIZE]
+            if record < digest:
+                lo = mid + 1
+            elif record > digest:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def close(self):
+        for mapped in (self._records, self._bloom):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        for fh in self._files:
+            fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def draw_allowed(draw, denylist):
+    """
+    Call draw() until it returns a password not in `denylist`.
+
+    Raises:
+        ValueError: if MAX_DENYLIST_RETRIES consecutive draws are denied
+    """
+    for _ in range(MAX_DENYLIST_RETRIES):
+        password = draw()
+        if password not in denylist:
+            return password
+    raise ValueError(
+        f"Gave up after {MAX_DENYLIST_RETRIES} denylisted passwords; "
+        f"the policy is too weak for this denylist."
+    )
+
+
+def replace_denied(flat, length, denylist, draw):
+    """
+    Drop denylisted passwords from fixed-width ASCII bytes and top up.
+
+    Args:
+        flat: bytes, concatenated passwords of `length` bytes each
+        length: int, password length
+        denylist: Denylist
+        draw: callable(k) returning k fresh passwords as fixed-width bytes
+
+    Returns:
+        bytes: as many allowed passwords as `flat` held
+    """
+    sha1 = hashlib.sha1
+    contains = denylist.contains_digest
+    n = len(flat) // length
+    kept = [flat[i:i + length] for i in range(0, len(flat), length)
+            if not contains(sha1(flat[i:i + length]).digest())]
+    if len(kept) == n:
+        return flat
+    for _ in range(MAX_DENYLIST_RETRIES):
+        fresh = draw(n - len(kept))
+        kept.extend(fresh[i:i + length] for i in range(0, len(fresh), length)
+                    if not contains(sha1(fresh[i:i + length]).digest()))
+        if len(kept) == n:
+            return b''.join(kept)
+    raise ValueError(
+        f"Gave up after {MAX_DENYLIST_RETRIES} rounds of denylisted passwords; "
+        f"the policy is too weak for this denylist."
+    )
+
+
+_open_denylists = {}
+
+
+def open_denylist(path):
+    """Open (or reuse this process's already open) denylist at `path`."""
+    path = os.path.abspath(path)
+    if path not in _open_denylists:
+        _open_denylists[path] = Denylist(path)
+    return _open_denylists[path]
+
+
+def _parse_digest(line):
+    """Digest bytes from a 'HEX' or 'HEX:count' line, or None if malformed."""
+    text = line.split(b':', 1)[0].strip()
+    if len(text) != 2 * RECORD_SIZE:
+        return None
+    try:
+        return bytes.fromhex(text.decode('ascii'))
+    except (UnicodeDecodeError, ValueError):
+        return None
+
+
+def _read_run(path):
+    with open(path, 'rb', buffering=1 << 20) as fh:
+        while True:
+            record = fh.read(RECORD_SIZE)
+            if len(record) < RECORD_SIZE:
+                return
+            yield record
+
+
+def _fill_bloom_numpy(np, bits, digests, k, m):
+    """Set the Bloom bits for a list of digests with vectorized probes."""
+    rows = np.frombuffer(b''.join(digests), dtype=np.uint8).reshape(len(digests), RECORD_SIZE)
+    h1 = np.ascontiguousarray(rows[:, 0:8]).view('<u8').ravel()
+    h2 = np.ascontiguousarray(rows[:, 8:16]).view('<u8').ravel() | np.uint64(1)
+    view = np.frombuffer(bits, dtype=np.uint8)
+    for i in range(k):
+        probe = (h1 + np.uint64(i) * h2) % np.uint64(m)
+        np.bitwise_or.at(view, (probe >> np.uint64(3)).astype(np.int64),
+                         np.uint8(1) << (probe & np.uint64(7)).astype(np.uint8))
+
+
+def build_index(source, index_path, chunk_size=BUILD_CHUNK_SIZE,
+                bits_per_entry=BLOOM_BITS_PER_ENTRY, use_numpy=None):
+    """
+    Build a denylist index from a hash list.
+
+    Args:
+        source: path of the hash list ('-' for stdin)
+        index_path: output path; the Bloom filter goes to index_path + '.bloom'
+        chunk_size: digests sorted in memory per spilled run
+        bits_per_entry: Bloom filter bits per distinct digest
+        use_numpy: force (True) or disable (False) vectorized Bloom filling
+
+    Returns:
+        int: number of distinct digests written
+    """
+    np = None
+    if use_numpy is not False:
+        try:
+            import numpy as np
+        except ImportError:
+            if use_numpy:
+                raise
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(index_path))) as tmp:
+        runs = []
+        total = 0
+        fh = sys.stdin.buffer if source == '-' else open(source, 'rb', buffering=1 << 20)
+        try:
+            chunk = []
+            for line in fh:
+                digest = _parse_digest(line)
+                if digest is None:
+                    continue
+                chunk.append(digest)
+                if len(chunk) >= chunk_size:
+                    runs.append(_write_run(tmp, len(runs), chunk))
+                    total += len(chunk)
+                    chunk = []
+            if chunk:
+                runs.append(_write_run(tmp, len(runs), chunk))
+                total += len(chunk)
+        finally:
+            if fh is not sys.stdin.buffer:
+                fh.close()
+
+        k, m = _bloom_size(total, bits_per_entry)
+        bits = bytearray((m + 7) // 8)
+        written = 0
+        previous = None
+        pending = []
+        with open(index_path, 'wb', buffering=1 << 20) as out:
+            for digest in heapq.merge(*(_read_run(run) for run in runs)):
+                if digest == previous:
+                    continue
+                previous = digest
+                out.write(digest)
+                written += 1
+                if np is not None:
+                    pending.append(digest)
+                    if len(pending) >= chunk_size:
+                        _fill_bloom_numpy(np, bits, pending, k, m)
+                        pending = []
+                else:
+                    for bit in _bloom_probes(digest, k, m):
+                        bits[bit >> 3] |= 1 << (bit & 7)
+            if pending:
+                _fill_bloom_numpy(np, bits, pending, k, m)
+
+    with open(index_path + '.bloom', 'wb') as out:
+        out.write(BLOOM_HEADER.pack(BLOOM_MAGIC, k, m))
+        out.write(bits)
+    return written
+
+
+def _write_run(tmp, number, chunk):
+    chunk.sort()
+    path = os.path.join(tmp, f'run{number:05d}')
+    with open(path, 'wb', buffering=1 << 20) as out:
+        out.write(b''.join(chunk))
+    return path
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Breached-password denylist index')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='Build an index from a SHA-1 hash list')
+    build.add_argument('source', help="Hash list, one 'SHA1HEX[:count]' per line ('-' for stdin)")
+    build.add_argument('index', help='Output index path')
+    build.add_argument('--chunk-size', type=int, default=BUILD_CHUNK_SIZE,
+                       help=f'Digests sorted in memory per run (default: {BUILD_CHUNK_SIZE})')
+    build.add_argument('--bits-per-entry', type=int, default=BLOOM_BITS_PER_ENTRY,
+                       help=f'Bloom filter bits per digest (default: {BLOOM_BITS_PER_ENTRY})')
+    check = sub.add_parser('check', help='Print the stdin passwords found in an index')
+    check.add_argument('index', help='Index path')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.command == 'build':
+        count = build_index(args.source, args.index, args.chunk_size, args.bits_per_entry)
+        print(f"Indexed {count} distinct hashes into {args.index}", file=sys.stderr)
+        return
+    denylist = open_denylist(args.index)
+    found = 0
+    for line in sys.stdin:
+        password = line.rstrip('\r\n')
+        if password in denylist:
+            found += 1
+            print(password)
+    sys.exit(1 if found else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,418 @@
+# password_metrics.py
+"""
+Opt-in generation metrics and profiling.
+
+enable() installs timing and counting wrappers around the generation
+stages and returns a Registry that collects:
+
+- passgen_passwords_generated_total{path}: passwords returned, by path
+  (single, bulk, exact, passphrase)
+- passgen_entropy_bytes_total: bytes read from the OS CSPRNG
+- passgen_rng_info{backend,secure}: 1 for each RNG backend selected with
+  password_rng.get_backend (see password_rng)
+- passgen_rng_bytes_total{backend}: bytes drawn through a backend's
+  random_bytes (bulk paths, and every draw of the non-OS backends)
+- passgen_candidates_drawn_total / passgen_candidates_rejected_total: bulk
+  rejection sampling; rejected candidates missed a selected class or were
+  the unused surplus of a batch
+- passgen_denylist_lookups_total, passgen_denylist_bloom_passes_total,
+  passgen_denylist_hits_total: denylist checks (bloom passes minus hits
+  are Bloom filter false positives)
+- passgen_output_bytes_total: bytes written by password_output
+- passgen_stage_seconds{stage}: per-call latency histogram for each stage
+  (urandom, rng, choice, shuffle, generate_password, bulk, bulk_batch,
+  exact_unrank, passphrase, denylist, render, write)
+
+The wrappers replace module attributes (os.urandom, secrets.choice,
+random.shuffle, secure_password_generator.generate_password, ...) and
+disable() puts the originals back, so when metrics are off the generators
+run their unmodified code. The one exception is a None check per bulk
+batch for the candidate counts, which are not visible from outside.
+Stages run in --workers processes are not seen by the parent's registry.
+
+The registry is exported as Prometheus text format or as JSON. profile()
+runs a callable under cProfile and writes a pstats file plus a text report.
+
+Usage:
+    python secure_password_generator.py --count 1000000 --metrics metrics.prom
+    python secure_password_generator.py --count 1000000 --profile gen.pstats
+
+    registry = enable()
+    generate_passwords(1000, 16, policy)
+    disable()
+    print(registry.prometheus())
+"""
+
+import json
+import os
+import random
+import secrets
+import sys
+import time
+from bisect import bisect_left
+
+# Latency histogram bucket upper bounds, in seconds (1us .. 10s).
+STAGE_BUCKETS = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+# Functions listed in the --profile text report.
+PROFILE_TOP = 25
+
+
+def _label_text(labelnames, key):
+    if not labelnames:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labelnames, key)) + '}'
+
+
+class Counter:
+    """Monotonic counter, optionally split by label values."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def inc(self, amount=1, *labels):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for key, value in sorted(self.values.items()):
+            yield self.name + _label_text(self.labelnames, key), value
+
+    def as_dict(self):
+        return {','.join(key) or '': value for key, value in sorted(self.values.items())}
+
+
+class Gauge:
+    """Value that is set rather than incremented, optionally split by labels."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def set(self, value, *labels):
+        self.values[labels] = value
+
+    samples = Counter.samples
+    as_dict = Counter.as_dict
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by label values."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=STAGE_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.values = {}
+
+    def observe(self, value, *labels):
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def samples(self):
+        for key, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                labels = _label_text(self.labelnames + ('le',), key + (le,))
+                yield f'{self.name}_bucket{labels}', cumulative
+            labels = _label_text(self.labelnames, key)
+            yield f'{self.name}_sum{labels}', total
+            yield f'{self.name}_count{labels}', count
+
+    def as_dict(self):
+        return {
+            ','.join(key) or '': {
+                'count': count,
+                'sum': total,
+                'buckets': dict(zip([repr(b) for b in self.buckets] + ['+Inf'], counts)),
+            }
+            for key, (counts, total, count) in sorted(self.values.items())
+        }
+
+
+class Registry:
+    """The set of metrics collected while instrumentation is enabled."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.passwords = self._add(Counter(
+            'passgen_passwords_generated_total', 'Passwords generated.', ('path',)))
+        self.entropy_bytes = self._add(Counter(
+            'passgen_entropy_bytes_total', 'Bytes read from the OS CSPRNG.'))
+        self.rng_info = self._add(Gauge(
+            'passgen_rng_info', 'RNG backends selected for generation.', ('backend', 'secure')))
+        self.rng_bytes = self._add(Counter(
+            'passgen_rng_bytes_total', 'Bytes drawn from the RNG backend.', ('backend',)))
+        self.candidates = self._add(Counter(
+            'passgen_candidates_drawn_total', 'Bulk candidates drawn.'))
+        self.rejected = self._add(Counter(
+            'passgen_candidates_rejected_total', 'Bulk candidates discarded.'))
+        self.denylist_lookups = self._add(Counter(
+            'passgen_denylist_lookups_total', 'Denylist membership checks.'))
+        self.denylist_bloom_passes = self._add(Counter(
+            'passgen_denylist_bloom_passes_total', 'Denylist checks passing the Bloom filter.'))
+        self.denylist_hits = self._add(Counter(
+            'passgen_denylist_hits_total', 'Passwords found in the denylist.'))
+        self.output_bytes = self._add(Counter(
+            'passgen_output_bytes_total', 'Bytes of rendered output written.'))
+        self.stage_seconds = self._add(Histogram(
+            'passgen_stage_seconds', 'Per-call time spent in each generation stage.',
+            ('stage',)))
+
+    def _add(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def prometheus(self):
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, value in metric.samples():
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def as_dict(self):
+        return {name: metric.as_dict() for name, metric in self.metrics.items()}
+
+    def write(self, path, fmt=None):
+        """
+        Write the metrics to `path`: JSON when fmt is 'json' or the path ends
+        in .json, Prometheus text format otherwise.
+        """
+        if fmt is None:
+            fmt = 'json' if path.endswith('.json') else 'prometheus'
+        with open(path, 'w') as fh:
+            if fmt == 'json':
+                json.dump(self.as_dict(), fh, indent=2)
+                fh.write('\n')
+            else:
+                fh.write(self.prometheus())
+
+
+class _TimedWriter:
+    """Binary writer proxy that times and counts writes."""
+
+    def __init__(self, out, registry):
+        self._out = out
+        self._registry = registry
+
+    def write(self, data):
+        t0 = time.perf_counter()
+        result = self._out.write(data)
+        self._registry.stage_seconds.observe(time.perf_counter() - t0, 'write')
+        self._registry.output_bytes.inc(len(data))
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._out, name)
+
+
+_registry = None
+_patches = []
+
+
+def _patch(owner, name, make_wrapper):
+    original = getattr(owner, name)
+    _patches.append((owner, name, original))
+    setattr(owner, name, make_wrapper(original))
+
+
+def _patch_item(mapping, key, make_wrapper):
+    original = mapping[key]
+    _patches.append((mapping, key, original))
+    mapping[key] = make_wrapper(original)
+
+
+def _timed(stage, path=None, count=None):
+    """Wrapper factory: time each call as `stage`, optionally counting passwords."""
+    def make(original):
+        registry = _registry
+        observe = registry.stage_seconds.observe
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            t0 = clock()
+            result = original(*args, **kwargs)
+            observe(clock() - t0, stage)
+            if path is not None:
+                registry.passwords.inc(count(args, result), path)
+            return result
+        return wrapper
+    return make
+
+
+def enabled():
+    """Return the active Registry, or None when metrics are disabled."""
+    return _registry
+
+
+def enable(registry=None, generator=None):
+    """
+    Install the instrumentation wrappers.
+
+    Args:
+        registry: Registry to record into (default: a new one)
+        generator: the secure_password_generator module object to
+            instrument in addition to the imported one; pass
+            sys.modules['__main__'] when it runs as a script
+
+    Returns:
+        Registry: the active registry (the existing one if already enabled)
+    """
+    global _registry
+    if _registry is not None:
+        return _registry
+    _registry = registry or Registry()
+
+    import password_denylist
+    import password_output
+    import password_passphrase
+    import password_rng
+    import password_sampler
+    import secure_password_generator as spg
+
+    def urandom(original):
+        def wrapper(n):
+            t0 = time.perf_counter()
+            data = original(n)
+            _registry.stage_seconds.observe(time.perf_counter() - t0, 'urandom')
+            _registry.entropy_bytes.inc(n)
+            return data
+        return wrapper
+
+    _patch(os, 'urandom', urandom)
+    # SystemRandom (and so secrets) reads entropy through random._urandom.
+    _patch(random, '_urandom', urandom)
+    _patch(secrets, 'choice', _timed('choice'))
+    _patch(random, 'shuffle', _timed('shuffle'))
+    _patch(random.SystemRandom, 'shuffle', _timed('shuffle'))
+
+    def get_backend(original):
+        def wrapper(*args, **kwargs):
+            rng = original(*args, **kwargs)
+            _registry.rng_info.set(1, rng.name, 'true' if rng.secure else 'false')
+            return rng
+        return wrapper
+
+    def random_bytes(original):
+        def wrapper(self, n):
+            t0 = time.perf_counter()
+            data = original(self, n)
+            _registry.stage_seconds.observe(time.perf_counter() - t0, 'rng')
+            _registry.rng_bytes.inc(n, self.name)
+            return data
+        return wrapper
+
+    _patch(password_rng, 'get_backend', get_backend)
+    for backend in (password_rng.OSRandom, password_rng.BufferedRandom,
+                    password_rng.SeededRandom):
+        _patch(backend, 'random_bytes', random_bytes)
+
+    def candidate_hook(drawn, accepted):
+        _registry.candidates.inc(drawn)
+        _registry.rejected.inc(drawn - accepted)
+
+    for module in {spg, generator or spg}:
+        _patch(module, 'generate_password',
+               _timed('generate_password', 'single', lambda a, r: 1))
+        _patch(module, '_bulk_batch_python', _timed('bulk_batch'))
+        _patch(module, '_bulk_batch_numpy', _timed('bulk_batch'))
+        _patch(module, 'generate_password_bytes',
+               _timed('bulk', 'bulk', lambda a, r: len(r) // a[1] if r else 0))
+        _patch(module, '_candidate_hook', lambda original: candidate_hook)
+    _patch(password_sampler.ExactSampler, 'unrank',
+           _timed('exact_unrank', 'exact', lambda a, r: 1))
+    _patch(password_passphrase, 'generate_passphrase',
+           _timed('passphrase', 'passphrase', lambda a, r: 1))
+    _patch(password_passphrase, 'generate_passphrases',
+           _timed('passphrase', 'passphrase', lambda a, r: len(r)))
+
+    def contains_digest(original):
+        def wrapper(self, digest):
+            t0 = time.perf_counter()
+            hit = original(self, digest)
+            _registry.stage_seconds.observe(time.perf_counter() - t0, 'denylist')
+            _registry.denylist_lookups.inc()
+            if hit:
+                _registry.denylist_hits.inc()
+            return hit
+        return wrapper
+
+    def might_contain(original):
+        def wrapper(self, digest):
+            passed = original(self, digest)
+            if passed:
+                _registry.denylist_bloom_passes.inc()
+            return passed
+        return wrapper
+
+    _patch(password_denylist.Denylist, 'contains_digest', contains_digest)
+    _patch(password_denylist.Denylist, 'might_contain', might_contain)
+
+    for fmt in list(password_output._RENDERERS):
+        _patch_item(password_output._RENDERERS, fmt, _timed('render'))
+    _patch(password_output, 'open_output',
+           lambda original: lambda *a, **kw: _TimedWriter(original(*a, **kw), _registry))
+    return _registry
+
+
+def disable():
+    """
+    Remove the instrumentation wrappers.
+
+    Returns:
+        Registry or None: the registry that was active
+    """
+    global _registry
+    while _patches:
+        owner, name, original = _patches.pop()
+        if isinstance(owner, dict):
+            owner[name] = original
+        else:
+            setattr(owner, name, original)
+    registry, _registry = _registry, None
+    return registry
+
+
+def profile(func, *args, path, top=PROFILE_TOP, stream=None):
+    """
+    Run func(*args) under cProfile.
+
+    Writes the raw statistics to `path` (load with `python -m pstats`) and a
+    report of the `top` functions by cumulative time to `stream`
+    (default: stderr), including when func raises or exits.
+
+    Returns:
+        the return value of func
+    """
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args)
+    finally:
+        profiler.dump_stats(path)
+        stats = pstats.Stats(profiler, stream=stream or sys.stderr)
+        stats.sort_stats('cumulative').print_stats(top)
@@ -0,0 +1,160 @@
+# password_output.py
+"""
+Streaming output for bulk password generation.
+
+Passwords arrive as an iterator of batches (see
+secure_password_generator.iter_password_batches). Each batch is rendered to
+one string and handed to a large buffered writer, so the cost per password
+is a slice of a C-level join instead of a print() or logging call, and no
+more than one batch is ever held in memory.
+
+Backpressure comes for free: writes to a pipe block once the consumer falls
+behind, which stalls the generator before it produces the next batch. A
+consumer that exits early (``| head``) is treated as a normal end of output.
+
+Formats:
+- plain:  one password per line
+- ndjson: {"password": "..."} per line
+- csv:    header row "password", then one quoted-as-needed row per password
+
+Optional metadata (e.g. the RNG backend that produced the passwords, see
+password_rng) is added to every NDJSON record and as extra CSV columns.
+Plain output has nowhere to carry it.
+"""
+
+import io
+import os
+import sys
+
+FORMATS = ('plain', 'ndjson', 'csv')
+
+# Write buffer for the output stream; large enough that each flush is one
+# big write(2) rather than many small ones.
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+
+def _csv_field(value):
+    if '"' in value or ',' in value:
+        value = '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _render_plain(batch, suffix=''):
+    return '\n'.join(batch) + '\n'
+
+
+def _render_ndjson(batch, suffix=''):
+    # Passwords and passphrases contain no control characters, so '\\' and
+    # '"' are the only characters JSON requires escaping.
+    body = '\n'.join(batch).replace('\\', '\\\\').replace('"', '\\"')
+    end = '"' + suffix + '}\n'
+    return '{"password": "' + body.replace('\n', end + '{"password": "') + end
+
+
+def _render_csv(batch, suffix=''):
+    end = suffix + '\r\n'
+    return end.join(_csv_field(password) for password in batch) + end
+
+
+_RENDERERS = {
+    'plain': _render_plain,
+    'ndjson': _render_ndjson,
+    'csv': _render_csv,
+}
+
+_HEADERS = {
+    'csv': 'password\r\n',
+}
+
+
+def _metadata_suffix(fmt, metadata):
+    """The text each rendered record of `fmt` ends with for `metadata`."""
+    if not metadata:
+        return ''
+    if fmt == 'ndjson':
+        import json
+        return ', ' + json.dumps(metadata)[1:-1]
+    if fmt == 'csv':
+        return ''.join(',' + _csv_field(str(value)) for value in metadata.values())
+    return ''
+
+
+def _header(fmt, metadata):
+    if fmt not in _HEADERS:
+        return None
+    if not metadata:
+        return _HEADERS[fmt]
+    return 'password' + ''.join(',' + _csv_field(name) for name in metadata) + '\r\n'
+
+
+def open_output(path=None, buffer_size=OUTPUT_BUFFER_SIZE):
+    """
+    Open a binary buffered writer for `path`, or for stdout when path is
+    None or '-'.
+
+    The stdout writer wraps a duplicate of the file descriptor so closing it
+    does not close sys.stdout itself.
+    """
+    if path in (None, '-'):
+        sys.stdout.flush()
+        raw = io.FileIO(os.dup(sys.stdout.fileno()), 'wb')
+    else:
+        raw = io.FileIO(path, 'wb')
+    return io.BufferedWriter(raw, buffer_size=buffer_size)
+
+
+def write_passwords(batches, out, fmt='plain', metadata=None):
+    """
+    Render and write batches of passwords to a binary writer.
+
+    Args:
+        batches: iterable of lists of passwords
+        out: binary file-like object (see open_output)
+        fmt: str, one of FORMATS
+        metadata: optional dict of fields written with every NDJSON record
+            and as extra CSV columns (ignored for plain output)
+
+    Returns:
+        int: number of passwords written; if the reader closed the pipe
+        early, the number written before that happened
+    """
+    if fmt not in _RENDERERS:
+        raise ValueError(f"Unknown output format '{fmt}'. Choose from: {', '.join(FORMATS)}.")
+    render = _RENDERERS[fmt]
+    suffix = _metadata_suffix(fmt, metadata)
+    header = _header(fmt, metadata)
+    written = 0
+    try:
+        if header is not None:
+            out.write(header.encode('utf-8'))
+        for batch in batches:
+            if batch:
+                out.write(render(batch, suffix).encode('utf-8'))
+                written += len(batch)
+        out.flush()
+    except BrokenPipeError:
+        # Reader went away; discard whatever is still buffered so the
+        # interpreter does not raise again when it flushes on exit.
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, out.fileno())
+        os.close(devnull)
+    return written
+
+
+def stream_passwords(batches, path=None, fmt='plain', buffer_size=OUTPUT_BUFFER_SIZE,
+                     metadata=None):
+    """
+    Write batches of passwords to `path` (stdout when None or '-'), with
+    optional per-record metadata (see write_passwords).
+
+    Returns:
+        int: number of passwords written
+    """
+    out = open_output(path, buffer_size)
+    try:
+        return write_passwords(batches, out, fmt, metadata)
+    finally:
+        try:
+            out.close()
+        except BrokenPipeError:
+            pass
@@ -0,0 +1,146 @@
+# password_parallel.py
+"""
+Multi-core bulk password generation.
+
+A bulk request is split into batches that run on a process pool. Each
+worker draws its own entropy straight from the OS CSPRNG (os.urandom), or
+from its own BufferedRandom seeded in the worker (see password_rng), so
+there is no shared generator state to seed, lock or fork-duplicate. The
+seeded backend is refused: its output would depend on scheduling.
+
+Results travel through shared memory rather than the pool's result pipe:
+the parent owns a small ring of SharedMemory slots, each large enough for
+one batch of fixed-width passwords. A task is told which slot to fill, the
+worker writes the batch's bytes directly into it and returns only the
+count. At most one task per slot is in flight, which bounds memory and
+applies backpressure to the workers when the consumer is slow.
+
+Usage:
+    batches = iter_password_batches_parallel(10_000_000, 16, charsets, workers=8)
+    stream_passwords(batches, path='out.txt')
+"""
+
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+from secure_password_generator import (
+    BULK_BATCH_SIZE,
+    _check_bulk_args,
+    generate_password_bytes,
+    split_password_bytes,
+)
+
+# Slots per worker: one being filled while the parent drains another.
+SLOTS_PER_WORKER = 2
+
+# Shared memory segments attached in each worker, by name.
+_worker_slots = {}
+
+
+def _attach_slots(names):
+    """Pool initializer: attach every slot once per worker process."""
+    for name in names:
+        _worker_slots[name] = shared_memory.SharedMemory(name=name)
+
+
+def _fill_slot(name, n, length, charsets, use_numpy, denylist, rng):
+    """Worker task: generate `n` passwords into shared memory slot `name`."""
+    flat = generate_password_bytes(n, length, charsets, use_numpy=use_numpy, denylist=denylist,
+                                   rng=rng)
+    _worker_slots[name].buf[:len(flat)] = flat
+    return n
+
+
+def default_workers():
+    """Number of CPUs this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def iter_password_batches_parallel(count, length, charsets, workers=None, ordered=True,
+                                   batch_size=BULK_BATCH_SIZE, use_numpy=None, denylist=None,
+                                   rng=None):
+    """
+    Generate `count` passwords on a process pool, yielding lists of strings.
+
+    Args:
+        count: int, total number of passwords
+        length: int, desired password length
+        charsets: dict, charsets for each type
+        workers: int or None, pool size (default: available CPUs)
+        ordered: bool, yield batches in submission order (True) or as soon
+            as any worker finishes one (False)
+        batch_size: int, passwords per task and per yielded batch
+        use_numpy: see secure_password_generator.generate_passwords
+        denylist: optional Denylist; each worker reopens it by path and
+            regenerates any denylisted passwords
+        rng: RandomBackend or None (the OS CSPRNG); a BufferedRandom is
+            reseeded in every worker, and the seeded backend is rejected
+
+    Returns:
+        iterator: lists of generated passwords
+
+    Raises:
+        ValueError: raised eagerly for invalid arguments
+    """
+    _check_bulk_args(count, length, charsets)
+    if batch_size < 1:
+        raise ValueError(f"Batch size must be positive, got {batch_size}.")
+    workers = workers or default_workers()
+    if workers < 1:
+        raise ValueError(f"Worker count must be positive, got {workers}.")
+    if rng is not None and not rng.secure:
+        raise ValueError(f"The {rng.name} RNG backend cannot be used with multiple workers.")
+
+    def batches():
+        sizes = deque()
+        remaining = count
+        while remaining > 0:
+            sizes.append(min(batch_size, remaining))
+            remaining -= sizes[-1]
+        if not sizes:
+            return
+
+        nslots = min(len(sizes), workers * SLOTS_PER_WORKER)
+        slots = [shared_memory.SharedMemory(create=True, size=batch_size * length)
+                 for _ in range(nslots)]
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach_slots,
+                                     initargs=([slot.name for slot in slots],)) as pool:
+                free = deque(slots)
+                pending = deque()
+
+                def submit():
+                    slot = free.popleft()
+                    n = sizes.popleft()
+                    future = pool.submit(_fill_slot, slot.name, n, length, charsets, use_numpy,
+                                         denylist, rng)
+                    pending.append((future, slot))
+
+                while sizes and free:
+                    submit()
+                while pending:
+                    if ordered:
+                        future, slot = pending.popleft()
+                        future.result()
+                    else:
+                        done, _ = wait([f for f, _ in pending], return_when=FIRST_COMPLETED)
+                        index = next(i for i, (f, _) in enumerate(pending) if f in done)
+                        future, slot = pending[index]
+                        del pending[index]
+                    n = future.result()
+                    flat = bytes(slot.buf[:n * length])
+                    free.append(slot)
+                    if sizes:
+                        submit()
+                    yield split_password_bytes(flat, length)
+        finally:
+            for slot in slots:
+                slot.close()
+                slot.unlink()
+
+    return batches()
@@ -0,0 +1,307 @@
+# password_passphrase.py
+"""
+Diceware-style passphrases drawn from an indexed, memory-mapped wordlist.
+
+A plain wordlist (one word per line; diceware lists with a leading roll
+column such as "11111<TAB>abacus" are accepted too) is compiled once into
+a binary index:
+
+    header   magic b'PWWL', format version, word count N   (16 bytes)
+    offsets  N + 1 little-endian uint64 byte offsets
+    words    the distinct words, UTF-8, concatenated
+
+Opening an index memory-maps it, so startup does not read or split the
+list whatever its size, and fetching word i is two offset reads and one
+slice. Words are drawn uniformly with the RNG backend's randbelow (the OS
+CSPRNG by default, see password_rng), or in bulk from block-read entropy
+with unbiased rejection sampling. Each word contributes
+log2(N) bits; passphrase_entropy_bits reports the total.
+
+Usage:
+    python password_passphrase.py compile eff_large_wordlist.txt eff.wl
+    python password_passphrase.py generate eff.wl --words 6 --count 10
+
+    wordlist = open_wordlist('eff.wl')
+    generate_passphrase(wordlist, words=6)   # 'unveiled-cobweb-...'
+"""
+
+import argparse
+import math
+import mmap
+import os
+import struct
+import sys
+import unicodedata
+
+from password_rng import default_backend
+
+WORDLIST_MAGIC = b'PWWL'
+WORDLIST_VERSION = 1
+# magic, version, reserved, word count
+WORDLIST_HEADER = struct.Struct('<4sHHQ')
+OFFSET = struct.Struct('<Q')
+
+DEFAULT_WORDS = 6
+DEFAULT_SEPARATOR = '-'
+# Largest single entropy read when drawing word indices in bulk.
+ENTROPY_BLOCK_SIZE = 64 * 1024
+
+
+class Wordlist:
+    """
+    Read-only view of a compiled wordlist index.
+
+    Supports len() and integer indexing; pickles as its path so worker
+    processes reopen the same mapping.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count = WORDLIST_HEADER.unpack_from(self._map, 0)
+        if magic != WORDLIST_MAGIC:
+            raise ValueError(f"{path} is not a compiled wordlist.")
+        if version != WORDLIST_VERSION:
+            raise ValueError(f"{path} has unsupported wordlist version {version}.")
+        if count < 2:
+            raise ValueError(f"{path} must contain at least two words.")
+        self.count = count
+        self._offsets = WORDLIST_HEADER.size
+        self._words = WORDLIST_HEADER.size + (count + 1) * OFFSET.size
+
+    def __reduce__(self):
+        return open_wordlist, (self.path,)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(f"word index {index} out of range")
+        start, end = struct.unpack_from('<QQ', self._map, self._offsets + index * OFFSET.size)
+        return self._map[self._words + start:self._words + end].decode('utf-8')
+
+    @property
+    def bits_per_word(self):
+        return math.log2(self.count)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+_open_wordlists = {}
+
+
+def open_wordlist(path):
+    """Open (or reuse this process's already open) compiled wordlist."""
+    path = os.path.abspath(path)
+    if path not in _open_wordlists:
+        _open_wordlists[path] = Wordlist(path)
+    return _open_wordlists[path]
+
+
+def compile_wordlist(source, index_path):
+    """
+    Compile a text wordlist into an index file.
+
+    Blank lines and duplicates are dropped (duplicates would silently lower
+    the entropy per word); for lines with several fields, such as diceware
+    'roll<TAB>word' lists, the last field is the word.
+
+    Returns:
+        int: number of distinct words written
+    """
+    seen = set()
+    words = []
+    with open(source, encoding='utf-8') as fh:
+        for line in fh:
+            fields = line.split()
+            if not fields:
+                continue
+            word = fields[-1]
+            if word not in seen:
+                seen.add(word)
+                words.append(word.encode('utf-8'))
+    if len(words) < 2:
+        raise ValueError(f"{source} must contain at least two distinct words.")
+
+    with open(index_path, 'wb', buffering=1 << 20) as out:
+        out.write(WORDLIST_HEADER.pack(WORDLIST_MAGIC, WORDLIST_VERSION, 0, len(words)))
+        position = 0
+        out.write(OFFSET.pack(0))
+        for word in words:
+            position += len(word)
+            out.write(OFFSET.pack(position))
+        for word in words:
+            out.write(word)
+    return len(words)
+
+
+def passphrase_entropy_bits(wordlist, words=DEFAULT_WORDS):
+    """Entropy, in bits, of a passphrase of `words` uniform words."""
+    return words * math.log2(len(wordlist))
+
+
+def _check_words(words):
+    if words < 1:
+        raise ValueError("A passphrase needs at least one word.")
+
+
+def generate_passphrase(wordlist, words=DEFAULT_WORDS, separator=DEFAULT_SEPARATOR,
+                        capitalize=False, denylist=None, rng=None):
+    """
+    Generate one passphrase.
+
+    Args:
+        wordlist: Wordlist (see open_wordlist)
+        words: int, number of words
+        separator: str placed between words
+        capitalize: bool, capitalize the first letter of each word
+        denylist: optional Denylist; denylisted passphrases are redrawn
+        rng: RandomBackend (see password_rng); default the OS CSPRNG
+
+    Returns:
+        str: the passphrase
+    """
+    _check_words(words)
+    if rng is None:
+        rng = default_backend()
+
+    def draw():
+        picked = [wordlist[rng.randbelow(wordlist.count)] for _ in range(words)]
+        if capitalize:
+            picked = [w[:1].upper() + w[1:] for w in picked]
+        return separator.join(picked)
+
+    if denylist is not None:
+        from password_denylist import draw_allowed
+        return draw_allowed(draw, denylist)
+    return draw()
+
+
+def _random_indices(count, n, rng, use_numpy=None):
+    """`count` uniform indices in [0, n) from block-read 32-bit entropy."""
+    limit = (1 << 32) - (1 << 32) % n
+    np = None
+    if use_numpy is not False:
+        try:
+            import numpy as np
+        except ImportError:
+            if use_numpy:
+                raise
+    out = []
+    while len(out) < count:
+        want = (count - len(out)) * 4 * (1 << 32) // limit + 64
+        block = rng.random_bytes(min(ENTROPY_BLOCK_SIZE, want - want % 4))
+        if np is not None:
+            values = np.frombuffer(block, dtype='<u4')
+            out.extend((values[values < limit] % n).tolist())
+        else:
+            values = struct.unpack(f'<{len(block) // 4}I', block)
+            out.extend(v % n for v in values if v < limit)
+    return out[:count]
+
+
+def generate_passphrases(n, wordlist, words=DEFAULT_WORDS, separator=DEFAULT_SEPARATOR,
+                         capitalize=False, use_numpy=None, denylist=None, rng=None):
+    """
+    Generate `n` passphrases with word indices drawn from block-read entropy.
+
+    Arguments are as for generate_passphrase; use_numpy forces (True) or
+    disables (False) vectorized rejection sampling of the indices.
+
+    Returns:
+        list: generated passphrases
+    """
+    _check_words(words)
+    if rng is None:
+        rng = default_backend()
+    indices = _random_indices(n * words, wordlist.count, rng, use_numpy)
+    phrases = []
+    for i in range(0, len(indices), words):
+        picked = [wordlist[j] for j in indices[i:i + words]]
+        if capitalize:
+            picked = [w[:1].upper() + w[1:] for w in picked]
+        phrase = separator.join(picked)
+        if denylist is not None and phrase in denylist:
+            phrase = generate_passphrase(wordlist, words, separator, capitalize, denylist, rng)
+        phrases.append(phrase)
+    return phrases
+
+
+def iter_passphrase_batches(count, wordlist, words=DEFAULT_WORDS, separator=DEFAULT_SEPARATOR,
+                            capitalize=False, batch_size=65536, denylist=None, rng=None):
+    """Lazily generate `count` passphrases as lists of at most `batch_size`."""
+    _check_words(words)
+
+    def batches():
+        remaining = count
+        while remaining > 0:
+            k = min(batch_size, remaining)
+            yield generate_passphrases(k, wordlist, words, separator, capitalize,
+                                       denylist=denylist, rng=rng)
+            remaining -= k
+
+    return batches()
+
+
+def separator_arg(value):
+    """
+    argparse type for --separator: the output formats are line-oriented,
+    so control characters and line or paragraph separators are rejected.
+    """
+    for char in value:
+        if unicodedata.category(char) in ('Cc', 'Zl', 'Zp'):
+            raise argparse.ArgumentTypeError(
+                f"separator must not contain control or line-break characters ({char!r}).")
+    return value
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Diceware passphrase generator')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('compile', help='Compile a text wordlist into an index')
+    build.add_argument('source', help='Wordlist, one word per line')
+    build.add_argument('index', help='Output index path')
+    gen = sub.add_parser('generate', help='Generate passphrases')
+    gen.add_argument('index', help='Compiled wordlist')
+    gen.add_argument('--words', type=int, default=DEFAULT_WORDS,
+                     help=f'Words per passphrase (default: {DEFAULT_WORDS})')
+    gen.add_argument('--separator', type=separator_arg, default=DEFAULT_SEPARATOR,
+                     help=f"Word separator (default: '{DEFAULT_SEPARATOR}')")
+    gen.add_argument('--capitalize', action='store_true', help='Capitalize each word')
+    gen.add_argument('--count', type=int, default=1, help='Number of passphrases (default: 1)')
+    gen.add_argument('--format', choices=('plain', 'ndjson', 'csv'), default='plain',
+                     help='Output format (default: plain)')
+    gen.add_argument('-o', '--output', default=None, help='Write to this file instead of stdout')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    try:
+        if args.command == 'compile':
+            count = compile_wordlist(args.source, args.index)
+            print(f"Compiled {count} words into {args.index} "
+                  f"({math.log2(count):.2f} bits per word)", file=sys.stderr)
+            return
+        from password_output import stream_passwords
+        wordlist = open_wordlist(args.index)
+        stream_passwords(
+            iter_passphrase_batches(args.count, wordlist, args.words, args.separator,
+                                    args.capitalize),
+            path=args.output,
+            fmt=args.format
+        )
+        print(f"Entropy: {passphrase_entropy_bits(wordlist, args.words):.1f} bits "
+              f"({args.words} words from {len(wordlist)})", file=sys.stderr)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+# password_policy.py
+"""
+Compiled, cached password policies.
+
+A PasswordPolicy is the immutable, precomputed form of a set of character
+classes (the dict returned by build_charsets, or the include_* flags the
+generator scripts take). Compiling one joins the alphabet, encodes it,
+builds the byte-translation and rejection tables used for unbiased bulk
+sampling and a per-character class bitmask; compiled policies are memoized
+in a bounded LRU cache keyed on the policy's contents, so callers that
+generate millions of passwords across a handful of policies pay that setup
+once per policy.
+
+Usage:
+    policy = compile_policy(include_symbols=False)
+    policy.chars        # 'ABC...xyz0123456789'
+    policy.classes      # ('ABC...', 'abc...', '0123456789')
+"""
+
+from functools import lru_cache
+
+# Maximum number of distinct compiled policies kept alive.
+POLICY_CACHE_SIZE = 256
+
+# Standard character classes, in the order every generator has always used.
+# These are string.ascii_uppercase, ascii_lowercase, digits and punctuation,
+# spelled out because importing string pulls in re and roughly doubles the
+# CLI's cold-start time.
+CHARACTER_CLASSES = (
+    ('uppercase', 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'),
+    ('lowercase', 'abcdefghijklmnopqrstuvwxyz'),
+    ('digits', '0123456789'),
+    ('symbols', '!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~'),
+)
+
+
+class PasswordPolicy:
+    """
+    Immutable, hashable compiled policy.
+
+    Attributes:
+        key: tuple of (name, chars) pairs; the policy's identity
+        names: tuple of class names
+        classes: tuple of class strings
+        chars: str, all classes joined (the sampling alphabet)
+        alphabet: bytes, chars encoded as ASCII
+        class_bytes: tuple of bytes, each class encoded as ASCII
+        class_mask: bytes, for alphabet index i a bitmask of the classes
+            alphabet[i] belongs to (bit j set for class j)
+        full_mask: int, bitmask with every class bit set
+        limit: int, rejection threshold; random bytes >= limit are dropped
+            so that reduction modulo len(alphabet) is unbiased
+        reject: bytes, every byte value >= limit (bytes.translate delete set)
+        byte_table: bytes, 256-entry table mapping a random byte b < limit
+            directly to alphabet[b % len(alphabet)]
+    """
+
+    __slots__ = (
+        'key', 'names', 'classes', 'chars', 'alphabet', 'class_bytes',
+        'class_mask', 'full_mask', 'limit', 'reject', 'byte_table', '_hash',
+    )
+
+    def __init__(self, key):
+        key = tuple((str(name), str(chars)) for name, chars in key)
+        names = tuple(name for name, _ in key)
+        classes = tuple(chars for _, chars in key)
+        chars = ''.join(classes)
+        alphabet = chars.encode('ascii')
+        if len(alphabet) > 256:
+            raise ValueError(f"Alphabet of {len(alphabet)} characters exceeds 256.")
+        if len(classes) > 8:
+            raise ValueError(f"At most 8 character classes are supported, got {len(classes)}.")
+
+        masks = []
+        for ch in chars:
+            masks.append(sum(1 << j for j, cls in enumerate(classes) if ch in cls))
+        size = len(alphabet)
+        limit = 256 - 256 % size if size else 0
+
+        setattr_ = object.__setattr__
+        setattr_(self, 'key', key)
+        setattr_(self, 'names', names)
+        setattr_(self, 'classes', classes)
+        setattr_(self, 'chars', chars)
+        setattr_(self, 'alphabet', alphabet)
+        setattr_(self, 'class_bytes', tuple(cls.encode('ascii') for cls in classes))
+        setattr_(self, 'class_mask', bytes(masks))
+        setattr_(self, 'full_mask', (1 << len(classes)) - 1)
+        setattr_(self, 'limit', limit)
+        setattr_(self, 'reject', bytes(range(limit, 256)))
+        setattr_(self, 'byte_table',
+                 bytes(alphabet[b % size] if size else 0 for b in range(256)))
+        setattr_(self, '_hash', hash(key))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if not isinstance(other, PasswordPolicy):
+            return NotImplemented
+        return self.key == other.key
+
+    def __repr__(self):
+        return f"PasswordPolicy({', '.join(self.names) or 'empty'})"
+
+    def __reduce__(self):
+        # Rebuild through the cache so worker processes share one instance.
+        return policy_from_key, (self.key,)
+
+    def __len__(self):
+        """Number of character classes."""
+        return len(self.classes)
+
+    def as_charsets(self):
+        """Return the policy as a fresh build_charsets-style dict."""
+        return dict(self.key)
+
+
+@lru_cache(maxsize=POLICY_CACHE_SIZE)
+def policy_from_key(key):
+    """Compile (or fetch from cache) the policy for a tuple of (name, chars) pairs."""
+    return PasswordPolicy(key)
+
+
+def compile_policy(include_uppercase=True, include_lowercase=True,
+                   include_digits=True, include_symbols=True):
+    """Compile (or fetch from cache) the policy for the standard class flags."""
+    flags = (include_uppercase, include_lowercase, include_digits, include_symbols)
+    return policy_from_key(tuple(cls for cls, on in zip(CHARACTER_CLASSES, flags) if on))
+
+
+def as_policy(charsets):
+    """
+    Return `charsets` as a compiled PasswordPolicy.
+
+    Accepts a PasswordPolicy (returned unchanged) or a build_charsets-style
+    dict, whose compiled form is looked up in the policy cache.
+    """
+    if isinstance(charsets, PasswordPolicy):
+        return charsets
+    return policy_from_key(tuple(charsets.items()))
+
+
+@lru_cache(maxsize=POLICY_CACHE_SIZE)
+def coverage_probability(policy, length):
+    """
+    Probability that `length` uniform draws from the policy alphabet hit
+    every class at least once (inclusion-exclusion over missed classes).
+    """
+    sizes = [len(cls) for cls in policy.classes]
+    total = sum(sizes)
+    prob = 0.0
+    for mask in range(1 << len(sizes)):
+        missed = sum(size for i, size in enumerate(sizes) if mask >> i & 1)
+        sign = -1 if bin(mask).count('1') % 2 else 1
+        prob += sign * ((total - missed) / total) ** length
+    return prob
@@ -0,0 +1,319 @@
+# password_provision.py
+"""
+Batch password provisioning from a CSV of accounts.
+
+Each input row describes one account and its own policy; the job adds a
+password to every row. Instead of one generator invocation per row, the
+input is streamed in chunks. Within a chunk, rows are grouped by their
+normalized policy, each policy is compiled once (compiled policies and
+samplers are cached across chunks) and every group is generated with one
+bulk call. The chunk is then written in the original row order.
+
+Input columns (all optional except a header row; other columns are copied
+through unchanged):
+
+    length        password length (default: --length)
+    exclude       classes to leave out, e.g. "symbols" or "uppercase;symbols"
+    min_uppercase, min_lowercase, min_digits, min_symbols
+                  per-class minimums (default 1 for each included class)
+    max_repeat    longest allowed run of one character
+
+Output columns are the input columns plus `password` and `error`; a row
+whose policy is invalid gets an empty password and the reason in `error`
+rather than stopping the job.
+
+After every chunk the output is flushed and fsynced and a checkpoint (rows
+done, output size, input identity) is replaced atomically next to the
+output. An interrupted run started again with --resume truncates the
+output to the checkpointed size and continues with the next row. The
+output file is created readable by its owner only.
+
+Usage:
+    python password_provision.py accounts.csv -o provisioned.csv
+    python password_provision.py accounts.csv -o provisioned.csv --resume
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from functools import lru_cache
+from itertools import islice
+
+from password_policy import CHARACTER_CLASSES, POLICY_CACHE_SIZE, compile_policy
+from password_sampler import compile_sampler, normalize_minimums
+from secure_password_generator import generate_passwords
+
+DEFAULT_LENGTH = 16
+# Same floor as the secure_password_generator CLI.
+MIN_LENGTH = 4
+# Rows generated, written and checkpointed together.
+CHUNK_ROWS = 65536
+
+CLASS_NAMES = tuple(name for name, _ in CHARACTER_CLASSES)
+POLICY_COLUMNS = ('length', 'exclude') + tuple(f'min_{name}' for name in CLASS_NAMES) + (
+    'max_repeat',)
+OUTPUT_COLUMNS = ('password', 'error')
+
+
+def _int_field(row, column, default=None):
+    text = row.get(column, '').strip()
+    if not text:
+        return default
+    try:
+        return int(text)
+    except ValueError:
+        raise ValueError(f"{column} must be an integer, got '{text}'.") from None
+
+
+def row_policy(row, default_length=DEFAULT_LENGTH):
+    """
+    Normalize one row's policy columns to a hashable key.
+
+    Rows whose minimums are all the default of one per included class and
+    that set no repeat limit share the key of the plain bulk policy, so
+    they are generated together.
+
+    Args:
+        row: dict of column name to value
+        default_length: int, length for rows without a length column
+
+    Returns:
+        tuple: (length, include flags, minimums tuple or None, max_repeat)
+
+    Raises:
+        ValueError: if the row's policy is invalid or unsatisfiable
+    """
+    return _policy_key(tuple(row.get(column, '') for column in POLICY_COLUMNS), default_length)
+
+
+@lru_cache(maxsize=POLICY_CACHE_SIZE)
+def _policy_key(values, default_length):
+    """row_policy for the raw POLICY_COLUMNS values; accounts mostly share a few."""
+    row = dict(zip(POLICY_COLUMNS, values))
+    length = _int_field(row, 'length', default_length)
+    if length < MIN_LENGTH:
+        raise ValueError(f"Password length must be at least {MIN_LENGTH}, got {length}.")
+
+    excluded = set(row.get('exclude', '').replace(';', ' ').replace(',', ' ')
+                   .replace('|', ' ').lower().split())
+    unknown = excluded - set(CLASS_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown character classes in exclude: {', '.join(sorted(unknown))}.")
+    flags = tuple(name not in excluded for name in CLASS_NAMES)
+    policy = compile_policy(*flags)
+    if not policy:
+        raise ValueError("No character types selected.")
+
+    minimums = {}
+    for name in CLASS_NAMES:
+        value = _int_field(row, f'min_{name}')
+        if value is None:
+            continue
+        if name in excluded:
+            if value > 0:
+                raise ValueError(f"min_{name} is set but {name} is excluded.")
+            continue
+        minimums[name] = value
+    max_repeat = _int_field(row, 'max_repeat')
+
+    resolved = normalize_minimums(policy, minimums)
+    if max_repeat is None and all(m == 1 for m in resolved):
+        if length < len(policy):
+            raise ValueError(
+                f"Password length ({length}) is less than number "
+                f"of selected character types ({len(policy)})."
+            )
+        return length, flags, None, None
+    # Validate (and cache) the sampler now so errors are reported per row.
+    compile_sampler(length, policy, resolved, max_repeat)
+    return length, flags, resolved, max_repeat
+
+
+def generate_for_policy(key, n, denylist=None):
+    """Generate `n` passwords for a key returned by row_policy."""
+    length, flags, minimums, max_repeat = key
+    policy = compile_policy(*flags)
+    if minimums is None:
+        return generate_passwords(n, length, policy, denylist=denylist)
+    sampler = compile_sampler(length, policy, minimums, max_repeat)
+    return [sampler.sample(denylist) for _ in range(n)]
+
+
+def provision_chunk(rows, default_length=DEFAULT_LENGTH, denylist=None):
+    """
+    Fill in passwords for a chunk of rows, grouped by policy.
+
+    Returns:
+        list: (password, error) per row, in input order
+    """
+    return _provision_values(
+        [tuple(row.get(column, '') for column in POLICY_COLUMNS) for row in rows],
+        default_length, denylist)
+
+
+def _provision_values(policy_values, default_length, denylist):
+    """provision_chunk for rows given as POLICY_COLUMNS value tuples."""
+    results = [None] * len(policy_values)
+    groups = {}
+    for i, values in enumerate(policy_values):
+        try:
+            key = _policy_key(values, default_length)
+        except ValueError as e:
+            results[i] = ('', str(e))
+            continue
+        groups.setdefault(key, []).append(i)
+    for key, indices in groups.items():
+        for i, password in zip(indices, generate_for_policy(key, len(indices), denylist)):
+            results[i] = (password, '')
+    return results
+
+
+def _input_identity(path):
+    st = os.stat(path)
+    return {'input': os.path.abspath(path), 'input_size': st.st_size,
+            'input_mtime_ns': st.st_mtime_ns}
+
+
+def _load_checkpoint(path, input_path):
+    with open(path) as fh:
+        checkpoint = json.load(fh)
+    identity = _input_identity(input_path)
+    if any(checkpoint.get(k) != v for k, v in identity.items()):
+        raise ValueError(f"{input_path} has changed since checkpoint {path} was written.")
+    return checkpoint
+
+
+def _save_checkpoint(path, state):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as fh:
+        json.dump(state, fh)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+def provision(input_path, output_path, default_length=DEFAULT_LENGTH, chunk_rows=CHUNK_ROWS,
+              checkpoint_path=None, resume=False, denylist=None):
+    """
+    Run the provisioning job.
+
+    Args:
+        input_path: str, CSV of accounts with a header row
+        output_path: str, CSV to write
+        default_length: int, length for rows without one
+        chunk_rows: int, rows per generation/checkpoint chunk
+        checkpoint_path: str or None (default: output_path + '.checkpoint')
+        resume: bool, continue from an existing checkpoint
+        denylist: optional Denylist
+
+    Returns:
+        dict: {'rows': rows written in total, 'errors': rows with an error
+        in this run, 'resumed_from': rows skipped because already done}
+
+    Raises:
+        ValueError: for a bad header, or a checkpoint that does not match
+    """
+    if chunk_rows < 1:
+        raise ValueError(f"Chunk size must be positive, got {chunk_rows}.")
+    checkpoint_path = checkpoint_path or output_path + '.checkpoint'
+    if os.path.exists(checkpoint_path) and not resume:
+        raise ValueError(
+            f"Checkpoint {checkpoint_path} exists; pass --resume to continue "
+            "or delete it to start over."
+        )
+
+    with open(input_path, newline='', encoding='utf-8') as infile:
+        reader = csv.reader(infile)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError(f"{input_path} is empty; a header row is required.")
+        clash = set(header) & set(OUTPUT_COLUMNS)
+        if clash:
+            raise ValueError(f"Input already has column(s): {', '.join(sorted(clash))}.")
+        positions = [header.index(column) if column in header else None
+                     for column in POLICY_COLUMNS]
+
+        state = dict(_input_identity(input_path), rows=0, offset=0)
+        done = 0
+        if resume and os.path.exists(checkpoint_path):
+            state = _load_checkpoint(checkpoint_path, input_path)
+            done = state['rows']
+            for _ in islice(reader, done):
+                pass
+            fd = os.open(output_path, os.O_WRONLY)
+            os.ftruncate(fd, state['offset'])
+            os.lseek(fd, state['offset'], os.SEEK_SET)
+        else:
+            fd = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+
+        errors = 0
+        with os.fdopen(fd, 'wb') as out:
+            if state['offset'] == 0:
+                header_line = io.StringIO()
+                csv.writer(header_line).writerow(header + list(OUTPUT_COLUMNS))
+                state['offset'] += out.write(header_line.getvalue().encode('utf-8'))
+
+            while True:
+                chunk = list(islice(reader, chunk_rows))
+                if not chunk:
+                    break
+                results = _provision_values(
+                    [tuple(values[i] if i is not None and i < len(values) else ''
+                           for i in positions) for values in chunk],
+                    default_length, denylist)
+
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for values, (password, error) in zip(chunk, results):
+                    writer.writerow(values + [password, error])
+                    errors += bool(error)
+                state['offset'] += out.write(buffer.getvalue().encode('utf-8'))
+                out.flush()
+                os.fsync(out.fileno())
+                state['rows'] += len(chunk)
+                _save_checkpoint(checkpoint_path, state)
+
+    if os.path.exists(checkpoint_path):
+        os.unlink(checkpoint_path)
+    return {'rows': state['rows'], 'errors': errors, 'resumed_from': done}
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Provision passwords for a CSV of accounts')
+    parser.add_argument('input', help='CSV of accounts with a header row')
+    parser.add_argument('-o', '--output', required=True, help='Output CSV')
+    parser.add_argument('-l', '--length', type=int, default=DEFAULT_LENGTH,
+                        help=f'Length for rows without a length column (default: {DEFAULT_LENGTH})')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help=f'Rows per generation and checkpoint step (default: {CHUNK_ROWS})')
+    parser.add_argument('--checkpoint', default=None,
+                        help='Checkpoint file (default: OUTPUT.checkpoint)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted run from its checkpoint')
+    parser.add_argument('--denylist', default=None, metavar='INDEX',
+                        help='Regenerate any password found in this breached-hash index')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    try:
+        denylist = None
+        if args.denylist:
+            from password_denylist import open_denylist
+            denylist = open_denylist(args.denylist)
+        result = provision(args.input, args.output, args.length, args.chunk_rows,
+                           args.checkpoint, args.resume, denylist)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Provisioned {result['rows']} rows ({result['errors']} with errors, "
+          f"{result['resumed_from']} already done)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
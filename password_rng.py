@@ -0,0 +1,246 @@
+# password_rng.py
+"""
+Pluggable random number backends for the password generators.
+
+Every generator draws its randomness from a backend: random_bytes(n) feeds
+the block-buffered bulk paths, randbelow / choice / shuffle the
+per-character ones. Three backends exist:
+
+- os (OSRandom, the default): os.urandom and the secrets module. It is the
+  only backend allowed for real credentials; the provisioning job and the
+  password service always use it.
+- buffered (BufferedRandom): a CSPRNG seeded once with 32 bytes from the
+  OS. Output is made in BUFFER_SIZE blocks by SHAKE-256 keyed with the
+  current key, with fast key erasure as in ChaCha20-based arc4random: the
+  first 32 bytes of every block become the next key and are never output,
+  so a later compromise of the state does not reveal earlier output.
+  Small draws cost a slice instead of a getrandom(2) call. A forked child
+  or a pickled copy sent to a worker process reseeds itself, so two
+  processes never share a stream.
+- seeded (SeededRandom): random.Random seeded with an explicit integer.
+  Fast and reproducible for load-test fixtures, and NOT cryptographically
+  secure: anyone who knows or guesses the seed can regenerate the output.
+
+Backends are chosen with get_backend(name, seed); nothing picks a
+non-default backend implicitly. A backend's `name` and `secure` flag are
+what the CLI records in the metrics (passgen_rng_info) and in the output
+metadata.
+
+Usage:
+    python secure_password_generator.py --count 1000000 --rng buffered -o out.txt
+    python secure_password_generator.py --count 1000000 --rng seeded --seed 42 \\
+        --format ndjson -o fixtures.ndjson
+
+    rng = get_backend('seeded', seed=42)
+    generate_passwords(1000, 16, policy, rng=rng)
+"""
+
+import os
+
+BACKENDS = ('os', 'buffered', 'seeded')
+DEFAULT_BACKEND = 'os'
+
+# Bytes generated per BufferedRandom refill.
+BUFFER_SIZE = 64 * 1024
+# BufferedRandom key size, in bytes.
+KEY_SIZE = 32
+
+
+class RandomBackend:
+    """
+    Interface shared by the backends.
+
+    Subclasses provide random_bytes(); randbelow, choice and shuffle are
+    built on it with rejection sampling, so they are unbiased for any
+    byte source.
+    """
+
+    name = None
+    secure = False
+
+    def random_bytes(self, n):
+        """Return `n` random bytes."""
+        raise NotImplementedError
+
+    def randbelow(self, n):
+        """Return a uniform int in [0, n)."""
+        if n <= 0:
+            raise ValueError(f"Upper bound must be positive, got {n}.")
+        if n <= 256:
+            # One byte per attempt: the common case of picking a character.
+            limit = 256 - 256 % n
+            while True:
+                value = self.random_bytes(1)[0]
+                if value < limit:
+                    return value % n
+        bits = n.bit_length()
+        size = (bits + 7) // 8
+        shift = size * 8 - bits
+        while True:
+            value = int.from_bytes(self.random_bytes(size), 'big') >> shift
+            if value < n:
+                return value
+
+    def choice(self, seq):
+        """Return a uniform element of a non-empty sequence."""
+        if not seq:
+            raise IndexError('Cannot choose from an empty sequence')
+        return seq[self.randbelow(len(seq))]
+
+    def shuffle(self, x):
+        """Shuffle list `x` in place (Fisher-Yates)."""
+        randbelow = self.randbelow
+        for i in range(len(x) - 1, 0, -1):
+            j = randbelow(i + 1)
+            x[i], x[j] = x[j], x[i]
+
+    def describe(self):
+        """Metadata recorded with output generated by this backend."""
+        return {'rng': self.name}
+
+    def __repr__(self):
+        return f'{type(self).__name__}()'
+
+
+class OSRandom(RandomBackend):
+    """The OS CSPRNG, through os.urandom and the secrets module."""
+
+    name = 'os'
+    secure = True
+
+    def __init__(self):
+        import random
+        import secrets
+        # Module and instance attributes are looked up per call so that
+        # password_metrics' wrappers around them still see every draw.
+        self._secrets = secrets
+        self._system = random.SystemRandom()
+
+    def random_bytes(self, n):
+        return os.urandom(n)
+
+    def randbelow(self, n):
+        if n <= 0:
+            raise ValueError(f"Upper bound must be positive, got {n}.")
+        return self._secrets.randbelow(n)
+
+    def choice(self, seq):
+        return self._secrets.choice(seq)
+
+    def shuffle(self, x):
+        self._system.shuffle(x)
+
+    def __reduce__(self):
+        return OSRandom, ()
+
+
+class BufferedRandom(RandomBackend):
+    """Buffered fast-key-erasure CSPRNG, seeded once from the OS."""
+
+    name = 'buffered'
+    secure = True
+
+    def __init__(self, buffer_size=BUFFER_SIZE):
+        import threading
+        if buffer_size < 1:
+            raise ValueError(f"Buffer size must be positive, got {buffer_size}.")
+        self._buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._reseed()
+
+    def _reseed(self):
+        self._pid = os.getpid()
+        self._key = os.urandom(KEY_SIZE)
+        self._buffer = b''
+        self._pos = 0
+
+    def _generate(self, n):
+        """Return `n` fresh bytes and replace the key."""
+        from hashlib import shake_256
+        block = shake_256(self._key).digest(KEY_SIZE + n)
+        self._key = block[:KEY_SIZE]
+        return block[KEY_SIZE:]
+
+    def random_bytes(self, n):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reseed()
+            if n >= self._buffer_size:
+                return self._generate(n)
+            start = self._pos
+            if n > len(self._buffer) - start:
+                self._buffer = self._generate(self._buffer_size)
+                start = 0
+            self._pos = start + n
+            return self._buffer[start:start + n]
+
+    def __reduce__(self):
+        # A copy must never continue this stream: it starts its own.
+        return BufferedRandom, (self._buffer_size,)
+
+
+class SeededRandom(RandomBackend):
+    """Reproducible, NOT cryptographically secure; for test fixtures only."""
+
+    name = 'seeded'
+    secure = False
+
+    def __init__(self, seed):
+        import random
+        if not isinstance(seed, int):
+            raise ValueError(f"Seed must be an integer, got {seed!r}.")
+        self.seed = seed
+        self._random = random.Random(seed)
+
+    def random_bytes(self, n):
+        return self._random.getrandbits(n * 8).to_bytes(n, 'little') if n else b''
+
+    def describe(self):
+        return {'rng': self.name, 'seed': self.seed}
+
+    def __repr__(self):
+        return f'SeededRandom({self.seed})'
+
+    def __reduce__(self):
+        raise TypeError(
+            "The seeded backend cannot be shared between processes; "
+            "its output would no longer be reproducible."
+        )
+
+
+_default = None
+
+
+def default_backend():
+    """Return the shared OSRandom instance used when no backend is given."""
+    global _default
+    if _default is None:
+        _default = OSRandom()
+    return _default
+
+
+def get_backend(name=DEFAULT_BACKEND, seed=None):
+    """
+    Select a backend by name.
+
+    Args:
+        name: str, one of BACKENDS
+        seed: int, required by (and only accepted for) the seeded backend
+
+    Returns:
+        RandomBackend
+
+    Raises:
+        ValueError: for an unknown name or a missing or misplaced seed
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown RNG backend '{name}'. Choose from: {', '.join(BACKENDS)}.")
+    if name == 'seeded':
+        if seed is None:
+            raise ValueError("The seeded RNG backend requires an explicit seed.")
+        return SeededRandom(seed)
+    if seed is not None:
+        raise ValueError(f"A seed is only accepted by the seeded RNG backend, not '{name}'.")
+    if name == 'buffered':
+        return BufferedRandom()
+    return default_backend()
@@ -0,0 +1,345 @@
+# password_sampler.py
+"""
+Exact uniform sampling for constrained password policies.
+
+generate_password guarantees one character per selected class by placing
+one of each and shuffling, which only supports a minimum of one and does
+not draw uniformly over the passwords that satisfy the policy. Rejection
+(generate a candidate, discard it if it fails) is uniform but slows down
+sharply when minimums are large relative to the length.
+
+This module counts conforming passwords exactly instead. For a policy,
+length, per-class minimums and an optional limit on consecutive repeats of
+one character, a dynamic program computes how many valid completions exist
+from every intermediate state (characters left, class minimums still
+owed and, with a repeat limit, the class of the last character). The
+repeat limit needs no run-length dimension: completions that would run
+past it are subtracted as a difference of two table entries. Those
+tables are compiled once and cached, and a policy whose tables would
+exceed MAX_TABLE_STATES entries is rejected with ValueError before any
+are built. A password is then produced by
+drawing a single uniform integer below the total count and unranking it:
+each position divides the integer among the allowed next characters in
+proportion to their completion counts, so every conforming password is
+equally likely and there are no retries.
+
+Character classes must be disjoint (the standard classes are).
+
+Usage:
+    policy = compile_policy()
+    password = generate_password_exact(12, policy, minimums={'digits': 2, 'symbols': 2},
+                                       max_repeat=3)
+"""
+
+import math
+from functools import lru_cache
+
+from password_policy import POLICY_CACHE_SIZE, as_policy
+from password_rng import default_backend
+
+# Largest number of counting-table entries a policy may compile to (see
+# table_states). Entries are big integers, so this bounds both the memory
+# and the time a compile takes: near the limit, at password lengths around
+# 64, a compile takes about two seconds and 100 MB.
+MAX_TABLE_STATES = 2_000_000
+
+
+def table_states(length, minimums, classes, max_repeat=None):
+    """
+    Number of counting-table entries ExactSampler builds for a policy:
+    one per (characters left, owed minimums) and, with a repeat limit, per
+    class of the last character as well.
+
+    Args:
+        length: int, password length
+        minimums: sequence of int, per-class minimum counts
+        classes: int, number of character classes
+        max_repeat: int or None, longest allowed run of one character
+    """
+    return (length + 1) * math.prod(m + 1 for m in minimums) * (classes if max_repeat else 1)
+
+
+class ExactSampler:
+    """
+    Compiled counting tables for one (policy, length, minimums, max_repeat).
+
+    Attributes:
+        policy: PasswordPolicy
+        length: int
+        minimums: tuple of int, per-class minimum counts
+        max_repeat: int or None, longest allowed run of one character
+        count: int, number of conforming passwords
+        entropy_bits: float, log2(count)
+    """
+
+    __slots__ = ('policy', 'length', 'minimums', 'max_repeat', 'count', 'entropy_bits',
+                 '_tables', '_radix', '_start', '_sizes')
+
+    def __init__(self, policy, length, minimums, max_repeat):
+        classes = policy.classes
+        if len(set(policy.chars)) != len(policy.chars):
+            raise ValueError("Exact sampling requires disjoint character classes.")
+        if sum(minimums) > length:
+            raise ValueError(
+                f"Password length ({length}) is less than the sum of "
+                f"per-class minimums ({sum(minimums)})."
+            )
+        states = table_states(length, minimums, len(classes), max_repeat)
+        if states > MAX_TABLE_STATES:
+            raise ValueError(
+                f"Policy is too large to compile ({states} table entries; "
+                f"the limit is {MAX_TABLE_STATES}). Lower the length or the minimums."
+            )
+        self.policy = policy
+        self.length = length
+        self.minimums = minimums
+        self.max_repeat = max_repeat
+
+        # Owed minimums are packed into one int with a mixed radix so table
+        # keys stay small: owed = sum(d_i * radix[i]).
+        radix = []
+        step = 1
+        for m in minimums:
+            radix.append(step)
+            step *= m + 1
+        self._radix = radix
+        self._start = sum(m * r for m, r in zip(minimums, radix))
+        self._sizes = [len(c) for c in classes]
+        self._tables = self._build_tables(self._sizes, minimums, radix, step, length,
+                                          max_repeat)
+        self.count = self._completions(length, self._start, -1, 0)
+        if not self.count:
+            raise ValueError("No password satisfies this policy.")
+        self.entropy_bits = math.log2(self.count)
+
+    def _owed_after(self, owed, j, times=1):
+        """Owed-minimums key after placing `times` characters of class j."""
+        r = self._radix[j]
+        return owed - min(times, (owed // r) % (self.minimums[j] + 1)) * r
+
+    @staticmethod
+    def _build_tables(sizes, minimums, radix, nowed, length, max_repeat):
+        """
+        Without a repeat limit, tables[n][owed] is the number of ways to
+        place n more characters.
+
+        With one, tables[n] is a flat list indexed by owed * k + j: the
+        number of ways to place n more characters after a character of
+        class j when that character may repeat without limit. The run limit
+        is folded in by difference (see _run_completions), so the tables
+        hold no run dimension: a run that would pass max_repeat is exactly
+        a run of max_repeat + 1 repeats followed by any valid completion.
+        """
+        k = len(sizes)
+
+        def after(owed, j, times=1):
+            return owed - min(times, (owed // radix[j]) % (minimums[j] + 1)) * radix[j]
+
+        def owed_total(owed):
+            return sum((owed // radix[i]) % (minimums[i] + 1) for i in range(k))
+
+        owed_keys = range(nowed)
+        totals = [owed_total(o) for o in owed_keys]
+
+        if max_repeat is None:
+            nexts = [[after(o, j) for j in range(k)] for o in owed_keys]
+            tables = [[1 if totals[o] == 0 else 0 for o in owed_keys]]
+            for n in range(1, length + 1):
+                prev = tables[-1]
+                tables.append([
+                    0 if totals[o] > n else
+                    sum(sizes[j] * prev[nexts[o][j]] for j in range(k))
+                    for o in owed_keys
+                ])
+            return tables
+
+        # Flat indexes, per (owed, j), of the state after one more character
+        # of class j, and after max_repeat + 1 more.
+        near = [[after(o, j) * k + j for j in range(k)] for o in owed_keys]
+        far = [[after(o, j, max_repeat + 1) * k + j for j in range(k)] for o in owed_keys]
+        classes = range(k)
+        tables = [[1 if totals[o] == 0 else 0 for o in owed_keys for _ in classes]]
+        for n in range(1, length + 1):
+            prev = tables[-1]
+            cur = []
+            if n <= max_repeat:
+                # No run can pass the limit yet.
+                for o in owed_keys:
+                    nr = near[o]
+                    total = sum(sizes[j] * prev[nr[j]] for j in classes)
+                    cur.extend([total] * k)
+            else:
+                back = tables[n - 1 - max_repeat]
+                for o in owed_keys:
+                    nr, fr = near[o], far[o]
+                    over = [back[fr[j]] for j in classes]
+                    total = sum(sizes[j] * (prev[nr[j]] - over[j]) for j in classes)
+                    cur.extend([total + over[j] for j in classes])
+            tables.append(cur)
+        return tables
+
+    def _run_completions(self, n, owed, j, run):
+        """Ways to place n more characters after a run of `run` of one class-j character."""
+        k = len(self._sizes)
+        tables = self._tables
+        ways = tables[n][owed * k + j]
+        # Completions that would repeat that character past max_repeat.
+        span = self.max_repeat - run + 1
+        if n >= span:
+            ways -= tables[n - span][self._owed_after(owed, j, span) * k + j]
+        return ways
+
+    def _completions(self, n, owed, last_class, run):
+        """Ways to place n more characters from the given state."""
+        if self.max_repeat is None:
+            return self._tables[n][owed]
+        if last_class < 0:
+            return sum(size * self._run_completions(n - 1, self._owed_after(owed, j), j, 1)
+                       for j, size in enumerate(self._sizes))
+        return self._run_completions(n, owed, last_class, run)
+
+    def unrank(self, index):
+        """
+        Return the conforming password with the given rank in [0, count).
+
+        Ranks map one-to-one onto conforming passwords, so a uniform rank
+        gives a uniform password.
+        """
+        if not 0 <= index < self.count:
+            raise ValueError(f"Rank must be in [0, {self.count}).")
+        classes = self.policy.classes
+        k = len(classes)
+        max_repeat = self.max_repeat
+        owed = self._start
+        last_class = -1
+        run = 0
+        out = []
+        for n in range(self.length, 0, -1):
+            if max_repeat is not None and last_class >= 0 and run < max_repeat:
+                sub = self._completions(n - 1, self._owed_after(owed, last_class),
+                                        last_class, run + 1)
+                if index < sub:
+                    out.append(out[-1])
+                    owed = self._owed_after(owed, last_class)
+                    run += 1
+                    continue
+                index -= sub
+            for j in range(k):
+                chars = classes[j]
+                if max_repeat is not None and j == last_class:
+                    chars = chars.replace(out[-1], '')
+                if not chars:
+                    continue
+                next_owed = self._owed_after(owed, j)
+                sub = self._completions(n - 1, next_owed, j, 1)
+                weight = len(chars) * sub
+                if index < weight:
+                    pick, index = divmod(index, sub)
+                    out.append(chars[pick])
+                    owed = next_owed
+                    last_class = j
+                    run = 1
+                    break
+                index -= weight
+        return ''.join(out)
+
+    def sample(self, denylist=None, rng=None):
+        """
+        Draw one password uniformly from all conforming passwords, redrawing
+        any found in the optional denylist. The rank is drawn from the
+        RandomBackend `rng` (default: the OS CSPRNG).
+        """
+        if rng is None:
+            rng = default_backend()
+        if denylist is not None:
+            from password_denylist import draw_allowed
+            return draw_allowed(lambda: self.unrank(rng.randbelow(self.count)), denylist)
+        return self.unrank(rng.randbelow(self.count))
+
+    def sample_batches(self, count, batch_size=65536, denylist=None, rng=None):
+        """Lazily yield `count` samples as lists of at most `batch_size`."""
+        remaining = count
+        while remaining > 0:
+            n = min(batch_size, remaining)
+            yield [self.sample(denylist, rng) for _ in range(n)]
+            remaining -= n
+
+
+def normalize_minimums(policy, minimums=None):
+    """
+    Resolve `minimums` to a tuple aligned with policy.classes.
+
+    `minimums` may be None (one per class, the generate_password guarantee),
+    a dict of class name to count (classes not named keep a minimum of one)
+    or a sequence with one count per class.
+    """
+    if minimums is None:
+        return (1,) * len(policy)
+    if isinstance(minimums, dict):
+        unknown = set(minimums) - set(policy.names)
+        if unknown:
+            raise ValueError(f"Unknown character classes in minimums: {', '.join(sorted(unknown))}.")
+        resolved = tuple(int(minimums.get(name, 1)) for name in policy.names)
+    else:
+        resolved = tuple(int(m) for m in minimums)
+        if len(resolved) != len(policy):
+            raise ValueError(
+                f"Expected {len(policy)} minimums (one per class), got {len(resolved)}."
+            )
+    if any(m < 0 for m in resolved):
+        raise ValueError("Per-class minimums must be non-negative.")
+    return resolved
+
+
+@lru_cache(maxsize=POLICY_CACHE_SIZE)
+def _compiled_sampler(policy, length, minimums, max_repeat):
+    return ExactSampler(policy, length, minimums, max_repeat)
+
+
+def compile_sampler(length, charsets, minimums=None, max_repeat=None):
+    """
+    Compile (or fetch from cache) the exact sampler for a policy.
+
+    Args:
+        length: int, password length
+        charsets: dict of charsets or a compiled PasswordPolicy
+        minimums: per-class minimum counts (see normalize_minimums)
+        max_repeat: int or None, longest allowed run of one character
+
+    Returns:
+        ExactSampler
+
+    Raises:
+        ValueError: if the policy is invalid, unsatisfiable or too large to
+            compile (see MAX_TABLE_STATES)
+    """
+    policy = as_policy(charsets)
+    if not policy:
+        raise ValueError("Character set is empty. Cannot generate password.")
+    if length < 1:
+        raise ValueError("Password length must be a positive integer.")
+    if max_repeat is not None and max_repeat < 1:
+        raise ValueError("max_repeat must be at least 1.")
+    return _compiled_sampler(policy, length, normalize_minimums(policy, minimums), max_repeat)
+
+
+def generate_password_exact(length, charsets, minimums=None, max_repeat=None, denylist=None,
+                            rng=None):
+    """
+    Drop-in alternative to generate_password with exact uniform sampling.
+
+    Args:
+        length: int, desired password length
+        charsets: dict, charsets for each type, or a compiled PasswordPolicy
+        minimums: per-class minimum counts; default one per class
+        max_repeat: int or None, longest allowed run of one character
+        denylist: optional Denylist; denylisted passwords are redrawn
+        rng: RandomBackend (see password_rng); default the OS CSPRNG
+
+    Returns:
+        str: a password drawn uniformly from all conforming passwords
+
+    Raises:
+        ValueError: if the policy is invalid or unsatisfiable
+    """
+    return compile_sampler(length, charsets, minimums, max_repeat).sample(denylist, rng)
@@ -0,0 +1,300 @@
+# password_service.py
+"""
+Long-running, low-latency password service.
+
+Spawning the CLI per password pays interpreter startup, argparse and
+logging setup every time. This service pays them once: it listens on a
+Unix socket (or 127.0.0.1:PORT) and answers newline-delimited JSON
+requests from the same process, with compiled policies cached and, for
+every policy that has been requested, a reservoir of pre-generated
+passwords. A request is answered from the reservoir; when a reservoir
+drops below its low-water mark a background task tops it up in bulk on a
+worker thread, off the event loop. Requests larger than what is buffered
+are completed with a direct bulk call, also on a worker thread, so a
+large request never stalls the other clients. Compiling a new policy runs
+on a worker thread too, once however many requests for it arrive
+meanwhile, and policies whose exact-sampling tables would be too large
+(password_sampler.MAX_TABLE_STATES) are refused before any work. Every
+password is handed out exactly once.
+
+Protocol (one JSON object per line each way):
+    {"op": "generate", "count": 1, "length": 16, "uppercase": true,
+     "lowercase": true, "digits": true, "symbols": true,
+     "minimums": {"digits": 2}, "max_repeat": 3}
+        -> {"passwords": ["..."]}
+    {"op": "stats"}  -> {"policies": [{..., "buffered": N, "refills": N}], "served": N}
+    {"op": "ping"}   -> {"ok": true}
+    errors           -> {"error": "message"}
+
+Usage:
+    python password_service.py                 # Unix socket, see --socket
+    python password_service.py --port 8765     # TCP on 127.0.0.1
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from collections import OrderedDict, deque
+
+from password_client import DEFAULT_SOCKET
+from password_policy import compile_policy
+from secure_password_generator import generate_passwords
+
+# Passwords buffered per hot policy, and the level that triggers a refill.
+RESERVOIR_SIZE = 4096
+LOW_WATER = 1024
+# Passwords generated per background refill step.
+REFILL_BATCH = 1024
+# Distinct policies with a reservoir; the least recently used is dropped.
+MAX_POLICIES = 64
+# Largest count and password length accepted in one request.
+MAX_REQUEST_COUNT = 100_000
+MAX_LENGTH = 1024
+# Character class flags of a request, in compile_policy order.
+CLASS_FLAGS = ('uppercase', 'lowercase', 'digits', 'symbols')
+
+logger = logging.getLogger('password_service')
+
+
+def policy_key(request):
+    """
+    Normalize a generate request to a hashable policy key.
+
+    Raises:
+        ValueError: for a malformed policy, or one whose exact-sampling
+            tables would exceed password_sampler.MAX_TABLE_STATES
+    """
+    flags = []
+    for name in CLASS_FLAGS:
+        flag = request.get(name, True)
+        if not isinstance(flag, bool):
+            raise ValueError(f"{name} must be true or false.")
+        flags.append(flag)
+    try:
+        length = int(request.get('length', 16))
+        minimums = tuple(sorted((str(k), int(v)) for k, v in (request.get('minimums') or {}).items()))
+        max_repeat = request.get('max_repeat')
+        max_repeat = None if max_repeat is None else int(max_repeat)
+    except (TypeError, ValueError, AttributeError) as e:
+        raise ValueError(f"Malformed policy: {e}") from None
+    if not 1 <= length <= MAX_LENGTH:
+        raise ValueError(f"length must be between 1 and {MAX_LENGTH}.")
+    if minimums or max_repeat is not None:
+        from password_sampler import MAX_TABLE_STATES, table_states
+        # Unnamed enabled classes keep the sampler's default minimum of one.
+        named = dict(minimums)
+        resolved = [max(named.get(name, 1), 0)
+                    for name, flag in zip(CLASS_FLAGS, flags) if flag]
+        states = table_states(length, resolved, len(resolved), max_repeat)
+        if states > MAX_TABLE_STATES:
+            raise ValueError("Policy is too large: lower the length or the minimums.")
+    return length, tuple(flags), minimums, max_repeat
+
+
+def make_generator(key, denylist=None):
+    """Return generate(n) -> list of passwords for a policy key, validating it now."""
+    length, flags, minimums, max_repeat = key
+    policy = compile_policy(*flags)
+    if minimums or max_repeat is not None:
+        from password_sampler import compile_sampler
+        sampler = compile_sampler(length, policy, dict(minimums), max_repeat)
+        return lambda n: [sampler.sample(denylist) for _ in range(n)]
+    generate_passwords(0, length, policy)
+    return lambda n: generate_passwords(n, length, policy, denylist=denylist)
+
+
+class Reservoir:
+    """Pre-generated passwords for one policy, refilled in the background."""
+
+    def __init__(self, generate, size=RESERVOIR_SIZE, low_water=LOW_WATER):
+        self.generate = generate
+        self.size = size
+        self.low_water = low_water
+        self.buffer = deque()
+        self.refilling = None
+        self.refills = 0
+
+    def take(self, count):
+        """Pop up to `count` buffered passwords."""
+        buffer = self.buffer
+        n = min(count, len(buffer))
+        return [buffer.popleft() for _ in range(n)]
+
+    def needs_refill(self):
+        return len(self.buffer) < self.low_water and self.refilling is None
+
+    async def refill(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while len(self.buffer) < self.size:
+                batch = min(REFILL_BATCH, self.size - len(self.buffer))
+                self.buffer.extend(await loop.run_in_executor(None, self.generate, batch))
+                self.refills += 1
+        except Exception:
+            logger.exception("Reservoir refill failed.")
+        finally:
+            self.refilling = None
+
+
+class PasswordService:
+    """Request dispatcher holding the per-policy reservoirs."""
+
+    def __init__(self, reservoir_size=RESERVOIR_SIZE, low_water=LOW_WATER,
+                 max_policies=MAX_POLICIES, denylist=None):
+        self.reservoir_size = reservoir_size
+        self.low_water = min(low_water, reservoir_size)
+        self.max_policies = max_policies
+        self.denylist = denylist
+        self.reservoirs = OrderedDict()
+        self.compiling = {}
+        self.served = 0
+
+    async def reservoir(self, key):
+        reservoir = self.reservoirs.get(key)
+        if reservoir is not None:
+            self.reservoirs.move_to_end(key)
+            return reservoir
+        # Compiling can take a while: do it on a worker thread, once for
+        # every request waiting on the same new policy.
+        compiling = self.compiling.get(key)
+        if compiling is None:
+            loop = asyncio.get_running_loop()
+            compiling = loop.run_in_executor(None, make_generator, key, self.denylist)
+            self.compiling[key] = compiling
+            compiling.add_done_callback(lambda _: self.compiling.pop(key, None))
+        # A waiter that is cancelled must not cancel the others' compile.
+        generate = await asyncio.shield(compiling)
+        reservoir = self.reservoirs.get(key)
+        if reservoir is None:
+            reservoir = Reservoir(generate, self.reservoir_size, self.low_water)
+            self.reservoirs[key] = reservoir
+            if len(self.reservoirs) > self.max_policies:
+                self.reservoirs.popitem(last=False)
+        return reservoir
+
+    async def generate(self, request):
+        count = int(request.get('count', 1))
+        if not 1 <= count <= MAX_REQUEST_COUNT:
+            raise ValueError(f"count must be between 1 and {MAX_REQUEST_COUNT}.")
+        reservoir = await self.reservoir(policy_key(request))
+        passwords = reservoir.take(count)
+        if reservoir.needs_refill():
+            reservoir.refilling = asyncio.get_running_loop().create_task(reservoir.refill())
+        if len(passwords) < count:
+            loop = asyncio.get_running_loop()
+            passwords.extend(await loop.run_in_executor(
+                None, reservoir.generate, count - len(passwords)))
+        self.served += count
+        return {'passwords': passwords}
+
+    def stats(self):
+        return {
+            'policies': [
+                {'length': key[0], 'classes': list(key[1]), 'minimums': dict(key[2]),
+                 'max_repeat': key[3], 'buffered': len(r.buffer), 'refills': r.refills}
+                for key, r in self.reservoirs.items()
+            ],
+            'served': self.served,
+        }
+
+    async def dispatch(self, request):
+        if not isinstance(request, dict):
+            raise ValueError("Request must be a JSON object.")
+        op = request.get('op', 'generate')
+        if op == 'generate':
+            return await self.generate(request)
+        if op == 'stats':
+            return self.stats()
+        if op == 'ping':
+            return {'ok': True}
+        raise ValueError(f"Unknown op '{op}'.")
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = await self.dispatch(json.loads(line))
+                except (ValueError, TypeError) as e:
+                    response = {'error': str(e)}
+                writer.write(json.dumps(response).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(service, socket_path=DEFAULT_SOCKET, port=None):
+    """Run the service until cancelled."""
+    if port is not None:
+        server = await asyncio.start_server(service.handle, '127.0.0.1', port)
+        where = f"127.0.0.1:{port}"
+    else:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        # Passwords are secrets: only the owning user may connect.
+        old_umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(service.handle, path=socket_path)
+        finally:
+            os.umask(old_umask)
+        where = socket_path
+    logger.info("Password service listening on %s", where)
+    async with server:
+        await server.serve_forever()
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Low-latency password service')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET,
+                        help=f'Unix socket path (default: {DEFAULT_SOCKET})')
+    parser.add_argument('--port', type=int, default=None,
+                        help='Listen on 127.0.0.1:PORT over TCP instead of a Unix socket')
+    parser.add_argument('--reservoir', type=int, default=RESERVOIR_SIZE,
+                        help=f'Passwords buffered per policy (default: {RESERVOIR_SIZE})')
+    parser.add_argument('--low-water', type=int, default=LOW_WATER,
+                        help=f'Refill when a reservoir drops below this (default: {LOW_WATER})')
+    parser.add_argument('--denylist', default=None, metavar='INDEX',
+                        help='Never hand out passwords found in this breached-hash index')
+    parser.add_argument('--warm', type=int, action='append', default=[], metavar='LENGTH',
+                        help='Pre-fill a reservoir for the default policy at LENGTH (repeatable)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Enable debug logging')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(message)s'
+    )
+    denylist = None
+    if args.denylist:
+        from password_denylist import open_denylist
+        denylist = open_denylist(args.denylist)
+    service = PasswordService(args.reservoir, args.low_water, denylist=denylist)
+
+    async def run():
+        for length in args.warm:
+            reservoir = service.reservoir(policy_key({'length': length}))
+            reservoir.refilling = asyncio.get_running_loop().create_task(reservoir.refill())
+        await serve(service, args.socket, args.port)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    except (OSError, ValueError) as e:
+        logger.error("Password service failed: %s", e)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,390 @@
+# password_unique.py
+"""
+Guaranteed-unique bulk generation with bounded memory.
+
+Minting one-time codes needs every password in a batch to be distinct, and
+a set of 100M strings does not fit in a worker. unique_batches() wraps any
+stream of password batches and makes it duplicate-free in four passes:
+
+1. Every password is appended to a spool file and reduced to an 8-byte
+   BLAKE2b key held in a flat array('Q'). When the array reaches the
+   memory budget it is sorted and spilled to disk as a run.
+2. The sorted runs are merged (blockwise with NumPy, or heapq.merge) into
+   one sorted file of distinct keys, and a second sorted file of the keys
+   seen more than once. The merge holds at most one bounded block per run.
+3. For each duplicated key the first occurrence is kept and later ones are
+   replaced by fresh passwords whose keys are absent from the merged file.
+   Which duplicated keys have been kept is a bitmap file, one bit per key
+   of the duplicates file; the keys of fresh passwords are a set that is
+   spilled to sorted files like the runs once it reaches the budget. Both
+   key files are searched by bisection through mmap.
+4. The spool is streamed back out in batches, with replacements applied.
+
+Identical passwords always share a key, so the output never contains a
+duplicate; two different passwords sharing a 64-bit key only causes an
+unnecessary regeneration. Peak memory is set by memory_budget, not by the
+batch size, the count or the number of collisions.
+
+Replacing a duplicate draws fresh passwords until one is new, which takes
+ever more draws as the batch fills the policy's code space: check_space
+refuses a count above MAX_SPACE_FILL of that space, and a replacement
+that still finds nothing new in MAX_REPLACEMENT_DRAWS draws raises
+ValueError instead of looping.
+
+The spool holds plaintext passwords: it lives in a private temporary
+directory (tmpdir) and is deleted when the stream ends.
+
+Usage:
+    python secure_password_generator.py --count 100000000 --unique -o codes.txt
+    python secure_password_generator.py --count 100000000 --unique --unique-memory 64
+"""
+
+import heapq
+import os
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left
+from hashlib import blake2b
+from itertools import islice
+
+# Default memory budget for the key array (and the merge blocks), in bytes.
+DEFAULT_MEMORY_BUDGET = 256 << 20
+# Bytes per key held in memory: the array itself, plus on the pure-Python
+# path the list of int objects that sorting a run creates.
+KEY_BYTES_NUMPY = 8
+KEY_BYTES_PYTHON = 48
+# Keys read per run per step when merging without NumPy.
+MERGE_CHUNK = 8192
+# Bytes per key held in the in-memory part of the fresh-key set.
+SET_KEY_BYTES = 96
+# Largest fraction of the code space a unique batch may take, and the
+# fresh passwords drawn for one replacement before giving up.
+MAX_SPACE_FILL = 0.9
+MAX_REPLACEMENT_DRAWS = 1000
+
+_KEY = struct.Struct('=Q')
+
+
+def password_keys(passwords):
+    """Return the 8-byte keys of a batch of passwords, concatenated."""
+    return b''.join(blake2b(p.encode('utf-8'), digest_size=8).digest() for p in passwords)
+
+
+def check_space(count, space, fraction=1.0):
+    """
+    Raise ValueError if `count` unique passwords would take more than
+    MAX_SPACE_FILL of the `fraction` of `space` candidate strings that
+    satisfy the policy.
+
+    `space` may be an arbitrarily large int; the comparison never converts
+    it to a float.
+    """
+    if count / (fraction * MAX_SPACE_FILL) > space:
+        raise ValueError(
+            f"Cannot generate {count} unique passwords: the policy allows only "
+            f"{int(space * fraction)}, and at most {MAX_SPACE_FILL:.0%} of them can be "
+            f"drawn without repeats in reasonable time. Use longer passwords or more "
+            f"character classes."
+        )
+
+
+class _SortedKeys:
+    """Read-only sequence view of a sorted key file, for bisect lookups."""
+
+    def __init__(self, path):
+        self._fh = open(path, 'rb')
+        self._size = os.fstat(self._fh.fileno()).st_size // _KEY.size
+        self._map = None
+        if self._size:
+            import mmap
+            self._map = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        return _KEY.unpack_from(self._map, index * _KEY.size)[0]
+
+    def __contains__(self, key):
+        return self.index(key) >= 0
+
+    def index(self, key):
+        """Position of `key`, or -1 if it is absent."""
+        i = bisect_left(self, key)
+        return i if i < self._size and self[i] == key else -1
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._fh.close()
+
+
+class _Bitmap:
+    """Zeroed bit array of `size` bits in a file, paged in through mmap."""
+
+    def __init__(self, path, size):
+        import mmap
+        self._fh = open(path, 'w+b')
+        self._fh.truncate(max(1, (size + 7) // 8))
+        self._map = mmap.mmap(self._fh.fileno(), 0)
+
+    def __getitem__(self, i):
+        return self._map[i >> 3] >> (i & 7) & 1
+
+    def set(self, i):
+        self._map[i >> 3] |= 1 << (i & 7)
+
+    def close(self):
+        self._map.close()
+        self._fh.close()
+
+
+class _SpillingKeySet:
+    """
+    Set of keys that holds at most `capacity` in memory; beyond that they
+    are sorted and written to files under `work`, searched by bisection.
+    """
+
+    def __init__(self, capacity, work, prefix):
+        self._capacity = capacity
+        self._work = work
+        self._prefix = prefix
+        self._keys = set()
+        self._runs = []
+
+    def __contains__(self, key):
+        return key in self._keys or any(key in run for run in self._runs)
+
+    def add(self, key):
+        self._keys.add(key)
+        if len(self._keys) >= self._capacity:
+            path = os.path.join(self._work, f'{self._prefix}{len(self._runs)}')
+            with open(path, 'wb') as fh:
+                array('Q', sorted(self._keys)).tofile(fh)
+            self._runs.append(_SortedKeys(path))
+            self._keys = set()
+
+    def close(self):
+        for run in self._runs:
+            run.close()
+
+
+def _load_numpy(use_numpy):
+    if use_numpy is False:
+        return None
+    try:
+        import numpy as np
+    except ImportError:
+        if use_numpy:
+            raise
+        return None
+    return np
+
+
+def _spill(keys, path, np):
+    """Sort a key array and write it to `path` as a run."""
+    if np is not None:
+        np.frombuffer(keys, dtype=np.uint64).sort()
+        sorted_keys = keys
+    else:
+        sorted_keys = array('Q', sorted(keys))
+    with open(path, 'wb') as fh:
+        sorted_keys.tofile(fh)
+
+
+def _read_run(path):
+    with open(path, 'rb') as fh:
+        while True:
+            chunk = array('Q')
+            try:
+                chunk.fromfile(fh, MERGE_CHUNK)
+            except EOFError:
+                yield from chunk
+                return
+            yield from chunk
+
+
+def _merge_python(runs, out, dups_out):
+    """heapq merge of sorted runs; writes each duplicated key once to dups_out."""
+    buffer = array('Q')
+    duplicates = array('Q')
+    previous = last_duplicate = None
+    for key in heapq.merge(*(_read_run(path) for path in runs)):
+        if key == previous:
+            if key != last_duplicate:
+                duplicates.append(key)
+                last_duplicate = key
+                if len(duplicates) >= MERGE_CHUNK:
+                    duplicates.tofile(dups_out)
+                    duplicates = array('Q')
+            continue
+        buffer.append(key)
+        previous = key
+        if len(buffer) >= MERGE_CHUNK:
+            buffer.tofile(out)
+            buffer = array('Q')
+    buffer.tofile(out)
+    duplicates.tofile(dups_out)
+
+
+def _merge_numpy(np, runs, out, dups_out, memory_budget):
+    """
+    Blockwise merge of sorted runs; writes each duplicated key once to
+    dups_out.
+
+    Each step takes the next block of every run, finds the smallest block
+    tail (every run's keys up to it are now known), sorts that slice of
+    all runs together and writes its distinct keys.
+    """
+    block = max(1024, memory_budget // (3 * KEY_BYTES_NUMPY * max(1, len(runs))))
+    arrays = [np.memmap(path, dtype=np.uint64, mode='r') for path in runs
+              if os.path.getsize(path)]
+    positions = [0] * len(arrays)
+    previous = last_duplicate = None
+    while True:
+        live = [i for i, a in enumerate(arrays) if positions[i] < len(a)]
+        if not live:
+            break
+        frontier = min(arrays[i][min(positions[i] + block, len(arrays[i])) - 1] for i in live)
+        pieces = []
+        for i in live:
+            window = arrays[i][positions[i]:positions[i] + block]
+            end = int(np.searchsorted(window, frontier, side='right'))
+            pieces.append(window[:end])
+            positions[i] += end
+        merged = np.sort(np.concatenate(pieces))
+        repeated = merged[1:] == merged[:-1]
+        duplicates = merged[1:][repeated]
+        distinct = merged[np.concatenate(([True], ~repeated))]
+        if previous is not None and distinct[0] == previous:
+            # The previous block's last key continues into this one.
+            distinct = distinct[1:]
+            duplicates = np.concatenate((np.array([previous], dtype=np.uint64), duplicates))
+        duplicates = np.unique(duplicates)
+        if len(duplicates) and duplicates[0] == last_duplicate:
+            duplicates = duplicates[1:]
+        if len(duplicates):
+            dups_out.write(duplicates.tobytes())
+            last_duplicate = duplicates[-1]
+        out.write(distinct.tobytes())
+        previous = merged[-1]
+
+
+def unique_batches(batches, regenerate, memory_budget=DEFAULT_MEMORY_BUDGET, tmpdir=None,
+                   batch_size=65536, use_numpy=None, stats=None):
+    """
+    Make a stream of password batches duplicate-free.
+
+    Nothing is yielded until the whole input has been consumed (the last
+    password may duplicate the first); output order is input order, with
+    repeats replaced in place.
+
+    Args:
+        batches: iterable of lists of passwords
+        regenerate: callable(k) -> list of k fresh passwords of the same policy
+        memory_budget: int, bytes of keys held in memory before spilling a run
+        tmpdir: str or None, directory for the spool and runs
+        batch_size: int, passwords per yielded batch
+        use_numpy: bool or None, force (True) or disable (False) the NumPy
+            sort and merge; None uses NumPy when it is installed
+        stats: optional dict, filled with 'count', 'runs' and 'duplicates'
+
+    Returns:
+        iterator: lists of unique passwords
+
+    Raises:
+        ValueError: raised eagerly for an invalid budget or batch size
+    """
+    np = _load_numpy(use_numpy)
+    per_key = KEY_BYTES_NUMPY if np is not None else KEY_BYTES_PYTHON
+    capacity = memory_budget // per_key
+    if capacity < 1:
+        raise ValueError(f"Memory budget of {memory_budget} bytes is too small.")
+    if batch_size < 1:
+        raise ValueError(f"Batch size must be positive, got {batch_size}.")
+    stats = stats if stats is not None else {}
+
+    def generate():
+        with tempfile.TemporaryDirectory(prefix='passgen-unique-', dir=tmpdir) as work:
+            spool_path = os.path.join(work, 'spool')
+            runs = []
+            count = 0
+            keys = array('Q')
+            with open(spool_path, 'wb', buffering=1 << 20) as spool:
+                for batch in batches:
+                    if not batch:
+                        continue
+                    spool.write(('\n'.join(batch) + '\n').encode('utf-8'))
+                    count += len(batch)
+                    start = 0
+                    while start < len(batch):
+                        take = min(len(batch) - start, capacity - len(keys))
+                        keys.frombytes(password_keys(batch[start:start + take]))
+                        start += take
+                        if len(keys) == capacity:
+                            runs.append(os.path.join(work, f'run{len(runs)}'))
+                            _spill(keys, runs[-1], np)
+                            keys = array('Q')
+            if keys or not runs:
+                runs.append(os.path.join(work, f'run{len(runs)}'))
+                _spill(keys, runs[-1], np)
+            del keys
+
+            merged_path = os.path.join(work, 'merged')
+            dups_path = os.path.join(work, 'duplicates')
+            with open(merged_path, 'wb', buffering=1 << 20) as out, \
+                    open(dups_path, 'wb', buffering=1 << 20) as dups_out:
+                if np is not None:
+                    _merge_numpy(np, runs, out, dups_out, memory_budget)
+                else:
+                    _merge_python(runs, out, dups_out)
+            for path in runs:
+                os.unlink(path)
+            stats.update(count=count, runs=len(runs), duplicates=0)
+
+            merged = _SortedKeys(merged_path)
+            duplicates = _SortedKeys(dups_path)
+            # Bit i: the first occurrence of duplicated key i has been kept.
+            kept = _Bitmap(os.path.join(work, 'kept'), len(duplicates))
+            fresh = _SpillingKeySet(max(1, memory_budget // SET_KEY_BYTES), work, 'fresh')
+
+            def replacement():
+                for _ in range(MAX_REPLACEMENT_DRAWS):
+                    candidate = regenerate(1)[0]
+                    key = _KEY.unpack(password_keys([candidate]))[0]
+                    if key not in fresh and key not in merged:
+                        fresh.add(key)
+                        return candidate
+                raise ValueError(
+                    f"No unused password found in {MAX_REPLACEMENT_DRAWS} draws after "
+                    f"{count} passwords: the policy's code space is nearly exhausted. "
+                    f"Use longer passwords or more character classes."
+                )
+
+            try:
+                with open(spool_path, 'rb', buffering=1 << 20) as spool:
+                    while True:
+                        batch = [line[:-1].decode('utf-8')
+                                 for line in islice(spool, batch_size)]
+                        if not batch:
+                            break
+                        if len(duplicates):
+                            batch_keys = array('Q', password_keys(batch))
+                            for i, key in enumerate(batch_keys):
+                                d = duplicates.index(key)
+                                if d < 0:
+                                    continue
+                                if kept[d]:
+                                    batch[i] = replacement()
+                                    stats['duplicates'] += 1
+                                else:
+                                    kept.set(d)
+                        yield batch
+            finally:
+                merged.close()
+                duplicates.close()
+                kept.close()
+                fresh.close()
+
+    return generate()
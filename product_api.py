@@ -1,13 +1,194 @@
-Here’s a basic structure for a Flask-based Product Catalog API that meets typical expectations from such a Jira Story.
+# product_api.py
+"""
+Flask-based Product Catalog API.
 
-```python
-from flask import Flask, request, jsonify, abort
+Features:
+- CRUD operations for products
+- JSON request/response
+- Keyset pagination of GET /products (limit, cursor) and an opt-in
+  streamed response (stream=json or stream=ndjson) whose memory use does
+  not grow with the catalog
+- Filtering by category and price range, sorted by id or price, served
+  from secondary indexes (see product_index)
+- Full-text search of names and descriptions, ranked with BM25 and
+  matching the last word as a prefix (see product_search)
+- Bulk create, upsert and delete from a streamed NDJSON body, applied in
+  chunked transactions with streamed per-row results
+- Catalog statistics (counts, price min/max/avg and percentiles, per
+  category) from incrementally maintained aggregates (see product_stats)
+- A change feed: every create, update and delete gets a sequence number
+  in a bounded in-memory log, read incrementally or tailed live as
+  Server-Sent Events (see product_changes)
+- Cached responses for product reads, with strong ETags and 304 Not
+  Modified for a matching If-None-Match (see product_cache)
+- Pluggable storage (see product_store): an in-memory dict, compact
+  in-memory columns for multi-million-product catalogs, or an SQLite
+  database in WAL mode that survives restarts and is shared by every
+  worker process
+
+Configuration:
+    PRODUCT_STORE=memory             per-process dict, lost on exit (default)
+    PRODUCT_STORE=compact            per-process columnar arrays, a fraction
+                                     of the memory per product
+    PRODUCT_STORE=sqlite:PATH        SQLite database file at PATH
+    PRODUCT_CACHE_BYTES=N            bytes of cached response bodies
+                                     (default 64 MiB; 0 disables caching)
+    PRODUCT_CHANGE_LOG=N             changes kept for the change feed
+                                     (default 65536)
+
+Listing:
+    GET /products                           every product, as one JSON array
+    GET /products?limit=100                 {"products": [...], "next_cursor": "..."}
+    GET /products?limit=100&cursor=C        the page after cursor C; the last
+                                            page has "next_cursor": null
+    GET /products?stream=ndjson             every product, one JSON object per
+                                            line, written as it is read
+    GET /products?stream=json&cursor=C      a streamed JSON array (limit and
+                                            cursor apply to streams too)
+
+    Every listing form also takes filters and a sort order:
+    category=NAME                           exact category match
+    min_price=X, max_price=Y                inclusive price bounds
+    sort=id|price|-price                    default id; a cursor is only valid
+                                            with the sort it was issued for
+
+Statistics:
+    GET /products/stats                     {"count": N, "price": {"min": ...,
+                                            "max": ..., "avg": ..., "sum": ...,
+                                            "percentiles": {"50": ..., "90": ...,
+                                            "99": ...}}, "categories": {"home":
+                                            {"count": ..., "avg_price": ...}, ...}}
+    GET /products/stats?category=home&p=25,50,75
+                                            the same for one category (without
+                                            "categories"), with the percentiles
+                                            asked for
+
+    "price" is null while there are no products. Counts and averages cost
+    O(1) and each min, max or percentile O(log n), whatever the catalog size.
+
+Change feed:
+    GET /products/changes                   {"log": "...", "next_since": N,
+                                            "changes": [], "more": false}: the
+                                            current position, to start from
+    GET /products/changes?since=N&log=ID    the changes after N, oldest first,
+                                            up to ?limit= (default 1000):
+                                            [{"seq": 8, "op": "update", "id": 7,
+                                            "product": {...}}, ...]; "product" is
+                                            null for a delete. Pass "next_since"
+                                            back as since while "more" is true
+    GET /products/changes/stream?since=N&log=ID
+                                            Server-Sent Events, one "change" event
+                                            per change (data: the change as above,
+                                            id: "LOG:SEQ"), live as they happen,
+                                            with a comment every SSE_HEARTBEAT
+                                            seconds while idle. A reconnecting
+                                            client's Last-Event-ID resumes it
+
+    To sync, read the current position, then the full listing, then the
+    changes since that position (applying a change twice is harmless).
+    When the changes after `since` have been dropped from the log, or
+    `log` names another log (an earlier run of a server on an in-memory
+    store), the reply is 410 Gone (an SSE stream sends a "reset" event and
+    ends): sync again from a full listing. On SQLite the database records
+    the changes, so every worker serves the same feed and log. Streams
+    hold a server thread each for as long as they last.
+
+Caching:
+    GET /products/7 and the non-streamed forms of GET /products are served
+    from a cache of their JSON bodies, dropped precisely as the products
+    they contain change, and carry an ETag header. Sending it back,
+    If-None-Match: "...", gets 304 Not Modified with no body while the
+    response is unchanged. Streamed listings and search are not cached.
+
+Search:
+    GET /products/search?q=desk+la          {"products": [...], "total": N}, best
+                                            match first, each with its "score"
+    GET /products/search?q=lamp&limit=20&offset=20
+                                            the next 20 matches
+
+Bulk changes:
+    POST /products/bulk                     NDJSON body, one product per line:
+                                            {"name": ..., "price": ..., ...}
+    POST /products/bulk?op=upsert           {"id": 7, "price": 9.5} updates
+                                            product 7, or creates it (with a new
+                                            id) when it does not exist
+    POST /products/bulk?op=delete           {"id": 7}
+
+    A line may name its own "op" (create, upsert or delete). Lines are read
+    and applied BULK_CHUNK at a time, each chunk in one transaction on a
+    transactional store (SQLite), and the response streams one NDJSON
+    result per line as its chunk commits, {"line": 3, "status": 201,
+    "id": 42}, or with an "error" for a rejected line, then a final
+    {"done": true, "created": ..., "updated": ..., "deleted": ...,
+    "failed": ...}. A bad line fails alone; if a chunk cannot be committed,
+    every line in it fails with status 500 and none of it is applied. The
+    in-memory stores cannot roll back, so there a line that fails to apply
+    gets its own 500 and the lines around it stand.
+
+    curl -T catalog.ndjson -H 'Content-Type: application/x-ndjson' \
+        -X POST localhost:5000/products/bulk
+
+Usage:
+    python product_api.py
+    PRODUCT_STORE=sqlite:catalog.db gunicorn -w 4 --threads 8 product_api:app
+"""
+
+import base64
+import json
+import math
+import os
+
+from flask import Flask, Response, request, jsonify, abort, stream_with_context
+
+from product_cache import DEFAULT_MAX_BYTES, list_key, open_cache, product_key
+from product_changes import DEFAULT_CAPACITY, ChangeGap, open_change_log
+from product_search import open_index
+from product_stats import DEFAULT_PERCENTILES, open_stats
+from product_store import SORTS, iter_pages, open_store, sort_key
 
 app = Flask(__name__)
 
-# In-memory product catalog (simulate DB)
-products = {}
-product_id_seq = 1
+# Product catalog storage (see product_store)
+store = open_store(os.environ.get('PRODUCT_STORE', 'memory'))
+# Full-text index of names and descriptions, updated on every store change
+search_index = open_index(store)
+# Counts and price statistics, updated on every store change
+catalog_stats = open_stats(store)
+# Sequence-numbered log of recent changes, for the change feed
+change_log = open_change_log(
+    store, int(os.environ.get('PRODUCT_CHANGE_LOG', DEFAULT_CAPACITY)))
+# Serialized product reads, dropped as the products they contain change
+response_cache = open_cache(
+    store, int(os.environ.get('PRODUCT_CACHE_BYTES', DEFAULT_MAX_BYTES)))
+
+# Page size when ?limit= is not given, and the largest allowed.
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+# Products read from the store and serialized per streamed chunk.
+STREAM_CHUNK = 1000
+STREAM_FORMATS = {'json': 'application/json', 'ndjson': 'application/x-ndjson'}
+# Search results per page when ?limit= is not given, and the deepest offset.
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_OFFSET = 10000
+# Most percentiles one stats request may ask for.
+MAX_PERCENTILES = 20
+# Changes per change-feed response when ?limit= is not given, and the
+# largest allowed; seconds between SSE keep-alive comments while idle.
+DEFAULT_CHANGES_LIMIT = 1000
+MAX_CHANGES_LIMIT = 10000
+SSE_HEARTBEAT = 15
+# Bulk lines applied per transaction, the longest line accepted, and the
+# bytes read from the request per call (both in bytes).
+BULK_CHUNK = 1000
+MAX_BULK_LINE = 1 << 20
+BULK_READ_SIZE = 64 * 1024
+BULK_OPS = ('create', 'upsert', 'delete')
+# Result counter per successful bulk status.
+BULK_COUNTS = {201: 'created', 200: 'updated', 204: 'deleted'}
+
+# Same compact, key-sorted output as jsonify.
+_encode = json.JSONEncoder(separators=(',', ':'), sort_keys=True).encode
+_decode = json.JSONDecoder().decode
 
 # ---- Models ----
 def product_repr(prod):
@@ -20,74 +201,472 @@ def product_repr(prod):
         "category": prod.get("category", "")
     }
 
+# ---- Pagination ----
+def encode_cursor(key):
+    """Opaque cursor continuing after the sort key `key` (see sort_key)."""
+    key = list(key) if isinstance(key, tuple) else [key]
+    return base64.urlsafe_b64encode(_encode(key).encode()).rstrip(b'=').decode()
+
+def decode_cursor(cursor, sort='id'):
+    """Return the sort key a cursor continues after; 400 if malformed."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if sort == 'id':
+            last_id, = key
+            if type(last_id) is int and last_id >= 0:
+                return last_id
+        else:
+            price, last_id = key
+            if type(price) in (int, float) and type(last_id) is int:
+                return (float(price), last_id)
+    except (TypeError, ValueError):
+        pass
+    abort(400, "Invalid cursor.")
+
+def int_arg(name, default, minimum=1, maximum=None):
+    """Integer query parameter `name`; 400 if malformed or out of range."""
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        abort(400, f"{name} must be an integer.")
+    if value < minimum or (maximum is not None and value > maximum):
+        abort(400, f"{name} must be between {minimum} and {maximum or 'unbounded'}.")
+    return value
+
+def price_arg(name):
+    """Finite float query parameter `name`, or None; 400 if malformed."""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        value = float(value)
+    except ValueError:
+        value = math.nan
+    if not math.isfinite(value):
+        abort(400, f"{name} must be a number.")
+    return value
+
+def to_price(value):
+    """Price as a finite float; ValueError otherwise."""
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        price = math.nan
+    if not math.isfinite(price):
+        raise ValueError("price must be a number.")
+    return price
+
+def parse_price(value):
+    """Price from a request body as a finite float; 400 otherwise."""
+    try:
+        return to_price(value)
+    except ValueError as exc:
+        abort(400, str(exc))
+
+def percentiles_arg():
+    """Comma-separated percentiles of ?p=, in [0, 100]; 400 if malformed."""
+    value = request.args.get('p')
+    if value is None:
+        return DEFAULT_PERCENTILES
+    try:
+        percentiles = [float(p) for p in value.split(',')]
+    except ValueError:
+        percentiles = []
+    if not percentiles or not all(0 <= p <= 100 for p in percentiles):
+        abort(400, "p must be a comma-separated list of numbers between 0 and 100.")
+    if len(percentiles) > MAX_PERCENTILES:
+        abort(400, f"p may list at most {MAX_PERCENTILES} percentiles.")
+    return percentiles
+
+def to_text(value, name, nullable=True):
+    """Text field `name` as a str, null as "" when `nullable`; ValueError otherwise."""
+    if value is None and nullable:
+        return ""
+    if not isinstance(value, str):
+        raise ValueError(f"{name} must be a string.")
+    try:
+        value.encode()
+    except UnicodeEncodeError:
+        # JSON can escape a lone surrogate, which no store can encode.
+        raise ValueError(f"{name} must be valid Unicode text.") from None
+    return value
+
+def parse_text(value, name, nullable=True):
+    """Text field from a request body (see to_text); 400 otherwise."""
+    try:
+        return to_text(value, name, nullable)
+    except ValueError as exc:
+        abort(400, str(exc))
+
+def request_body():
+    """The JSON object of the request body; 400 if it is anything else."""
+    data = request.get_json()
+    if not isinstance(data, dict):
+        abort(400, "Request body must be a JSON object.")
+    return data
+
+def listing_query():
+    """The filter and sort parameters of a listing request, as store.query kwargs."""
+    sort = request.args.get('sort', 'id')
+    if sort not in SORTS:
+        abort(400, f"sort must be one of: {', '.join(SORTS)}.")
+    return {
+        'category': request.args.get('category'),
+        'min_price': price_arg('min_price'),
+        'max_price': price_arg('max_price'),
+        'sort': sort,
+    }
+
+def cached_json(key, build):
+    """
+    JSON response of build() cached under `key`, with its ETag; 304 when
+    If-None-Match has it.
+    """
+    body, etag = response_cache.fetch(key, lambda: _encode(build()).encode())
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+def stream_products(query, after, limit, fmt):
+    """Yield the listing in `fmt` chunk by chunk (see STREAM_FORMATS)."""
+    first = True
+    if fmt == 'json':
+        yield '['
+    for page in iter_pages(store, after, STREAM_CHUNK, limit, **query):
+        if fmt == 'ndjson':
+            yield '\n'.join([_encode(product_repr(p)) for p in page]) + '\n'
+        else:
+            # One encoder call per chunk; strip the chunk's own brackets.
+            yield ('' if first else ',') + _encode([product_repr(p) for p in page])[1:-1]
+        first = False
+    if fmt == 'json':
+        yield ']'
+
+# ---- Change feed ----
+def change_repr(change):
+    """Format a change log entry for API response."""
+    prod = change['product']
+    return {
+        "seq": change['seq'],
+        "op": change['op'],
+        "id": change['id'],
+        "product": product_repr(prod) if prod is not None else None
+    }
+
+def feed_position():
+    """(since, log id) of a change-feed request; from Last-Event-ID when it has one."""
+    last_event = request.headers.get('Last-Event-ID')
+    if last_event:
+        log_id, _, seq = last_event.rpartition(':')
+        if not log_id or not seq.isdigit():
+            abort(400, "Invalid Last-Event-ID.")
+        return int(seq), log_id
+    return int_arg('since', None, minimum=0), request.args.get('log')
+
+def change_events(seq):
+    """Yield Server-Sent Events for the changes after `seq`, as they happen."""
+    log_id = change_log.log_id
+    while True:
+        try:
+            changes = change_log.since(seq, MAX_CHANGES_LIMIT)
+        except ChangeGap as exc:
+            data = _encode({"error": str(exc), "last_seq": change_log.last_seq})
+            yield f"event: reset\ndata: {data}\n\n"
+            return
+        if changes:
+            yield ''.join(f"id: {log_id}:{c['seq']}\nevent: change\n"
+                          f"data: {_encode(change_repr(c))}\n\n" for c in changes)
+            seq = changes[-1]['seq']
+        elif not change_log.wait(seq, SSE_HEARTBEAT):
+            # Keeps proxies from timing out, and finds closed connections.
+            yield ": keep-alive\n\n"
+
+# ---- Bulk changes ----
+def ndjson_lines(stream):
+    """
+    Yield (line number, line) for each non-blank line of a byte stream,
+    read BULK_READ_SIZE bytes at a time; the line is None when it is
+    longer than MAX_BULK_LINE.
+    """
+    number = 0
+    tail = b''
+    overflow = False
+    while True:
+        # The request stream is unbuffered: never read it line by line.
+        block = stream.read(BULK_READ_SIZE)
+        lines = (tail + block).split(b'\n')
+        tail = lines.pop() if block else b''
+        for line in lines:
+            number += 1
+            if overflow:
+                overflow = False
+                yield number, None
+            elif line and not line.isspace():
+                yield number, line
+        if not block:
+            return
+        if len(tail) > MAX_BULK_LINE:
+            # Drop the line read so far and the rest of it as it arrives.
+            overflow = True
+            tail = b''
+
+def parse_bulk_row(line, default_op):
+    """(op, id, fields) of one bulk line; ValueError if it is invalid."""
+    if line is None:
+        raise ValueError(f"Line is longer than {MAX_BULK_LINE} bytes.")
+    data = _decode(line.decode())
+    if not isinstance(data, dict):
+        raise ValueError("Each line must be a JSON object.")
+    op = data.get('op', default_op)
+    if op not in BULK_OPS:
+        raise ValueError(f"op must be one of: {', '.join(BULK_OPS)}.")
+    pid = data.get('id')
+    if op == 'create':
+        # The store assigns ids; one exported with the product is ignored.
+        pid = None
+    elif pid is None and op == 'delete':
+        raise ValueError("Missing id.")
+    elif pid is not None and (type(pid) is not int or pid < 1):
+        raise ValueError("id must be a positive integer.")
+    fields = {k: to_text(data[k], k, nullable=k != 'name')
+              for k in ('name', 'description', 'category') if k in data}
+    if 'price' in data:
+        fields['price'] = to_price(data['price'])
+    if op == 'create' and ('name' not in fields or 'price' not in fields):
+        raise ValueError("Missing name or price.")
+    return op, pid, fields
+
+def apply_bulk_row(op, pid, fields):
+    """Apply one parsed bulk line to the store; returns its result."""
+    if op == 'delete':
+        if store.delete(pid):
+            return {'status': 204, 'id': pid}
+        return {'status': 404, 'id': pid, 'error': "Product not found."}
+    if pid is not None:
+        prod = store.update(pid, fields)
+        if prod is not None:
+            return {'status': 200, 'id': pid}
+    if 'name' not in fields or 'price' not in fields:
+        return {'status': 400, 'id': pid, 'error': "Missing name or price."}
+    return {'status': 201, 'id': store.create(fields)['id']}
+
+def apply_bulk_chunk(rows):
+    """
+    Apply (line number, parsed row or error result) pairs, in one
+    transaction when the store has them; returns the results with their
+    line numbers.
+    """
+    if not store.transactional:
+        # Nothing to roll back: what was applied stays, so each line
+        # reports its own outcome.
+        results = [row if isinstance(row, dict) else apply_bulk_row_safely(row)
+                   for _, row in rows]
+    else:
+        try:
+            with store.batch():
+                results = [row if isinstance(row, dict) else apply_bulk_row(*row)
+                           for _, row in rows]
+        except Exception:
+            app.logger.exception("Bulk chunk rolled back")
+            results = [row if isinstance(row, dict)
+                       else {'status': 500, 'error': "Chunk rolled back."} for _, row in rows]
+    for (number, _), result in zip(rows, results):
+        result['line'] = number
+    return results
+
+def apply_bulk_row_safely(row):
+    """apply_bulk_row, with a failure as the line's result."""
+    op, pid, fields = row
+    try:
+        return apply_bulk_row(op, pid, fields)
+    except ValueError as exc:
+        return {'status': 400, 'id': pid, 'error': str(exc)}
+    except Exception:
+        app.logger.exception("Bulk line failed")
+        return {'status': 500, 'id': pid, 'error': "Line failed."}
+
+def bulk_chunks(lines, default_op):
+    """Parse bulk lines into lists of up to BULK_CHUNK (line number, row) pairs."""
+    chunk = []
+    for number, line in lines:
+        try:
+            row = parse_bulk_row(line, default_op)
+        except ValueError as exc:
+            row = {'status': 400, 'error': str(exc)}
+        chunk.append((number, row))
+        if len(chunk) == BULK_CHUNK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def bulk_results(lines, default_op):
+    """Yield the NDJSON results of a bulk request, one chunk at a time."""
+    counts = {'created': 0, 'updated': 0, 'deleted': 0, 'failed': 0}
+    for chunk in bulk_chunks(lines, default_op):
+        results = apply_bulk_chunk(chunk)
+        for result in results:
+            counts[BULK_COUNTS.get(result['status'], 'failed')] += 1
+        yield '\n'.join([_encode(result) for result in results]) + '\n'
+    yield _encode(dict(counts, done=True)) + '\n'
+
 # ---- Routes ----
 
-# List products
+# List products (optionally paginated or streamed)
 @app.route('/products', methods=['GET'])
 def list_products():
-    return jsonify([product_repr(p) for p in products.values()]), 200
+    args = request.args
+    query = listing_query()
+    fmt = args.get('stream')
+    after = decode_cursor(args['cursor'], query['sort']) if 'cursor' in args else None
+    if fmt is None and 'limit' not in args and 'cursor' not in args:
+        key = list_key(limit=None, after=None, **query)
+        if not args:
+            return cached_json(key, lambda: [product_repr(p) for p in store.list()])
+        return cached_json(key, lambda: [product_repr(p)
+                                         for p in store.query(limit=None, **query)])
+
+    if fmt is not None:
+        if fmt not in STREAM_FORMATS:
+            abort(400, f"stream must be one of: {', '.join(STREAM_FORMATS)}.")
+        limit = int_arg('limit', None)
+        return Response(stream_products(query, after, limit, fmt),
+                        mimetype=STREAM_FORMATS[fmt])
+
+    limit = int_arg('limit', DEFAULT_PAGE_LIMIT, maximum=MAX_PAGE_LIMIT)
+
+    def build():
+        page = store.query(after=after, limit=limit + 1, **query)
+        next_cursor = None
+        if len(page) > limit:
+            next_cursor = encode_cursor(sort_key(page[limit - 1], query['sort']))
+        return {
+            "products": [product_repr(p) for p in page[:limit]],
+            "next_cursor": next_cursor
+        }
+    return cached_json(list_key(after=after, limit=limit, **query), build)
+
+# Search products by name and description
+@app.route('/products/search', methods=['GET'])
+def search_products():
+    q = request.args.get('q', '')
+    if not q.strip():
+        abort(400, "Missing search query q.")
+    limit = int_arg('limit', DEFAULT_SEARCH_LIMIT, maximum=MAX_PAGE_LIMIT)
+    offset = int_arg('offset', 0, minimum=0, maximum=MAX_SEARCH_OFFSET)
+    total, hits = search_index.search(q, limit, offset)
+    products = []
+    for pid, score in hits:
+        prod = store.get(pid)
+        if prod is not None:
+            products.append(dict(product_repr(prod), score=round(score, 4)))
+    return jsonify({"products": products, "total": total}), 200
+
+# Catalog counts and price statistics
+@app.route('/products/stats', methods=['GET'])
+def product_stats():
+    summary = catalog_stats.summary(request.args.get('category'), percentiles_arg())
+    return jsonify(summary), 200
+
+# Changes since a sequence number
+@app.route('/products/changes', methods=['GET'])
+def list_changes():
+    since, log_id = feed_position()
+    if since is None:
+        return jsonify({"log": change_log.log_id, "next_since": change_log.last_seq,
+                        "changes": [], "more": False}), 200
+    limit = int_arg('limit', DEFAULT_CHANGES_LIMIT, maximum=MAX_CHANGES_LIMIT)
+    try:
+        changes = change_log.since(since, limit, log_id)
+    except ChangeGap as exc:
+        abort(410, str(exc))
+    next_since = changes[-1]['seq'] if changes else since
+    return jsonify({
+        "log": change_log.log_id,
+        "next_since": next_since,
+        "changes": [change_repr(c) for c in changes],
+        "more": change_log.last_seq > next_since
+    }), 200
+
+# Live changes as Server-Sent Events
+@app.route('/products/changes/stream', methods=['GET'])
+def stream_changes():
+    since, log_id = feed_position()
+    if since is None:
+        since = change_log.last_seq
+    try:
+        change_log.check(since, log_id)
+    except ChangeGap as exc:
+        abort(410, str(exc))
+    return Response(change_events(since), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# Create, upsert or delete products from an NDJSON stream
+@app.route('/products/bulk', methods=['POST'])
+def bulk_products():
+    op = request.args.get('op', 'create')
+    if op not in BULK_OPS:
+        abort(400, f"op must be one of: {', '.join(BULK_OPS)}.")
+    results = bulk_results(ndjson_lines(request.stream), op)
+    return Response(stream_with_context(results), mimetype='application/x-ndjson')
 
 # Create a new product
 @app.route('/products', methods=['POST'])
 def add_product():
-    global product_id_seq
-    data = request.get_json()
+    data = request_body()
     required = ['name', 'price']
     if not all(k in data for k in required):
         abort(400, "Missing name or price in request body.")
 
-    prod = {
-        "id": product_id_seq,
-        "name": data['name'],
-        "description": data.get("description", ""),
-        "price": float(data['price']),
-        "category": data.get("category", "")
-    }
-    products[product_id_seq] = prod
-    product_id_seq += 1
+    prod = store.create({
+        "name": parse_text(data['name'], "name", nullable=False),
+        "description": parse_text(data.get("description"), "description"),
+        "price": parse_price(data['price']),
+        "category": parse_text(data.get("category"), "category")
+    })
     return jsonify(product_repr(prod)), 201
 
 # Get product by ID
 @app.route('/products/<int:pid>', methods=['GET'])
 def get_product(pid):
-    prod = products.get(pid)
-    if not prod:
-        abort(404, "Product not found.")
-    return jsonify(product_repr(prod)), 200
+    def build():
+        prod = store.get(pid)
+        if not prod:
+            abort(404, "Product not found.")
+        return product_repr(prod)
+    return cached_json(product_key(pid), build)
 
 # Update product
 @app.route('/products/<int:pid>', methods=['PUT'])
 def update_product(pid):
-    prod = products.get(pid)
-    if not prod:
-        abort(404, "Product not found.")
-    data = request.get_json()
+    data = request_body()
+    changes = {}
     if "name" in data:
-        prod["name"] = data["name"]
+        changes["name"] = parse_text(data["name"], "name", nullable=False)
     if "description" in data:
-        prod["description"] = data["description"]
+        changes["description"] = parse_text(data["description"], "description")
     if "price" in data:
-        prod["price"] = float(data["price"])
+        changes["price"] = parse_price(data["price"])
     if "category" in data:
-        prod["category"] = data["category"]
+        changes["category"] = parse_text(data["category"], "category")
+    prod = store.update(pid, changes)
+    if not prod:
+        abort(404, "Product not found.")
     return jsonify(product_repr(prod)), 200
 
 # Delete product
 @app.route('/products/<int:pid>', methods=['DELETE'])
 def delete_product(pid):
-    if pid not in products:
+    if not store.delete(pid):
         abort(404, "Product not found.")
-    del products[pid]
     return '', 204
 
 # ---- Run server ----
 if __name__ == "__main__":
     app.run(debug=True)
-```
-
-**Features:**
-- CRUD operations for products.
-- Uses JSON for request/response.
-- Simple in-memory storage simulating a database.
-
-**Note:** For production, you’d use a real database and add authentication, validation, error handling, and pagination. Let me know if you need those!
\ No newline at end of file
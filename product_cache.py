@@ -0,0 +1,183 @@
+# product_cache.py
+"""
+Response cache for product reads, with strong ETags.
+
+ResponseCache keeps the serialized JSON bodies of GET /products/<id> and
+of non-streamed GET /products listings, keyed by product id or by the
+normalized listing query (see list_key), and evicts the least recently
+used once the bodies exceed `max_bytes`. It is kept current by
+subscribing to the store (see product_store), so a change drops only the
+entries it can affect:
+
+- the entry of the product itself
+- the listings whose filter matched the product before or after the
+  change (same category, or no category, and a price range containing its
+  old or new price), whatever their sort or cursor, since an insert or a
+  removal shifts every later page
+
+Every change also bumps `version`, the catalog version counter. A body is
+only stored if the version did not move while it was being built, so a
+response built from data read before a concurrent change is never cached
+after that change has invalidated its key.
+
+A store shared with other processes (SQLiteStore; store.shared is true)
+cannot tell this process about their writes, so there the cache also
+checks store.version() before every lookup and drops everything when it
+has moved: with a shared store, any write (this process's included)
+empties the cache, which suits a catalog that is read far more often
+than it changes.
+
+ETags are a hash of the body, so they are strong, identical in every
+worker process, and unaffected by evictions; a body too large to cache
+(over max_bytes // MAX_ENTRY_FRACTION) still gets one.
+
+Usage:
+    cache = open_cache(store, max_bytes=64 << 20)
+    body, etag = cache.fetch(product_key(7), lambda: encode(product(7)))
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Default cache size, in bytes of response bodies.
+DEFAULT_MAX_BYTES = 64 << 20
+# A body larger than this fraction of the cache is served but not kept.
+MAX_ENTRY_FRACTION = 8
+
+
+def make_etag(body):
+    """Strong ETag (unquoted) of a response body."""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def product_key(pid):
+    """Cache key of GET /products/<pid>."""
+    return ('product', pid)
+
+
+def list_key(category, min_price, max_price, sort, after, limit):
+    """Cache key of a listing; `after` is a decoded cursor, `limit` None when unpaged."""
+    return ('list', category, min_price, max_price, sort, after, limit)
+
+
+def _matches(key, prod):
+    """True when `prod` falls within the filter of listing `key`."""
+    _, category, min_price, max_price = key[:4]
+    price = prod['price']
+    return ((category is None or prod['category'] == category)
+            and (min_price is None or price >= min_price)
+            and (max_price is None or price <= max_price))
+
+
+class ResponseCache:
+    """LRU cache of serialized product responses; see the module docstring."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, store=None):
+        self.max_bytes = max_bytes
+        self.version = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        # Listing keys by their category filter (None: any category).
+        self._lists = {}
+        self._shared = store if store is not None and store.shared else None
+        self._store_version = self._shared.version() if self._shared else None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        """Bytes of cached response bodies."""
+        return self._size
+
+    def fetch(self, key, build):
+        """
+        (body, etag) of the response under `key`; on a miss the body is
+        built by build(), which returns bytes, and cached if it fits.
+        """
+        with self._lock:
+            self._check_store()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+            version = self.version
+        body = build()
+        entry = (body, make_etag(body))
+        if len(body) * MAX_ENTRY_FRACTION <= self.max_bytes:
+            with self._lock:
+                if self.version == version and key not in self._entries:
+                    self._put(key, entry)
+        return entry
+
+    def apply(self, old, new):
+        """Store listener: drop the entries a change from `old` to `new` affects."""
+        with self._lock:
+            self.version += 1
+            prod = new if new is not None else old
+            self._discard(product_key(prod['id']))
+            for changed in (old, new):
+                if changed is None:
+                    continue
+                for category in (None, changed['category']):
+                    keys = self._lists.get(category)
+                    if keys:
+                        for key in [k for k in keys if _matches(k, changed)]:
+                            self._discard(key)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self.version += 1
+        self._entries.clear()
+        self._lists.clear()
+        self._size = 0
+
+    def _check_store(self):
+        if self._shared is None:
+            return
+        version = self._shared.version()
+        if version != self._store_version:
+            self._store_version = version
+            self._clear()
+
+    def _put(self, key, entry):
+        self._entries[key] = entry
+        self._size += len(entry[0])
+        if key[0] == 'list':
+            self._lists.setdefault(key[1], set()).add(key)
+        while self._size > self.max_bytes:
+            self._discard(next(iter(self._entries)))
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._size -= len(entry[0])
+        if key[0] == 'list':
+            keys = self._lists[key[1]]
+            keys.discard(key)
+            if not keys:
+                del self._lists[key[1]]
+
+
+def open_cache(store, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Create a response cache kept current by `store`'s changes.
+
+    Args:
+        store: a product_store backend
+        max_bytes: int, bytes of response bodies kept; 0 disables caching
+            (bodies still get ETags)
+
+    Returns:
+        ResponseCache subscribed to the store's changes
+    """
+    cache = ResponseCache(max_bytes, store)
+    store.subscribe(cache.apply)
+    return cache
@@ -0,0 +1,207 @@
+# product_changes.py
+"""
+Change feed of the product catalog, for consumers that sync by delta.
+
+ChangeLog subscribes to the store (see product_store) and gives every
+committed create, update and delete the next sequence number, 1, 2, 3...
+It keeps the last `capacity` changes in a ring buffer, so memory is
+bounded and the change with sequence number s is found at s % capacity
+in O(1):
+
+- since(seq, limit) returns the changes after `seq`, oldest first; a
+  consumer that fell further behind than the ring reaches, or that holds
+  a sequence number this log never issued, gets ChangeGap and must
+  resync from a full listing
+- wait(seq, timeout) blocks until there is a change after `seq`, for live
+  tailing (Server-Sent Events in product_api)
+
+Each log has a random `log_id`. Sequence numbers restart at 1 when the
+process does, so a consumer passes back the log_id it was reading along
+with its position, and a different one is a ChangeGap too.
+
+A change is a dict: seq, op ('create', 'update' or 'delete'), id, and
+product, the product after the change (None for a delete). It holds the
+store's own product dict, which no one modifies once it is published.
+
+The listener only hears about writes made through this store object (see
+product_store), so for a store shared with other processes (store.shared,
+SQLite) open_change_log returns a SharedChangeLog instead. Its changes
+are recorded by the database itself, in its catalog_changes table, so
+every worker process serves the same feed: one sequence across all their
+writes, and a log_id fixed when the database was created. Waiting polls
+the table every SHARED_POLL seconds, sooner on this process's writes.
+
+Usage:
+    log = open_change_log(store)
+    changes = log.since(0, limit=100)          # [{'seq': 1, ...}, ...]
+    log.wait(log.last_seq, timeout=15)          # True once a change arrives
+"""
+
+import os
+import threading
+import time
+
+DEFAULT_CAPACITY = 65536
+# Seconds between checks of a shared store for other processes' changes.
+SHARED_POLL = 0.25
+
+
+class ChangeGap(LookupError):
+    """The changes asked for are not in the log; the consumer must resync."""
+
+
+class ChangeLog:
+    """Bounded, sequence-numbered log of catalog changes; see the module docstring."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1.")
+        self.capacity = capacity
+        self.log_id = os.urandom(8).hex()
+        self._ring = [None] * capacity
+        self._last = 0
+        self._changed = threading.Condition()
+
+    @property
+    def last_seq(self):
+        """Sequence number of the latest change; 0 before the first."""
+        return self._last
+
+    @property
+    def first_seq(self):
+        """Sequence number of the oldest change still in the log."""
+        return max(self._last - self.capacity + 1, 1)
+
+    def apply(self, old, new):
+        """Store listener: record the change from `old` to `new`."""
+        if old is None:
+            op, prod = 'create', new
+        elif new is None:
+            op, prod = 'delete', old
+        else:
+            op, prod = 'update', new
+        with self._changed:
+            seq = self._last + 1
+            self._ring[seq % self.capacity] = {
+                'seq': seq, 'op': op, 'id': prod['id'], 'product': new,
+            }
+            self._last = seq
+            self._changed.notify_all()
+
+    def check(self, seq, log_id=None):
+        """Raise ChangeGap unless every change after `seq` is in this log."""
+        if log_id is not None and log_id != self.log_id:
+            raise ChangeGap("The change log was restarted.")
+        if seq > self._last:
+            raise ChangeGap(f"Sequence number {seq} was never issued.")
+        if seq < self.first_seq - 1:
+            raise ChangeGap(f"Changes after {seq} are no longer in the log.")
+
+    def since(self, seq, limit=None, log_id=None):
+        """
+        The changes after sequence number `seq`, oldest first.
+
+        Args:
+            seq: int, the last change the consumer has seen (0: none)
+            limit: int, most changes returned, or None for all
+            log_id: str, the log_id the consumer read `seq` from, if any
+
+        Returns:
+            list of change dicts
+
+        Raises:
+            ChangeGap: when changes after `seq` have been dropped from the
+                log, or `seq` or `log_id` does not belong to it
+        """
+        with self._changed:
+            self.check(seq, log_id)
+            end = self._last if limit is None else min(self._last, seq + limit)
+            ring, capacity = self._ring, self.capacity
+            return [ring[s % capacity] for s in range(seq + 1, end + 1)]
+
+    def wait(self, seq, timeout=None):
+        """Block until there is a change after `seq`, or `timeout` seconds pass."""
+        with self._changed:
+            return self._changed.wait_for(lambda: self._last > seq, timeout)
+
+
+class SharedChangeLog:
+    """
+    The change log of a shared store, read from the changes it records
+    (see SQLiteStore.changes); the same interface as ChangeLog. It keeps
+    at least `capacity` changes: more when another follower of the store
+    asked for more (see SQLiteStore.keep_changes).
+    """
+
+    def __init__(self, store, capacity=DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1.")
+        store.keep_changes(capacity)
+        self.capacity = capacity
+        self.log_id = store.change_log_id()
+        self._store = store
+        self._changed = threading.Condition()
+
+    @property
+    def last_seq(self):
+        """Sequence number of the latest change; 0 before the first."""
+        return self._store.change_bounds()[1]
+
+    @property
+    def first_seq(self):
+        """Sequence number of the oldest change still in the log."""
+        return self._store.change_bounds()[0]
+
+    def apply(self, old, new):
+        """Store listener: wake the waiters; the store has recorded the change."""
+        with self._changed:
+            self._changed.notify_all()
+
+    def check(self, seq, log_id=None):
+        """Raise ChangeGap unless every change after `seq` is in this log."""
+        if log_id is not None and log_id != self.log_id:
+            raise ChangeGap("The change log was restarted.")
+        first, last = self._store.change_bounds()
+        if seq > last:
+            raise ChangeGap(f"Sequence number {seq} was never issued.")
+        if seq < first - 1:
+            raise ChangeGap(f"Changes after {seq} are no longer in the log.")
+
+    def since(self, seq, limit=None, log_id=None):
+        """The changes after sequence number `seq`, oldest first; see ChangeLog.since."""
+        self.check(seq, log_id)
+        changes = self._store.changes(seq, limit)
+        if changes and changes[0]['seq'] != seq + 1:
+            # Another process's writes dropped them since the check.
+            raise ChangeGap(f"Changes after {seq} are no longer in the log.")
+        return changes
+
+    def wait(self, seq, timeout=None):
+        """Block until there is a change after `seq`, or `timeout` seconds pass."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.last_seq <= seq:
+            poll = SHARED_POLL
+            if deadline is not None:
+                poll = min(poll, deadline - time.monotonic())
+                if poll <= 0:
+                    return False
+            with self._changed:
+                self._changed.wait(poll)
+        return True
+
+
+def open_change_log(store, capacity=DEFAULT_CAPACITY):
+    """
+    Create a change log of `store`'s changes from now on.
+
+    Args:
+        store: a product_store backend
+        capacity: int, changes kept
+
+    Returns:
+        ChangeLog subscribed to the store's changes; for a shared store a
+        SharedChangeLog of every process's changes
+    """
+    log = SharedChangeLog(store, capacity) if store.shared else ChangeLog(capacity)
+    store.subscribe(log.apply)
+    return log
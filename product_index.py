@@ -0,0 +1,271 @@
+# product_index.py
+"""
+Secondary indexes for the in-memory product store.
+
+CatalogIndex is kept up to date on every insert, update and delete, and
+answers filtered listings without scanning the catalog:
+
+- by category: a hash index, category -> array('q') of product ids in
+  ascending order (new ids are the largest, so inserts append)
+- by price: a SortedIndex of (price, id) keys over all products
+- by category and price: one SortedIndex per category
+
+A page of k products matching a category and/or price range, in id or
+price order, costs O(log n + k). The exception is a price range listed in
+id order, which has to collect and sort the m products in the range first:
+O(log n + m log m).
+
+SortedIndex stores its sorted keys in blocks of at most 2 * BLOCK_SIZE
+entries, each a pair of parallel array('d') prices and array('q') ids,
+with the last key of every block in a list for bisect (the leaf level of
+a B+ tree). An insert or delete moves at most one block's entries, and a
+key costs 16 bytes plus its share of the block list. RankedIndex adds a
+count per block, to find the key of a given rank (see product_stats).
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Entries per SortedIndex block; a block is split when it reaches twice this.
+BLOCK_SIZE = 512
+# Bounds outside every product id, for range lookups by price alone.
+MIN_ID = -(1 << 63)
+MAX_ID = (1 << 63) - 1
+
+SORTS = ('id', 'price', '-price')
+
+
+class SortedIndex:
+    """Sorted multiset of (price, id) keys, iterable by price range."""
+
+    def __init__(self):
+        self._prices = []
+        self._ids = []
+        self._maxes = []
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def _locate(self, price, pid):
+        """(block, position) of the first key >= (price, pid)."""
+        b = bisect_left(self._maxes, (price, pid))
+        if b == len(self._maxes):
+            return b, 0
+        prices = self._prices[b]
+        lo = bisect_left(prices, price)
+        hi = bisect_right(prices, price, lo)
+        return b, bisect_left(self._ids[b], pid, lo, hi)
+
+    def insert(self, price, pid):
+        if not self._maxes:
+            self._prices.append(array('d', (price,)))
+            self._ids.append(array('q', (pid,)))
+            self._maxes.append((price, pid))
+            self._len = 1
+            return
+        b, i = self._locate(price, pid)
+        if b == len(self._maxes):
+            b -= 1
+            i = len(self._ids[b])
+        prices, ids = self._prices[b], self._ids[b]
+        prices.insert(i, price)
+        ids.insert(i, pid)
+        self._len += 1
+        if i == len(ids) - 1:
+            self._maxes[b] = (price, pid)
+        if len(ids) >= 2 * BLOCK_SIZE:
+            self._prices.insert(b + 1, prices[BLOCK_SIZE:])
+            self._ids.insert(b + 1, ids[BLOCK_SIZE:])
+            del prices[BLOCK_SIZE:]
+            del ids[BLOCK_SIZE:]
+            self._maxes.insert(b, (prices[-1], ids[-1]))
+
+    def remove(self, price, pid):
+        """Remove one (price, pid) key; KeyError if it is not present."""
+        b, i = self._locate(price, pid)
+        if b == len(self._maxes) or self._ids[b][i] != pid or self._prices[b][i] != price:
+            raise KeyError((price, pid))
+        prices, ids = self._prices[b], self._ids[b]
+        del prices[i]
+        del ids[i]
+        self._len -= 1
+        if not ids:
+            del self._prices[b], self._ids[b], self._maxes[b]
+        elif i == len(ids):
+            self._maxes[b] = (prices[-1], ids[-1])
+
+    def irange(self, min_price=None, max_price=None, after=None, reverse=False):
+        """
+        Yield the ids of keys with min_price <= price <= max_price, in
+        ascending key order (descending with reverse), starting after the
+        key `after` (a (price, id) pair) when it is given.
+        """
+        if not reverse:
+            start = (0, 0)
+            if min_price is not None:
+                start = self._locate(min_price, MIN_ID)
+            if after is not None:
+                start = max(start, self._locate(after[0], after[1] + 1))
+            b, i = start
+            while b < len(self._maxes):
+                prices, ids = self._prices[b], self._ids[b]
+                if max_price is None:
+                    yield from ids[i:]
+                else:
+                    end = bisect_right(prices, max_price, i)
+                    yield from ids[i:end]
+                    if end < len(prices):
+                        return
+                b, i = b + 1, 0
+        else:
+            start = (len(self._maxes), 0)
+            if max_price is not None:
+                start = self._locate(max_price, MAX_ID)
+            if after is not None:
+                start = min(start, self._locate(after[0], after[1]))
+            # Step back from the first key past the range to the last in it.
+            b, i = start
+            while b > 0 or i > 0:
+                if i == 0:
+                    b -= 1
+                    i = len(self._ids[b])
+                prices, ids = self._prices[b], self._ids[b]
+                if min_price is None:
+                    begin = 0
+                else:
+                    begin = bisect_left(prices, min_price, 0, i)
+                yield from reversed(ids[begin:i])
+                if begin > 0:
+                    return
+                i = 0
+
+
+class RankedIndex(SortedIndex):
+    """
+    SortedIndex that also finds the key of a given rank in O(log n), for
+    percentiles.
+
+    A Fenwick tree over the block lengths gives the number of keys before
+    any block. An insert or remove that keeps the blocks adds +-1 to one
+    block's count; one that splits or drops a block rebuilds the tree,
+    O(n / BLOCK_SIZE), which happens once per BLOCK_SIZE inserts at most.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._tree = [0]
+
+    def insert(self, price, pid):
+        b = min(bisect_left(self._maxes, (price, pid)), len(self._maxes) - 1)
+        blocks = len(self._maxes)
+        super().insert(price, pid)
+        if len(self._maxes) != blocks:
+            self._rebuild()
+        else:
+            self._add(b, 1)
+
+    def remove(self, price, pid):
+        b = bisect_left(self._maxes, (price, pid))
+        blocks = len(self._maxes)
+        super().remove(price, pid)
+        if len(self._maxes) != blocks:
+            self._rebuild()
+        else:
+            self._add(b, -1)
+
+    def _rebuild(self):
+        tree = [0] * (len(self._ids) + 1)
+        for b, ids in enumerate(self._ids, 1):
+            tree[b] += len(ids)
+            parent = b + (b & -b)
+            if parent < len(tree):
+                tree[parent] += tree[b]
+        self._tree = tree
+
+    def _add(self, b, delta):
+        tree = self._tree
+        b += 1
+        while b < len(tree):
+            tree[b] += delta
+            b += b & -b
+
+    def select(self, k):
+        """The price of the key of rank k (0 is the smallest); IndexError if out of range."""
+        if not 0 <= k < self._len:
+            raise IndexError(k)
+        tree = self._tree
+        b = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        # Descend to the last block whose preceding keys number <= k.
+        while step:
+            if b + step < len(tree) and tree[b + step] <= k:
+                b += step
+                k -= tree[b]
+            step >>= 1
+        return self._prices[b][k]
+
+
+def _iter_after(ids, after):
+    """Yield the ids > after from a sorted array, without copying it."""
+    for i in range(0 if after is None else bisect_right(ids, after), len(ids)):
+        yield ids[i]
+
+
+class CatalogIndex:
+    """The category, price and category + price indexes of a catalog."""
+
+    def __init__(self):
+        self.by_category = {}
+        self.by_price = SortedIndex()
+        self.by_category_price = {}
+
+    def add(self, pid, category, price):
+        ids = self.by_category.get(category)
+        if ids is None:
+            ids = self.by_category[category] = array('q')
+            self.by_category_price[category] = SortedIndex()
+        if not ids or ids[-1] < pid:
+            ids.append(pid)
+        else:
+            ids.insert(bisect_left(ids, pid), pid)
+        self.by_price.insert(price, pid)
+        self.by_category_price[category].insert(price, pid)
+
+    def remove(self, pid, category, price):
+        ids = self.by_category[category]
+        del ids[bisect_left(ids, pid)]
+        self.by_price.remove(price, pid)
+        self.by_category_price[category].remove(price, pid)
+        if not ids:
+            del self.by_category[category], self.by_category_price[category]
+
+    def move(self, pid, old_category, old_price, category, price):
+        """Re-key a product whose category and/or price changed."""
+        if category != old_category:
+            self.remove(pid, old_category, old_price)
+            self.add(pid, category, price)
+            return
+        # Same category: its id array stays as it is.
+        for index in (self.by_price, self.by_category_price[category]):
+            index.remove(old_price, pid)
+            index.insert(price, pid)
+
+    def query(self, category=None, min_price=None, max_price=None, sort='id', after=None):
+        """
+        Yield the ids of matching products in `sort` order (one of SORTS).
+
+        `after` is the sort key of the last product already seen: an id for
+        sort 'id', a (price, id) pair for the price sorts.
+        """
+        if category is not None and category not in self.by_category:
+            return iter(())
+        if sort == 'id':
+            if min_price is None and max_price is None:
+                # Unfiltered id order is the store's own page(); only the
+                # category case comes here.
+                return _iter_after(self.by_category[category], after)
+            index = self.by_price if category is None else self.by_category_price[category]
+            return _iter_after(array('q', sorted(index.irange(min_price, max_price))), after)
+        index = self.by_price if category is None else self.by_category_price[category]
+        return index.irange(min_price, max_price, after, reverse=(sort == '-price'))
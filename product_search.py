@@ -0,0 +1,386 @@
+# product_search.py
+"""
+Full-text search over product names and descriptions.
+
+SearchIndex is an in-process inverted index ranked with BM25. It is kept
+current by subscribing to the store (see product_store), so every create,
+update and delete changes only the postings of the terms involved; the
+catalog is read in full once, when the index is opened.
+
+- tokens are the casefolded runs of word characters (str \\w), so "Desk
+  Lamp (LED)" indexes "desk", "lamp" and "led"
+- name tokens count NAME_WEIGHT times, so a match in the name outranks the
+  same match in a description
+- every query word must match (AND); the last word also matches as a
+  prefix, for search-as-you-type, unless the query ends with a space. A
+  prefix expands to at most MAX_EXPANSIONS terms, the most frequent first,
+  and a longer term it expands to scores PREFIX_WEIGHT of an exact match
+- postings are parallel arrays per term: product ids as array('I') in
+  ascending order (new ids are the largest, so inserts append) and term
+  frequencies as array('H'); 6 bytes per (term, product) pair. Document
+  lengths are one array('I') indexed by product id, which suits the dense
+  ids both stores hand out
+- removing a product zeroes its term frequencies instead of moving the
+  rest of each postings list; a later add of the same id reuses the dead
+  posting, and a term's arrays are rewritten without their dead postings
+  once those are more than half of them (amortized O(log n) per change)
+- prefixes are looked up in a TermList, a sorted list of every term that
+  takes new terms through a small buffer, so product-specific words (SKUs,
+  model numbers) do not each move the whole list
+- a multi-word query starts from its rarest word and probes the longer
+  postings lists by bisection, so a common word does not make a specific
+  query slow
+
+A store shared with other processes (store.shared) does not tell this
+process about their writes, so there the index does not subscribe.
+It loads from one snapshot of the store, remembers the sequence number
+of the store's change log (SQLiteStore.changes) at that point, and every
+search first applies the changes recorded since, each as a listener
+call would: O(1) when nothing changed, a few postings per change
+otherwise. Only an index that fell more than CHANGES_KEPT changes behind
+is rebuilt, O(n).
+
+Usage:
+    index = open_index(store)
+    total, hits = index.search('desk la', limit=20)   # [(id, score), ...]
+"""
+
+import heapq
+import math
+import re
+import threading
+from array import array
+from bisect import bisect_left, insort
+
+from product_store import CHANGES_KEPT, iter_pages
+
+# BM25 parameters: term frequency saturation and document length normalization.
+K1 = 1.2
+B = 0.75
+# Weight of a name token relative to a description token.
+NAME_WEIGHT = 3
+# Terms a query prefix may expand to, and the score weight of those that
+# are longer than the prefix.
+MAX_EXPANSIONS = 64
+PREFIX_WEIGHT = 0.5
+# New terms buffered before they are merged into the sorted term list.
+TERM_BUFFER = 4096
+# Largest term frequency stored in a posting (array('H')).
+MAX_TF = 0xFFFF
+
+_TOKEN = re.compile(r'\w+')
+# Sorts after every string starting with a given prefix.
+_PREFIX_END = chr(0x10FFFF)
+
+
+def tokenize(text):
+    """Casefolded word tokens of `text`, in order."""
+    return _TOKEN.findall(text.casefold())
+
+
+def _document(prod):
+    """The weighted term frequencies and length of a product."""
+    name = tokenize(prod.get('name') or '')
+    description = tokenize(prod.get('description') or '')
+    terms = {}
+    get = terms.get
+    for term in name:
+        terms[term] = get(term, 0) + NAME_WEIGHT
+    for term in description:
+        terms[term] = get(term, 0) + 1
+    return terms, NAME_WEIGHT * len(name) + len(description)
+
+
+class TermList:
+    """
+    Set of terms, searchable by prefix.
+
+    Terms are kept in a sorted list plus a sorted buffer of at most
+    TERM_BUFFER new ones; a full buffer is appended and the list re-sorted,
+    which merges the two runs in one pass. Removed terms stay in place,
+    skipped by lookups, until they are half of all entries; then the list
+    is rebuilt without them.
+    """
+
+    def __init__(self):
+        self._sorted = []
+        self._buffer = []
+        self._removed = set()
+
+    def __len__(self):
+        return len(self._sorted) + len(self._buffer) - len(self._removed)
+
+    def add(self, term):
+        """Add a term that is not in the set."""
+        if term in self._removed:
+            self._removed.discard(term)
+            return
+        insort(self._buffer, term)
+        if len(self._buffer) >= TERM_BUFFER:
+            self._sorted += self._buffer
+            self._sorted.sort()
+            self._buffer = []
+
+    def remove(self, term):
+        """Remove a term that is in the set."""
+        self._removed.add(term)
+        if 2 * len(self._removed) > len(self._sorted) + len(self._buffer):
+            removed = self._removed
+            self._sorted = sorted(t for t in self._sorted + self._buffer if t not in removed)
+            self._buffer = []
+            self._removed = set()
+
+    def prefixed(self, prefix):
+        """The terms starting with `prefix`, in no particular order."""
+        end = prefix + _PREFIX_END
+        matches = []
+        for terms in (self._sorted, self._buffer):
+            start = bisect_left(terms, prefix)
+            matches += terms[start:bisect_left(terms, end, start)]
+        if self._removed:
+            matches = [t for t in matches if t not in self._removed]
+        return matches
+
+
+class SearchIndex:
+    """BM25-ranked inverted index of product names and descriptions."""
+
+    def __init__(self, store=None):
+        self._clear()
+        self._store = store
+        # Last change of a shared store applied here; None when not following one.
+        self._seq = None
+        self._lock = threading.Lock()
+
+    def _clear(self):
+        self._postings = {}
+        self._dead = {}
+        self._terms = TermList()
+        self._lengths = array('I')
+        self._docs = 0
+        self._total_length = 0
+
+    def __len__(self):
+        return self._docs
+
+    def add(self, prod):
+        """Index a product that is not in the index yet."""
+        with self._lock:
+            self._add(prod)
+
+    def remove(self, prod):
+        """Unindex a product, given as it was when it was added."""
+        with self._lock:
+            self._remove(prod)
+
+    def apply(self, old, new):
+        """Store listener: replace `old` (if any) with `new` (if any)."""
+        if (old is not None and new is not None and old['name'] == new['name']
+                and old['description'] == new['description']):
+            return
+        with self._lock:
+            self._apply(old, new)
+
+    def _apply(self, old, new):
+        if old is not None:
+            if new is not None and (old['name'] == new['name']
+                                    and old['description'] == new['description']):
+                return
+            self._remove(old)
+        if new is not None:
+            self._add(new)
+
+    def _add(self, prod):
+        terms, length = _document(prod)
+        if not length:
+            return
+        pid = prod['id']
+        lengths = self._lengths
+        if pid >= len(lengths):
+            lengths.extend(bytes(pid + 1 - len(lengths)))
+        if lengths[pid]:
+            raise ValueError(f"Product {pid} is already indexed.")
+        dead = self._dead
+        for term, tf in terms.items():
+            entry = self._postings.get(term)
+            if entry is None:
+                entry = self._postings[term] = (array('I'), array('H'))
+                self._terms.add(term)
+            ids, tfs = entry
+            if tf > MAX_TF:
+                tf = MAX_TF
+            if not ids or ids[-1] < pid:
+                ids.append(pid)
+                tfs.append(tf)
+                continue
+            i = bisect_left(ids, pid)
+            if i < len(ids) and ids[i] == pid:
+                tfs[i] = tf
+                dead[term] -= 1
+                if not dead[term]:
+                    del dead[term]
+            else:
+                ids.insert(i, pid)
+                tfs.insert(i, tf)
+        lengths[pid] = length
+        self._docs += 1
+        self._total_length += length
+
+    def _remove(self, prod):
+        terms, length = _document(prod)
+        pid = prod['id']
+        if not length or pid >= len(self._lengths) or not self._lengths[pid]:
+            return
+        postings = self._postings
+        for term in terms:
+            ids, tfs = postings[term]
+            tfs[bisect_left(ids, pid)] = 0
+            dead = self._dead.get(term, 0) + 1
+            if dead == len(ids):
+                del postings[term]
+                self._terms.remove(term)
+                self._dead.pop(term, None)
+            elif dead > len(ids) // 2:
+                live = [i for i, tf in enumerate(tfs) if tf]
+                postings[term] = (array('I', [ids[i] for i in live]),
+                                  array('H', [tfs[i] for i in live]))
+                self._dead.pop(term, None)
+            else:
+                self._dead[term] = dead
+        self._lengths[pid] = 0
+        self._docs -= 1
+        self._total_length -= length
+
+    def _expand(self, word, prefix):
+        """(ids, tfs, document frequency, weight) of the terms matching a query word."""
+        postings, dead = self._postings, self._dead
+
+        def df(term):
+            return len(postings[term][0]) - dead.get(term, 0)
+
+        if not prefix:
+            return [postings[word] + (df(word), 1.0)] if word in postings else []
+        matches = self._terms.prefixed(word)
+        if len(matches) > MAX_EXPANSIONS:
+            matches = heapq.nlargest(MAX_EXPANSIONS, matches, key=df)
+        return [postings[t] + (df(t), 1.0 if t == word else PREFIX_WEIGHT) for t in matches]
+
+    def _idf(self, df):
+        return math.log(1 + (self._docs - df + 0.5) / (df + 0.5))
+
+    def _score(self, lists, candidates=None):
+        """
+        BM25 scores of one query word, {id: score}, best expansion per
+        product; only for `candidates` when given.
+        """
+        lengths = self._lengths
+        norm = K1 / (self._total_length / self._docs)
+        base = K1 * (1 - B)
+        scores = {}
+        for ids, tfs, df, weight in lists:
+            idf = self._idf(df) * (K1 + 1) * weight
+            if candidates is None:
+                pairs = zip(ids, tfs)
+            elif len(candidates) * 16 < len(ids):
+                pairs = []
+                for pid in candidates:
+                    i = bisect_left(ids, pid)
+                    if i < len(ids) and ids[i] == pid:
+                        pairs.append((pid, tfs[i]))
+            else:
+                pairs = ((pid, tf) for pid, tf in zip(ids, tfs) if pid in candidates)
+            for pid, tf in pairs:
+                if not tf:
+                    continue
+                score = idf * tf / (tf + base + B * norm * lengths[pid])
+                if score > scores.get(pid, 0.0):
+                    scores[pid] = score
+        return scores
+
+    def _load(self, page_size=1000):
+        """Index every product of the shared store, as of one snapshot of it."""
+        store = self._store
+        with store.snapshot():
+            seq = store.change_bounds()[1]
+            self._clear()
+            for page in iter_pages(store, size=page_size):
+                for prod in page:
+                    self._add(prod)
+        self._seq = seq
+
+    def _check_store(self):
+        if self._seq is None:
+            return
+        changes = self._store.changes(self._seq)
+        if changes and changes[0]['seq'] != self._seq + 1:
+            # The log no longer reaches back to this index.
+            self._load()
+            return
+        for change in changes:
+            self._apply(change['old'], change['product'])
+        if changes:
+            self._seq = changes[-1]['seq']
+
+    def search(self, query, limit=20, offset=0):
+        """
+        Rank the products matching every word of `query`.
+
+        Args:
+            query: str, words to match; the last one also as a prefix
+                unless the query ends with whitespace
+            limit: int, hits to return
+            offset: int, best hits to skip first
+
+        Returns:
+            (total, hits): the number of matching products, and up to
+            `limit` (id, score) pairs, best first (ties by id)
+        """
+        words = tokenize(query)
+        if not words:
+            return 0, []
+        last_is_prefix = not query[-1].isspace()
+        with self._lock:
+            self._check_store()
+            if not self._docs:
+                return 0, []
+            groups = []
+            for word in dict.fromkeys(words):
+                lists = self._expand(word, last_is_prefix and word == words[-1])
+                if not lists:
+                    return 0, []
+                groups.append(lists)
+            # Rarest word first: its matches bound the rest.
+            groups.sort(key=lambda lists: sum(entry[2] for entry in lists))
+            scores = self._score(groups[0])
+            for lists in groups[1:]:
+                if not scores:
+                    break
+                more = self._score(lists, scores)
+                scores = {pid: s + more[pid] for pid, s in scores.items() if pid in more}
+        hits = heapq.nlargest(offset + limit, scores.items(), key=lambda h: (h[1], -h[0]))
+        return len(scores), hits[offset:]
+
+
+def open_index(store, page_size=1000):
+    """
+    Index every product of `store` and keep the index current.
+
+    Args:
+        store: a product_store backend
+        page_size: int, products read per query while loading
+
+    Returns:
+        SearchIndex subscribed to the store's changes, or following the
+        change log of a shared store
+    """
+    index = SearchIndex(store)
+    if store.shared:
+        store.keep_changes(CHANGES_KEPT)
+        with index._lock:
+            index._load(page_size)
+        return index
+    for page in iter_pages(store, size=page_size):
+        for prod in page:
+            index.add(prod)
+    store.subscribe(index.apply)
+    return index
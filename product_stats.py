@@ -0,0 +1,216 @@
+# product_stats.py
+"""
+Catalog aggregates: product counts and price statistics, overall and per
+category.
+
+CatalogStats is kept current by subscribing to the store (see
+product_store), so every create, update and delete adjusts the
+aggregates of the categories involved; the catalog is read in full once,
+when the stats are opened.
+
+- per category, and for the whole catalog: a product count and a price
+  sum, so counts and averages cost O(1)
+- per category, and for the whole catalog: a product_index.RankedIndex of
+  (price, id) keys, so min, max and any percentile cost O(log n)
+- percentiles are nearest-rank: the p-th percentile of n prices is the
+  ceil(p / 100 * n)-th smallest
+- categories are grouped by their text; a category that is not a str
+  (which the stores reject, but a product of an older catalog may hold)
+  counts under str(category), None under "", so the summary always has
+  str keys that sort and serialize
+- price sums are floats, added to and subtracted from as products change;
+  they are reset to 0.0 whenever their count reaches zero, so rounding
+  error cannot outlive the products that caused it
+
+A store shared with other processes (store.shared) does not tell this
+process about their writes, so there the stats do not subscribe. They
+load from one snapshot of the store, remember the sequence number of the
+store's change log (SQLiteStore.changes) at that point, and every read
+first applies the changes recorded since, O(log n) each, as a listener
+call would. Only stats that fell more than CHANGES_KEPT changes behind
+reload, O(n).
+
+Usage:
+    stats = open_stats(store)
+    stats.summary()                          # whole catalog
+    stats.summary('home', percentiles=(50, 90))
+"""
+
+import math
+import threading
+
+from product_index import RankedIndex
+from product_store import CHANGES_KEPT, iter_pages
+
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+def _category(prod):
+    """The str a product's category is grouped under."""
+    category = prod['category']
+    if isinstance(category, str):
+        return category
+    return '' if category is None else str(category)
+
+
+class _Aggregate:
+    """Count, price sum and ranked prices of a set of products."""
+
+    __slots__ = ('count', 'total', 'prices')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.prices = RankedIndex()
+
+    def add(self, pid, price):
+        self.count += 1
+        self.total += price
+        self.prices.insert(price, pid)
+
+    def remove(self, pid, price):
+        self.count -= 1
+        self.total = self.total - price if self.count else 0.0
+        self.prices.remove(price, pid)
+
+    def percentile(self, p):
+        return self.prices.select(max(math.ceil(p / 100 * self.count), 1) - 1)
+
+    def summary(self, percentiles):
+        if not self.count:
+            return {'count': 0, 'price': None}
+        return {
+            'count': self.count,
+            'price': {
+                'min': self.prices.select(0),
+                'max': self.prices.select(self.count - 1),
+                'avg': self.total / self.count,
+                'sum': self.total,
+                'percentiles': {f'{p:g}': self.percentile(p) for p in percentiles},
+            },
+        }
+
+
+class CatalogStats:
+    """Incrementally maintained catalog aggregates; see the module docstring."""
+
+    def __init__(self, store=None):
+        self._all = _Aggregate()
+        self._categories = {}
+        self._store = store
+        # Last change of a shared store applied here; None when not following one.
+        self._seq = None
+        self._lock = threading.Lock()
+
+    def add(self, prod):
+        """Count a product that is not counted yet."""
+        with self._lock:
+            self._add(prod)
+
+    def apply(self, old, new):
+        """Store listener: replace `old` (if any) with `new` (if any)."""
+        if (old is not None and new is not None and old['price'] == new['price']
+                and _category(old) == _category(new)):
+            return
+        with self._lock:
+            self._apply(old, new)
+
+    def _apply(self, old, new):
+        if old is not None:
+            if new is not None and (old['price'] == new['price']
+                                    and _category(old) == _category(new)):
+                return
+            self._remove(old)
+        if new is not None:
+            self._add(new)
+
+    def _add(self, prod):
+        self._all.add(prod['id'], prod['price'])
+        name = _category(prod)
+        category = self._categories.get(name)
+        if category is None:
+            category = self._categories[name] = _Aggregate()
+        category.add(prod['id'], prod['price'])
+
+    def _remove(self, prod):
+        self._all.remove(prod['id'], prod['price'])
+        name = _category(prod)
+        category = self._categories[name]
+        category.remove(prod['id'], prod['price'])
+        if not category.count:
+            del self._categories[name]
+
+    def _load(self, page_size=1000):
+        """Aggregate every product of the shared store, as of one snapshot of it."""
+        store = self._store
+        with store.snapshot():
+            seq = store.change_bounds()[1]
+            self._all = _Aggregate()
+            self._categories = {}
+            for page in iter_pages(store, size=page_size):
+                for prod in page:
+                    self._add(prod)
+        self._seq = seq
+
+    def _check_store(self):
+        if self._seq is None:
+            return
+        changes = self._store.changes(self._seq)
+        if changes and changes[0]['seq'] != self._seq + 1:
+            # The log no longer reaches back to these stats.
+            self._load()
+            return
+        for change in changes:
+            self._apply(change['old'], change['product'])
+        if changes:
+            self._seq = changes[-1]['seq']
+
+    def summary(self, category=None, percentiles=DEFAULT_PERCENTILES):
+        """
+        Aggregates of the whole catalog, or of one category.
+
+        Args:
+            category: str, or None for the whole catalog
+            percentiles: iterable of numbers in [0, 100]
+
+        Returns:
+            dict: count, and price (None when there are no products) with
+            min, max, avg, sum and the requested percentiles; for the
+            whole catalog also categories, the count and average price of
+            each category
+        """
+        with self._lock:
+            self._check_store()
+            if category is not None:
+                return self._categories.get(category, _Aggregate()).summary(percentiles)
+            out = self._all.summary(percentiles)
+            out['categories'] = {
+                name: {'count': agg.count, 'avg_price': agg.total / agg.count}
+                for name, agg in sorted(self._categories.items())
+            }
+            return out
+
+
+def open_stats(store, page_size=1000):
+    """
+    Aggregate every product of `store` and keep the aggregates current.
+
+    Args:
+        store: a product_store backend
+        page_size: int, products read per query while loading
+
+    Returns:
+        CatalogStats subscribed to the store's changes, or following the
+        change log of a shared store
+    """
+    stats = CatalogStats(store)
+    if store.shared:
+        store.keep_changes(CHANGES_KEPT)
+        with stats._lock:
+            stats._load(page_size)
+        return stats
+    for page in iter_pages(store, size=page_size):
+        for prod in page:
+            stats.add(prod)
+    store.subscribe(stats.apply)
+    return stats
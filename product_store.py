@@ -0,0 +1,918 @@
+# product_store.py
+"""
+Storage backends for the product catalog API (product_api.py).
+
+Products are dicts with the keys of product_api.product_repr: id, name,
+description, price and category. Every backend implements:
+
+    list()                  all products, in id order
+    page(after, limit)      up to `limit` products with id > after, in id
+                            order (keyset pagination; see iter_pages)
+    query(category, min_price, max_price, sort, after, limit)
+                            up to `limit` (None: all) products in the
+                            category and/or price range, in `sort` order
+                            ('id', 'price' or '-price'), after the sort
+                            key `after` (see sort_key)
+    get(pid)                one product, or None
+    create(fields)          insert with the next id; returns the product.
+                            ValueError (before anything is written) when
+                            name, description or category is not a str or
+                            price not a number; update() checks the same
+    create_many(rows)       insert a sequence of field dicts in one batch
+    update(pid, changes)    apply a dict of changed fields; returns the
+                            product, or None when it does not exist
+    delete(pid)             False when the product did not exist
+    count()                 number of products
+    batch()                 context manager grouping writes into one commit
+    transactional           True when batch() rolls its writes back if the
+                            block raises; False when they stay applied
+    subscribe(listener)     call listener(old, new) after every committed
+                            change: old is None on create, new is None on
+                            delete, and old is a copy taken before an update.
+                            A listener that raises is logged and skipped;
+                            the write and the other listeners go ahead
+    version()               catalog version: a number that changes with
+                            every committed change, from any process
+    shared                  True when other processes can change the
+                            catalog (their changes reach no listener here)
+    close()
+
+Returned dicts belong to the store and must not be modified by callers.
+Listeners keep derived in-process structures (such as the search index of
+product_search) current without rescanning; they only hear about writes
+made through this store object, not those of other processes sharing an
+SQLite file.
+
+MemoryStore is the original module-level dict, sharded behind lock
+stripes so that threaded servers can share it: the fastest backend, but
+private to one process and lost on restart. Filtered queries go through
+the incrementally maintained indexes of product_index.CatalogIndex. SQLiteStore keeps the catalog
+in an SQLite database in WAL mode, so it survives restarts and is shared
+by every gunicorn worker:
+
+- each thread gets its own connection on first use (sqlite3 connections
+  must not cross threads); the store keeps the pool so close() can close
+  them all
+- every statement is a fixed SQL string, so each connection prepares it
+  once and then reuses it from its statement cache
+- category, price and (category, price) indexes serve the filtered
+  queries; keyset continuation uses (price, id) row values
+- WAL with synchronous=NORMAL makes a commit an append to the log without
+  an fsync; readers never wait for writers
+- a write outside batch() commits immediately; inside batch() (and in
+  create_many) writes share one IMMEDIATE transaction that commits when
+  the block exits, or rolls back if it raises
+- triggers count every insert, update and delete in a one-row
+  catalog_version table, read by version()
+- once keep_changes(n) is set, triggers also record every change, with
+  the product after it and the old values of the fields it changed, in
+  catalog_changes under the next sequence number, keeping the last n;
+  every process writing the file shares the one sequence. changes()
+  reads it back as (old, new) pairs, so the feed of product_changes and
+  the in-process structures of product_search and product_stats follow
+  other processes' writes incrementally, loading under snapshot() and
+  catching up from the sequence number they loaded at
+
+CompactStore holds the same in-process catalog as columns (typed arrays,
+an interned category table and a text arena) instead of a dict per
+product, trading some speed per read for a fraction of the memory; see
+its docstring.
+
+Stores are selected with open_store(), from the PRODUCT_STORE setting of
+product_api: "memory", "compact" or "sqlite:PATH".
+
+Usage:
+    store = open_store('sqlite:catalog.db')
+    prod = store.create({'name': 'Lamp', 'description': '', 'price': 19.5,
+                         'category': 'home'})
+    store.update(prod['id'], {'price': 17.0})
+"""
+
+import logging
+import sqlite3
+import threading
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager
+from itertools import islice
+
+from product_index import SORTS, CatalogIndex
+
+logger = logging.getLogger('product_store')
+
+FIELDS = ('id', 'name', 'description', 'price', 'category')
+# Defaults for the optional fields of a new product.
+DEFAULTS = {'description': '', 'price': 0.0, 'category': ''}
+
+# Lock stripes of MemoryStore.
+SHARDS = 16
+# Category index of a deleted CompactStore row.
+DELETED = 0xFFFFFFFF
+
+# Changes a shared store keeps recorded for the in-process structures that
+# follow it (product_search, product_stats); one that falls further behind
+# reloads in full.
+CHANGES_KEPT = 65536
+# Seconds a connection waits for another process's write lock.
+SQLITE_TIMEOUT = 30.0
+# Prepared statements kept per connection (enough for every query shape).
+STATEMENT_CACHE = 128
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    price REAL NOT NULL DEFAULT 0.0,
+    category TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS products_category ON products (category);
+CREATE INDEX IF NOT EXISTS products_price ON products (price);
+CREATE INDEX IF NOT EXISTS products_category_price ON products (category, price);
+CREATE TABLE IF NOT EXISTS catalog_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    n INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO catalog_version (id, n) VALUES (1, 0);
+CREATE TRIGGER IF NOT EXISTS products_insert_version AFTER INSERT ON products
+BEGIN UPDATE catalog_version SET n = n + 1; END;
+CREATE TRIGGER IF NOT EXISTS products_update_version AFTER UPDATE ON products
+BEGIN UPDATE catalog_version SET n = n + 1; END;
+CREATE TRIGGER IF NOT EXISTS products_delete_version AFTER DELETE ON products
+BEGIN UPDATE catalog_version SET n = n + 1; END;
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    key TEXT PRIMARY KEY,
+    value NOT NULL
+);
+INSERT OR IGNORE INTO catalog_meta (key, value) VALUES ('log_id', lower(hex(randomblob(8))));
+INSERT OR IGNORE INTO catalog_meta (key, value) VALUES ('changes_kept', 0);
+CREATE TABLE IF NOT EXISTS catalog_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    name TEXT,
+    description TEXT,
+    price REAL,
+    category TEXT,
+    old_name TEXT,
+    old_description TEXT,
+    old_price REAL,
+    old_category TEXT
+);
+CREATE TRIGGER IF NOT EXISTS products_insert_change AFTER INSERT ON products
+WHEN (SELECT value FROM catalog_meta WHERE key = 'changes_kept') > 0
+BEGIN
+    INSERT INTO catalog_changes (op, id, name, description, price, category)
+    VALUES ('create', NEW.id, NEW.name, NEW.description, NEW.price, NEW.category);
+    DELETE FROM catalog_changes WHERE seq <= (SELECT max(seq) FROM catalog_changes)
+        - (SELECT value FROM catalog_meta WHERE key = 'changes_kept');
+END;
+CREATE TRIGGER IF NOT EXISTS products_update_change AFTER UPDATE ON products
+WHEN (SELECT value FROM catalog_meta WHERE key = 'changes_kept') > 0
+BEGIN
+    INSERT INTO catalog_changes (op, id, name, description, price, category,
+                                 old_name, old_description, old_price, old_category)
+    VALUES ('update', NEW.id, NEW.name, NEW.description, NEW.price, NEW.category,
+            CASE WHEN OLD.name IS NOT NEW.name THEN OLD.name END,
+            CASE WHEN OLD.description IS NOT NEW.description THEN OLD.description END,
+            CASE WHEN OLD.price IS NOT NEW.price THEN OLD.price END,
+            CASE WHEN OLD.category IS NOT NEW.category THEN OLD.category END);
+    DELETE FROM catalog_changes WHERE seq <= (SELECT max(seq) FROM catalog_changes)
+        - (SELECT value FROM catalog_meta WHERE key = 'changes_kept');
+END;
+CREATE TRIGGER IF NOT EXISTS products_delete_change AFTER DELETE ON products
+WHEN (SELECT value FROM catalog_meta WHERE key = 'changes_kept') > 0
+BEGIN
+    INSERT INTO catalog_changes (op, id, old_name, old_description, old_price, old_category)
+    VALUES ('delete', OLD.id, OLD.name, OLD.description, OLD.price, OLD.category);
+    DELETE FROM catalog_changes WHERE seq <= (SELECT max(seq) FROM catalog_changes)
+        - (SELECT value FROM catalog_meta WHERE key = 'changes_kept');
+END;
+"""
+
+_COLUMNS = ', '.join(FIELDS)
+SQL_SELECT_ALL = f"SELECT {_COLUMNS} FROM products ORDER BY id"
+SQL_SELECT_ONE = f"SELECT {_COLUMNS} FROM products WHERE id = ?"
+SQL_PAGE = f"SELECT {_COLUMNS} FROM products WHERE id > ? ORDER BY id LIMIT ?"
+SQL_INSERT = "INSERT INTO products (name, description, price, category) VALUES (?, ?, ?, ?)"
+# NULL leaves a column unchanged; no column is nullable.
+SQL_UPDATE = """
+UPDATE products SET
+    name = coalesce(?, name),
+    description = coalesce(?, description),
+    price = coalesce(?, price),
+    category = coalesce(?, category)
+WHERE id = ?
+"""
+SQL_DELETE = "DELETE FROM products WHERE id = ?"
+SQL_COUNT = "SELECT count(*) FROM products"
+SQL_VERSION = "SELECT n FROM catalog_version"
+SQL_CHANGES = f"""
+SELECT seq, op, {_COLUMNS}, old_name, old_description, old_price, old_category
+FROM catalog_changes WHERE seq > ? ORDER BY seq LIMIT ?
+"""
+SQL_CHANGE_BOUNDS = "SELECT coalesce(min(seq), 1), coalesce(max(seq), 0) FROM catalog_changes"
+SQL_META = "SELECT value FROM catalog_meta WHERE key = ?"
+SQL_KEEP_CHANGES = "UPDATE catalog_meta SET value = max(value, ?) WHERE key = 'changes_kept'"
+# ORDER BY and the keyset condition continuing after the last row, per sort.
+SQL_ORDER = {
+    'id': ('id', 'id > ?'),
+    'price': ('price, id', '(price, id) > (?, ?)'),
+    '-price': ('price DESC, id DESC', '(price, id) < (?, ?)'),
+}
+
+
+def sort_key(prod, sort='id'):
+    """The keyset pagination key of `prod` in `sort` order."""
+    if sort == 'id':
+        return prod['id']
+    return (prod['price'], prod['id'])
+
+
+def _check_sort(sort):
+    if sort not in SORTS:
+        raise ValueError(f"Unknown sort '{sort}'. Choose from: {', '.join(SORTS)}.")
+
+
+def _check_product(prod):
+    """
+    Raise ValueError unless the fields of a product, or of a dict of
+    changes (only the fields it has), have the types the stores keep.
+    """
+    for name in ('name', 'description', 'category'):
+        if name in prod and not isinstance(prod[name], str):
+            raise ValueError(f"{name} must be a string.")
+    if 'price' in prod and type(prod['price']) not in (int, float):
+        raise ValueError("price must be a number.")
+
+
+def _new_product(pid, fields):
+    return {
+        'id': pid,
+        'name': fields['name'],
+        'description': fields.get('description', DEFAULTS['description']),
+        'price': fields.get('price', DEFAULTS['price']),
+        'category': fields.get('category', DEFAULTS['category']),
+    }
+
+
+def _encode_text(prod):
+    """The UTF-8 name and description of a product, as CompactStore keeps them."""
+    return prod['name'].encode(), prod['description'].encode()
+
+
+def _call_listeners(listeners, old, new):
+    """
+    Tell every listener about a committed change.
+
+    The change is in the store by now, so a listener that raises is logged
+    and the rest are still called; the writer's request succeeds.
+    """
+    for listener in listeners:
+        try:
+            listener(old, new)
+        except Exception:
+            logger.exception("Store listener %r failed", listener)
+
+
+class MemoryStore:
+    """
+    Products in dicts keyed by id, safe to share between threads; ids are
+    never reused.
+
+    - products are spread over SHARDS dicts by id, each written under its
+      own lock, so writes to different products do not wait for each other
+      and two writes to one product apply one after the other
+    - records are copy-on-write: update() builds a new dict and swaps it
+      in, so a reader gets either the old or the new product, never a
+      half-updated one, and get() takes no lock at all
+    - ids come from one counter, read under a lock held only for the
+      increment, so they are sequential (1, 2, 3...) whichever threads
+      create the products
+    - the id array and the CatalogIndex are shared by all shards; writers
+      update them, and listings read them, under one index lock held only
+      for the O(log n + k) of a page
+
+    Pages are found by bisecting a sorted array of every id handed out.
+    Deleted ids stay in it, skipped when read, until they are more than
+    half of it; then it is rebuilt without them (amortized O(1) per
+    delete).
+
+    Listeners are called under the product's shard lock, so they see the
+    changes to one product in the order they were made.
+    """
+
+    shared = False
+    transactional = False
+
+    def __init__(self):
+        self._shards = [{} for _ in range(SHARDS)]
+        self._locks = [threading.Lock() for _ in range(SHARDS)]
+        # Guards _next_id and _version.
+        self._counter_lock = threading.Lock()
+        self._next_id = 1
+        self._version = 0
+        self._ids = array('q')
+        self._deleted = 0
+        self._index = CatalogIndex()
+        self._index_lock = threading.Lock()
+        self._listeners = []
+
+    def _new_id(self):
+        with self._counter_lock:
+            pid = self._next_id
+            self._next_id += 1
+        return pid
+
+    def _get(self, pid):
+        return self._shards[pid % SHARDS].get(pid)
+
+    def list(self):
+        return self.page(0, None)
+
+    def page(self, after=0, limit=100):
+        get = self._get
+        out = []
+        with self._index_lock:
+            ids = self._ids
+            if limit is None:
+                limit = len(ids)
+            i = bisect_right(ids, after)
+            while len(out) < limit and i < len(ids):
+                prod = get(ids[i])
+                if prod is not None:
+                    out.append(prod)
+                i += 1
+        return out
+
+    def query(self, category=None, min_price=None, max_price=None, sort='id', after=None,
+              limit=100):
+        _check_sort(sort)
+        if category is None and min_price is None and max_price is None and sort == 'id':
+            return self.page(after or 0, limit)
+        get = self._get
+        with self._index_lock:
+            ids = self._index.query(category, min_price, max_price, sort, after)
+            return [get(pid) for pid in islice(ids, limit)]
+
+    def get(self, pid):
+        return self._get(pid)
+
+    def create(self, fields):
+        prod = _new_product(None, fields)
+        _check_product(prod)
+        pid = prod['id'] = self._new_id()
+        with self._locks[pid % SHARDS]:
+            # Indexed before it is published: a product is never listed
+            # without also being in the filtered listings.
+            with self._index_lock:
+                self._index.add(pid, prod['category'], prod['price'])
+                ids = self._ids
+                if not ids or ids[-1] < pid:
+                    ids.append(pid)
+                else:
+                    ids.insert(bisect_right(ids, pid), pid)
+                self._shards[pid % SHARDS][pid] = prod
+            self._notify(None, prod)
+        return prod
+
+    def create_many(self, rows):
+        return [self.create(fields) for fields in rows]
+
+    def update(self, pid, changes):
+        shard = self._shards[pid % SHARDS]
+        with self._locks[pid % SHARDS]:
+            old = shard.get(pid)
+            if old is None:
+                return None
+            prod = dict(old)
+            for name in ('name', 'description', 'price', 'category'):
+                if name in changes:
+                    prod[name] = changes[name]
+            _check_product(prod)
+            if prod['category'] != old['category'] or prod['price'] != old['price']:
+                with self._index_lock:
+                    self._index.move(pid, old['category'], old['price'],
+                                     prod['category'], prod['price'])
+                    shard[pid] = prod
+            else:
+                shard[pid] = prod
+            self._notify(old, prod)
+        return prod
+
+    def delete(self, pid):
+        with self._locks[pid % SHARDS]:
+            prod = self._shards[pid % SHARDS].pop(pid, None)
+            if prod is None:
+                return False
+            with self._index_lock:
+                self._index.remove(pid, prod['category'], prod['price'])
+                self._deleted += 1
+                if self._deleted > len(self._ids) // 2:
+                    get = self._get
+                    self._ids = array('q', [i for i in self._ids if get(i) is not None])
+                    self._deleted = 0
+            self._notify(prod, None)
+        return True
+
+    def count(self):
+        return sum(len(shard) for shard in self._shards)
+
+    @contextmanager
+    def batch(self):
+        # Nothing to group: writes apply immediately and are not rolled back.
+        yield self
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def version(self):
+        return self._version
+
+    def _notify(self, old, new):
+        with self._counter_lock:
+            self._version += 1
+        _call_listeners(self._listeners, old, new)
+
+    def close(self):
+        pass
+
+
+class CompactStore:
+    """
+    Products as columns instead of dicts, for catalogs of millions.
+
+    Product `pid` is row pid - 1 of every column:
+
+    - price: array('d')
+    - category: array('I') of indexes into a table of interned category
+      strings; DELETED marks a deleted row
+    - name and description: their UTF-8 bytes, back to back, in one
+      bytearray arena, located by an array('Q') offset and two array('I')
+      lengths
+
+    which is 28 bytes per product plus its text, against several hundred
+    for a dict of five keys. Reads build the product dict on demand; it
+    is the caller's, but still must not be modified, as with the other
+    stores. An update appends the new text to the arena, and the arena is
+    rewritten without the text of old versions and deleted products once
+    that is more than half of it (amortized O(1) per change).
+
+    Filtered queries use a CatalogIndex, as MemoryStore does. One lock
+    guards the columns: writers hold it for the change, readers for the
+    few array reads of one row or page, so a reader never sees half of an
+    update.
+    """
+
+    shared = False
+    transactional = False
+
+    def __init__(self):
+        self._price = array('d')
+        self._category = array('I')
+        self._offset = array('Q')
+        self._name_len = array('I')
+        self._desc_len = array('I')
+        self._arena = bytearray()
+        self._garbage = 0
+        self._categories = []
+        self._category_ids = {}
+        self._count = 0
+        self._version = 0
+        self._index = CatalogIndex()
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def _intern(self, category):
+        cid = self._category_ids.get(category)
+        if cid is None:
+            cid = self._category_ids[category] = len(self._categories)
+            self._categories.append(category)
+        return cid
+
+    def _row(self, pid):
+        """The product in row pid - 1, or None; the caller holds the lock."""
+        row = pid - 1
+        if not 0 <= row < len(self._category):
+            return None
+        cid = self._category[row]
+        if cid == DELETED:
+            return None
+        start = self._offset[row]
+        middle = start + self._name_len[row]
+        end = middle + self._desc_len[row]
+        arena = self._arena
+        return {
+            'id': pid,
+            'name': arena[start:middle].decode(),
+            'description': arena[middle:end].decode(),
+            'price': self._price[row],
+            'category': self._categories[cid],
+        }
+
+    def _append_text(self, name, description):
+        """Append a row's encoded text to the arena; returns its offset."""
+        offset = len(self._arena)
+        self._arena += name
+        self._arena += description
+        return offset
+
+    def _compact(self):
+        """Rewrite the arena with only the text of live rows."""
+        old = self._arena
+        arena = bytearray()
+        offsets = self._offset
+        for row, cid in enumerate(self._category):
+            if cid == DELETED:
+                continue
+            start = offsets[row]
+            offsets[row] = len(arena)
+            arena += old[start:start + self._name_len[row] + self._desc_len[row]]
+        self._arena = arena
+        self._garbage = 0
+
+    def _discard_text(self, row):
+        self._garbage += self._name_len[row] + self._desc_len[row]
+        if 2 * self._garbage > len(self._arena):
+            self._compact()
+
+    def list(self):
+        return self.page(0, None)
+
+    def page(self, after=0, limit=100):
+        out = []
+        with self._lock:
+            pid = after + 1
+            end = len(self._category)
+            while (limit is None or len(out) < limit) and pid <= end:
+                prod = self._row(pid)
+                if prod is not None:
+                    out.append(prod)
+                pid += 1
+        return out
+
+    def query(self, category=None, min_price=None, max_price=None, sort='id', after=None,
+              limit=100):
+        _check_sort(sort)
+        if category is None and min_price is None and max_price is None and sort == 'id':
+            return self.page(after or 0, limit)
+        with self._lock:
+            ids = self._index.query(category, min_price, max_price, sort, after)
+            return [self._row(pid) for pid in islice(ids, limit)]
+
+    def get(self, pid):
+        with self._lock:
+            return self._row(pid)
+
+    def create(self, fields):
+        prod = _new_product(None, fields)
+        _check_product(prod)
+        # Everything that can fail comes first, so a row is either written
+        # to every column or to none.
+        name, description = _encode_text(prod)
+        prod['price'] = float(prod['price'])
+        with self._lock:
+            cid = self._intern(prod['category'])
+            offset = self._append_text(name, description)
+            self._price.append(prod['price'])
+            self._category.append(cid)
+            self._offset.append(offset)
+            self._name_len.append(len(name))
+            self._desc_len.append(len(description))
+            prod['id'] = len(self._category)
+            self._count += 1
+            self._index.add(prod['id'], prod['category'], prod['price'])
+            self._notify(None, prod)
+        return prod
+
+    def create_many(self, rows):
+        return [self.create(fields) for fields in rows]
+
+    def update(self, pid, changes):
+        with self._lock:
+            old = self._row(pid)
+            if old is None:
+                return None
+            prod = dict(old)
+            for name in ('name', 'description', 'price', 'category'):
+                if name in changes:
+                    prod[name] = changes[name]
+            _check_product(prod)
+            text_changed = (prod['name'] != old['name']
+                            or prod['description'] != old['description'])
+            if text_changed:
+                name, description = _encode_text(prod)
+            prod['price'] = float(prod['price'])
+            cid = self._intern(prod['category'])
+            row = pid - 1
+            if text_changed:
+                self._discard_text(row)
+                self._offset[row] = self._append_text(name, description)
+                self._name_len[row], self._desc_len[row] = len(name), len(description)
+            self._price[row] = prod['price']
+            self._category[row] = cid
+            if prod['category'] != old['category'] or prod['price'] != old['price']:
+                self._index.move(pid, old['category'], old['price'],
+                                 prod['category'], prod['price'])
+            self._notify(old, prod)
+        return prod
+
+    def delete(self, pid):
+        with self._lock:
+            prod = self._row(pid)
+            if prod is None:
+                return False
+            row = pid - 1
+            self._category[row] = DELETED
+            self._count -= 1
+            self._discard_text(row)
+            self._index.remove(pid, prod['category'], prod['price'])
+            self._notify(prod, None)
+        return True
+
+    def count(self):
+        return self._count
+
+    @contextmanager
+    def batch(self):
+        # Nothing to group: writes apply immediately and are not rolled back.
+        yield self
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def version(self):
+        return self._version
+
+    def _notify(self, old, new):
+        self._version += 1
+        _call_listeners(self._listeners, old, new)
+
+    def close(self):
+        pass
+
+
+def _product(row):
+    return dict(zip(FIELDS, row)) if row is not None else None
+
+
+class SQLiteStore:
+    """Products in an SQLite database in WAL mode; see the module docstring."""
+
+    shared = True
+    transactional = True
+
+    def __init__(self, path, timeout=SQLITE_TIMEOUT):
+        if path in ('', ':memory:') or path.startswith('file::memory:'):
+            raise ValueError(
+                "An in-memory SQLite database is private to one connection; "
+                "use the memory store instead."
+            )
+        self.path = path
+        self._timeout = timeout
+        self._local = threading.local()
+        self._pool = []
+        self._pool_lock = threading.Lock()
+        self._listeners = []
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # check_same_thread is off only so that close() can close the
+            # pool from whichever thread calls it.
+            conn = sqlite3.connect(self.path, timeout=self._timeout, isolation_level=None,
+                                   check_same_thread=False, cached_statements=STATEMENT_CACHE)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.depth = 0
+            self._local.pending = []
+            with self._pool_lock:
+                self._pool.append(conn)
+        return conn
+
+    @contextmanager
+    def batch(self):
+        conn = self._connection()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield self
+            finally:
+                self._local.depth -= 1
+            return
+        conn.execute('BEGIN IMMEDIATE')
+        self._local.depth = 1
+        try:
+            yield self
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+        finally:
+            self._local.depth = 0
+            changes, self._local.pending = self._local.pending, []
+        # Listeners only hear about changes once they are committed.
+        for old, new in changes:
+            self._deliver(old, new)
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _notify(self, old, new):
+        if not self._listeners:
+            return
+        if self._local.depth:
+            self._local.pending.append((old, new))
+        else:
+            self._deliver(old, new)
+
+    def _deliver(self, old, new):
+        _call_listeners(self._listeners, old, new)
+
+    def list(self):
+        return [dict(zip(FIELDS, row)) for row in self._connection().execute(SQL_SELECT_ALL)]
+
+    def page(self, after=0, limit=100):
+        return [dict(zip(FIELDS, row))
+                for row in self._connection().execute(SQL_PAGE, (after, limit))]
+
+    def query(self, category=None, min_price=None, max_price=None, sort='id', after=None,
+              limit=100):
+        _check_sort(sort)
+        order, keyset = SQL_ORDER[sort]
+        where, params = [], []
+        if category is not None:
+            where.append('category = ?')
+            params.append(category)
+        if min_price is not None:
+            where.append('price >= ?')
+            params.append(min_price)
+        if max_price is not None:
+            where.append('price <= ?')
+            params.append(max_price)
+        if after is not None:
+            where.append(keyset)
+            params.extend(after if sort != 'id' else (after,))
+        sql = f"SELECT {_COLUMNS} FROM products"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [dict(zip(FIELDS, row)) for row in self._connection().execute(sql, params)]
+
+    def get(self, pid):
+        return _product(self._connection().execute(SQL_SELECT_ONE, (pid,)).fetchone())
+
+    def create(self, fields):
+        prod = _new_product(None, fields)
+        _check_product(prod)
+        cur = self._connection().execute(
+            SQL_INSERT, (prod['name'], prod['description'], prod['price'], prod['category']))
+        prod['id'] = cur.lastrowid
+        self._notify(None, prod)
+        return prod
+
+    def create_many(self, rows):
+        with self.batch():
+            return [self.create(fields) for fields in rows]
+
+    def update(self, pid, changes):
+        # NULL means "unchanged" to SQL_UPDATE, so None must not get that far.
+        _check_product(changes)
+        with self.batch():
+            conn = self._connection()
+            old = self.get(pid) if self._listeners else None
+            cur = conn.execute(SQL_UPDATE, (
+                changes.get('name'), changes.get('description'),
+                changes.get('price'), changes.get('category'), pid))
+            if cur.rowcount == 0:
+                return None
+            prod = _product(conn.execute(SQL_SELECT_ONE, (pid,)).fetchone())
+            self._notify(old, prod)
+            return prod
+
+    def delete(self, pid):
+        if not self._listeners:
+            return self._connection().execute(SQL_DELETE, (pid,)).rowcount > 0
+        with self.batch():
+            old = self.get(pid)
+            if old is None:
+                return False
+            self._connection().execute(SQL_DELETE, (pid,))
+            self._notify(old, None)
+            return True
+
+    def count(self):
+        return self._connection().execute(SQL_COUNT).fetchone()[0]
+
+    def version(self):
+        return self._connection().execute(SQL_VERSION).fetchone()[0]
+
+    def keep_changes(self, n):
+        """
+        Record every change in catalog_changes, keeping at least the last
+        `n`; the largest `n` any caller, in any process, has asked for.
+        """
+        self._connection().execute(SQL_KEEP_CHANGES, (n,))
+
+    @contextmanager
+    def snapshot(self):
+        """Group reads into one transaction, so they all see the same committed catalog."""
+        conn = self._connection()
+        if conn.in_transaction:
+            yield self
+            return
+        conn.execute('BEGIN')
+        try:
+            yield self
+        finally:
+            conn.execute('COMMIT')
+
+    def change_log_id(self):
+        """Random id of this database's change sequence, fixed when it was created."""
+        return self._connection().execute(SQL_META, ('log_id',)).fetchone()[0]
+
+    def change_bounds(self):
+        """(first, last) sequence numbers in catalog_changes; (1, 0) when empty."""
+        return self._connection().execute(SQL_CHANGE_BOUNDS).fetchone()
+
+    def changes(self, after, limit=None):
+        """
+        The recorded changes after sequence number `after`, oldest first, as
+        dicts of seq, op, id, product (the product after the change; None
+        for a delete) and old (the product before it; None for a create).
+        """
+        rows = self._connection().execute(SQL_CHANGES, (after, -1 if limit is None else limit))
+        out = []
+        for seq, op, *row in rows:
+            pid = row[0]
+            prod = None if op == 'delete' else dict(zip(FIELDS, row[:5]))
+            old = None
+            if op != 'create':
+                # An update records only the old values of the fields it changed.
+                old = dict(prod or {'id': pid})
+                for name, value in zip(FIELDS[1:], row[5:]):
+                    if value is not None:
+                        old[name] = value
+            out.append({'seq': seq, 'op': op, 'id': pid, 'product': prod, 'old': old})
+        return out
+
+    def close(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, []
+        for conn in pool:
+            conn.close()
+        self._local = threading.local()
+
+
+def iter_pages(store, after=None, size=1000, limit=None, sort='id', **filters):
+    """
+    Yield the products matching `filters` (see query), in `sort` order after
+    the sort key `after`, as pages of at most `size`, stopping after `limit`
+    products (default: all of them).
+
+    Each page is a separate short query continuing from the last key seen,
+    so memory stays at one page however large the catalog is, and
+    products created or deleted meanwhile never disturb the iteration.
+    """
+    remaining = limit
+    while remaining is None or remaining > 0:
+        n = size if remaining is None else min(size, remaining)
+        page = store.query(sort=sort, after=after, limit=n, **filters)
+        if page:
+            yield page
+        if len(page) < n:
+            return
+        after = sort_key(page[-1], sort)
+        if remaining is not None:
+            remaining -= n
+
+
+def open_store(spec):
+    """
+    Open a store from a PRODUCT_STORE setting.
+
+    Args:
+        spec: str, "memory", "compact" or "sqlite:PATH"
+
+    Returns:
+        MemoryStore, CompactStore or SQLiteStore
+
+    Raises:
+        ValueError: for an unknown backend
+    """
+    backend, _, path = spec.partition(':')
+    if backend == 'memory' and not path:
+        return MemoryStore()
+    if backend == 'compact' and not path:
+        return CompactStore()
+    if backend == 'sqlite' and path:
+        return SQLiteStore(path)
+    raise ValueError(
+        f"Unknown product store '{spec}'. Use 'memory', 'compact' or 'sqlite:PATH'.")
@@ -8,25 +8,60 @@ Features:
 - Guarantee at least one character from each selected type (unless only one type selected)
 - Allow exclusion of certain character types
 - Command-line interface for user configuration
+- Bulk generation (--count N / generate_passwords) from block-buffered entropy
+- Constant-memory streaming output in plain, NDJSON or CSV format
+- Multi-process bulk generation (--workers N) over shared-memory buffers
+- Per-class minimums and repeat limits with exact uniform sampling
+- Batch strength/entropy scoring of passwords read from stdin (--score)
+- Optional breached-password denylist check with regeneration (--denylist)
+- Diceware passphrases from a memory-mapped wordlist index (--passphrase)
+- Opt-in generation metrics (--metrics) and cProfile reports (--profile)
+- Guaranteed-unique bulk output in bounded memory (--unique)
+- Selectable RNG backend (--rng): the OS CSPRNG by default, a buffered
+  CSPRNG, or a seeded non-secure generator for reproducible test fixtures
+- Accepts every generator script's flag spellings (-l, --no-upper, --no-lower);
+  the fast-starting `passgen` command (passgen/cli.py) wraps this CLI
 
 Usage:
     python secure_password_generator.py --length 16 --no-uppercase --no-symbols
+    python secure_password_generator.py --length 20 --count 100000
+    python secure_password_generator.py --count 50000000 --format ndjson -o out.ndjson
+    python secure_password_generator.py --count 50000000 --workers 8 --unordered -o out.txt
+    python secure_password_generator.py --length 10 --min-digits 2 --min-symbols 2 --max-repeat 2
+    python secure_password_generator.py --score --format ndjson < passwords.txt
+    python secure_password_generator.py --passphrase eff.wl --words 6
+    python secure_password_generator.py --count 1000000 -o out.txt --metrics metrics.prom
+    python secure_password_generator.py --count 100000000 --unique --unique-memory 64 -o codes.txt
+    python secure_password_generator.py --count 1000000 --rng seeded --seed 7 --format csv
 
 Author: Senior_Developer (via GPT-4)
 Date: 2024-06
 """
 
-import argparse
-import logging
 import sys
-import secrets
-import string
-import random
 
-def setup_logging():
+from password_policy import CHARACTER_CLASSES, as_policy, compile_policy, coverage_probability
+from password_rng import default_backend
+
+# argparse and logging are imported where they are used, and secrets and
+# random only once the OS backend is first needed (see password_rng):
+# together they are most of this module's import time, and the passgen
+# fast path imports this module for generate_passwords alone.
+
+# Largest single entropy read in bulk mode; smaller requests read only what they need.
+ENTROPY_BLOCK_SIZE = 64 * 1024
+# Upper bound on passwords materialized per internal batch in bulk mode.
+BULK_BATCH_SIZE = 65536
+
+# Set by password_metrics.enable() to receive (candidates drawn, accepted)
+# once per bulk batch; None, and never called, when metrics are disabled.
+_candidate_hook = None
+
+def setup_logging(verbose=False):
     """Initialize logging configuration."""
+    import logging
     logging.basicConfig(
-        level=logging.INFO,
+        level=logging.DEBUG if verbose else logging.INFO,
         format='[%(levelname)s] %(message)s'
     )
 
@@ -37,24 +72,28 @@ def build_charsets(include_uppercase, include_lowercase, include_digits, include
     Returns:
         char_dict: dict with keys for types and respective charset strings.
     """
+    classes = dict(CHARACTER_CLASSES)
     char_dict = {}
     if include_uppercase:
-        char_dict['uppercase'] = string.ascii_uppercase
+        char_dict['uppercase'] = classes['uppercase']
     if include_lowercase:
-        char_dict['lowercase'] = string.ascii_lowercase
+        char_dict['lowercase'] = classes['lowercase']
     if include_digits:
-        char_dict['digits'] = string.digits
+        char_dict['digits'] = classes['digits']
     if include_symbols:
-        char_dict['symbols'] = string.punctuation
+        char_dict['symbols'] = classes['symbols']
     return char_dict
 
-def generate_password(length, charsets):
+def generate_password(length, charsets, denylist=None, rng=None):
     """
     Generate a password with guaranteed coverage of each selected charset.
 
     Args:
         length: int, desired password length
-        charsets: dict, charsets for each type
+        charsets: dict, charsets for each type, or a compiled PasswordPolicy
+        denylist: optional Denylist (see password_denylist); passwords found
+            in it are discarded and regenerated
+        rng: RandomBackend (see password_rng); default the OS CSPRNG
 
     Returns:
         str: generated password
@@ -62,7 +101,8 @@ def generate_password(length, charsets):
     Raises:
         ValueError: if character sets are invalid or too many sets for desired length
     """
-    types = list(charsets.keys())
+    policy = as_policy(charsets)
+    types = policy.classes
     if not types:
         raise ValueError("Character set is empty. Cannot generate password.")
     if length < len(types):
@@ -71,45 +111,461 @@ def generate_password(length, charsets):
             f"of selected character types ({len(types)})."
         )
 
+    if rng is None:
+        rng = default_backend()
+    if denylist is not None:
+        from password_denylist import draw_allowed
+        return draw_allowed(lambda: _one_per_type(policy, length, rng), denylist)
+    return _one_per_type(policy, length, rng)
+
+def _one_per_type(policy, length, rng):
+    """Draw one password: one character per type, the rest from all, shuffled."""
+    choice = rng.choice
+    types = policy.classes
     # Pick at least one from each enabled type
     password_chars = [
-        secrets.choice(charsets[type_name]) for type_name in types
+        choice(chars) for chars in types
     ]
-    all_chars = ''.join(charsets.values())
+    all_chars = policy.chars
 
     # Fill the rest with random choices
     for _ in range(length - len(types)):
-        password_chars.append(secrets.choice(all_chars))
+        password_chars.append(choice(all_chars))
 
-    # Shuffle to avoid predictable ordering
-    random.shuffle(password_chars)
+    # Shuffle to avoid predictable ordering (with the backend's generator:
+    # random.shuffle would draw the positions from Mersenne Twister)
+    rng.shuffle(password_chars)
 
     return ''.join(password_chars)
 
-def parse_args():
-    """Parse command line arguments."""
+def _random_chars(policy, count, rng):
+    """
+    Draw `count` uniform characters from the policy alphabet as ASCII bytes.
+
+    Entropy is read in ENTROPY_BLOCK_SIZE blocks; bytes at or above the
+    policy's rejection limit are dropped so that the mapping of each
+    remaining byte onto the alphabet is unbiased.
+    """
+    chunks = []
+    have = 0
+    while have < count:
+        want = (count - have) * 256 // policy.limit + 16
+        block = rng.random_bytes(min(ENTROPY_BLOCK_SIZE, want))
+        chunk = block.translate(policy.byte_table, policy.reject)
+        chunks.append(chunk)
+        have += len(chunk)
+    return b''.join(chunks)[:count]
+
+def _bulk_batch_python(n, length, policy, rng):
+    """Pure-Python batch generator built on C-level bytes.translate."""
+    check = len(policy) > 1
+    p = coverage_probability(policy, length)
+
+    accepted = []
+    drawn = 0
+    while len(accepted) < n:
+        rows = min(BULK_BATCH_SIZE, int((n - len(accepted)) / p * 1.05) + 1)
+        drawn += rows
+        raw = _random_chars(policy, rows * length, rng)
+        for start in range(0, len(raw), length):
+            candidate = raw[start:start + length]
+            if check and any(
+                len(candidate.translate(None, cls)) == length for cls in policy.class_bytes
+            ):
+                continue
+            accepted.append(candidate)
+            if len(accepted) == n:
+                break
+    if _candidate_hook is not None:
+        _candidate_hook(drawn, n)
+    return b''.join(accepted)
+
+def _bulk_batch_numpy(np, n, length, policy, rng):
+    """NumPy batch generator: rejection and class checks run vectorized."""
+    alphabet = np.frombuffer(policy.alphabet, dtype=np.uint8)
+    class_mask = np.frombuffer(policy.class_mask, dtype=np.uint8)
+    size = len(alphabet)
+    limit = policy.limit
+    p = coverage_probability(policy, length)
+
+    accepted = []
+    remaining = n
+    drawn = 0
+    while remaining:
+        rows = min(BULK_BATCH_SIZE, int(remaining / p * 1.05) + 1)
+        drawn += rows
+        need = rows * length
+        raw = np.frombuffer(rng.random_bytes(need * 256 // limit + 16), dtype=np.uint8)
+        raw = raw[raw < limit]
+        while raw.size < need:
+            want = (need - raw.size) * 256 // limit + 16
+            extra = np.frombuffer(rng.random_bytes(min(ENTROPY_BLOCK_SIZE, want)), dtype=np.uint8)
+            raw = np.concatenate([raw, extra[extra < limit]])
+        idx = (raw[:need] % size).reshape(rows, length)
+        if len(policy) > 1:
+            seen = np.bitwise_or.reduce(class_mask[idx], axis=1)
+            idx = idx[seen == policy.full_mask]
+        idx = idx[:remaining]
+        accepted.append(alphabet[idx])
+        remaining -= len(idx)
+
+    if _candidate_hook is not None:
+        _candidate_hook(drawn, n)
+    return np.concatenate(accepted).tobytes()
+
+def _check_bulk_args(n, length, charsets):
+    policy = as_policy(charsets)
+    if n < 0:
+        raise ValueError(f"Password count must be non-negative, got {n}.")
+    if not policy:
+        raise ValueError("Character set is empty. Cannot generate password.")
+    if length < len(policy):
+        raise ValueError(
+            f"Password length ({length}) is less than number "
+            f"of selected character types ({len(policy)})."
+        )
+    return policy
+
+def generate_password_bytes(n, length, charsets, use_numpy=None, denylist=None, rng=None):
+    """
+    Generate `n` passwords as one ASCII bytes object of n * length bytes.
+
+    Password i occupies bytes [i * length, (i + 1) * length). This is the
+    fixed-width form used to move passwords between processes without
+    building a str per password; generate_passwords slices it into strings.
+    Arguments and guarantees are the same as generate_passwords.
+    """
+    policy = _check_bulk_args(n, length, charsets)
+    if n == 0:
+        return b''
+    if rng is None:
+        rng = default_backend()
+
+    np = None
+    if use_numpy is not False:
+        try:
+            import numpy as np
+        except ImportError:
+            if use_numpy:
+                raise
+    if np is not None:
+        def draw(k):
+            return _bulk_batch_numpy(np, k, length, policy, rng)
+    else:
+        def draw(k):
+            return _bulk_batch_python(k, length, policy, rng)
+
+    flat = draw(n)
+    if denylist is not None:
+        from password_denylist import replace_denied
+        flat = replace_denied(flat, length, denylist, draw)
+    return flat
+
+def split_password_bytes(flat, length):
+    """Slice fixed-width password bytes back into a list of strings."""
+    return [flat[i:i + length].decode('ascii') for i in range(0, len(flat), length)]
+
+def generate_passwords(n, length, charsets, use_numpy=None, denylist=None, rng=None):
+    """
+    Generate `n` passwords in bulk with guaranteed coverage of each charset.
+
+    Entropy is pulled from the RNG backend in large blocks and mapped onto the
+    alphabet with unbiased rejection sampling. Candidates missing a selected
+    type are discarded whole, so every returned password is drawn uniformly
+    from all passwords of `length` that contain each selected type.
+
+    Args:
+        n: int, number of passwords to generate
+        length: int, desired password length
+        charsets: dict, charsets for each type (see build_charsets), or a
+            compiled PasswordPolicy
+        use_numpy: bool or None, force (True) or disable (False) the NumPy
+            path; None uses NumPy when it is installed
+        denylist: optional Denylist; denylisted passwords are replaced
+        rng: RandomBackend (see password_rng); default the OS CSPRNG
+
+    Returns:
+        list: generated passwords
+
+    Raises:
+        ValueError: if character sets are invalid or too many sets for desired length
+    """
+    return split_password_bytes(
+        generate_password_bytes(n, length, charsets, use_numpy=use_numpy, denylist=denylist,
+                                rng=rng),
+        length)
+
+def iter_password_batches(count, length, charsets, batch_size=BULK_BATCH_SIZE, use_numpy=None,
+                          denylist=None, rng=None):
+    """
+    Lazily generate `count` passwords as lists of at most `batch_size`.
+
+    Only one batch is alive at a time, so memory stays constant however
+    large `count` is; the next batch is produced only when the consumer
+    asks for it.
+
+    Args:
+        count: int, total number of passwords
+        length: int, desired password length
+        charsets: dict, charsets for each type
+        batch_size: int, passwords per yielded batch
+        use_numpy: see generate_passwords
+        denylist: see generate_passwords
+        rng: see generate_passwords
+
+    Returns:
+        iterator: lists of generated passwords
+
+    Raises:
+        ValueError: raised eagerly, before any batch is produced
+    """
+    if batch_size < 1:
+        raise ValueError(f"Batch size must be positive, got {batch_size}.")
+    policy = _check_bulk_args(count, length, charsets)
+
+    def batches():
+        remaining = count
+        while remaining > 0:
+            n = min(batch_size, remaining)
+            yield generate_passwords(n, length, policy, use_numpy=use_numpy, denylist=denylist,
+                                     rng=rng)
+            remaining -= n
+
+    return batches()
+
+def build_parser():
+    """Build the command line parser (shared with the passgen entry point)."""
+    import argparse
     parser = argparse.ArgumentParser(
         description='Secure Random Password Generator'
     )
-    parser.add_argument('--length', type=int, default=12,
-                        help='Length of the password to generate (default: 12)')
-    parser.add_argument('--no-uppercase', action='store_true',
+    parser.add_argument('-l', '--length', type=int, default=12,
+                        help='Length of the password to generate (default: %(default)s)')
+    parser.add_argument('--no-uppercase', '--no-upper', action='store_true',
                         help='Exclude uppercase letters')
-    parser.add_argument('--no-lowercase', action='store_true',
+    parser.add_argument('--no-lowercase', '--no-lower', action='store_true',
                         help='Exclude lowercase letters')
     parser.add_argument('--no-digits', action='store_true',
                         help='Exclude numbers')
     parser.add_argument('--no-symbols', action='store_true',
                         help='Exclude symbols')
-    return parser.parse_args()
+    parser.add_argument('--count', type=int, default=1,
+                        help='Number of passwords to generate, one per line (default: 1)')
+    parser.add_argument('--format', choices=('plain', 'ndjson', 'csv'), default=None,
+                        help='Bulk output format (default: plain)')
+    parser.add_argument('-o', '--output', default=None,
+                        help='Write bulk output to this file instead of stdout')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Generate bulk output on this many processes (default: 1)')
+    parser.add_argument('--unordered', action='store_true',
+                        help='With --workers, emit batches as they finish instead of in order')
+    for name in ('uppercase', 'lowercase', 'digits', 'symbols'):
+        parser.add_argument(f'--min-{name}', type=int, default=None, metavar='N',
+                            help=f'Require at least N {name} (default: 1 when included)')
+    parser.add_argument('--max-repeat', type=int, default=None, metavar='N',
+                        help='Allow at most N consecutive repeats of one character')
+    parser.add_argument('--denylist', default=None, metavar='INDEX',
+                        help='Regenerate any password found in this breached-hash index '
+                             '(built with password_denylist.py)')
+    parser.add_argument('--passphrase', default=None, metavar='WORDLIST',
+                        help='Generate diceware passphrases from this compiled wordlist '
+                             '(built with password_passphrase.py compile)')
+    parser.add_argument('--words', type=int, default=6,
+                        help='Words per passphrase with --passphrase (default: 6)')
+    parser.add_argument('--score', action='store_true',
+                        help='Score passwords read from stdin (one per line) instead of generating')
+    parser.add_argument('--unique', action='store_true',
+                        help='Guarantee that no password repeats within the output')
+    parser.add_argument('--unique-memory', type=int, default=256, metavar='MB',
+                        help='Memory budget for --unique before spilling to disk (default: 256)')
+    parser.add_argument('--tmpdir', default=None,
+                        help='Directory for --unique spill files (default: system temp)')
+    parser.add_argument('--rng', choices=('os', 'buffered', 'seeded'), default=None,
+                        help='Random number backend: the OS CSPRNG (default), a buffered CSPRNG '
+                             'seeded once from the OS, or a seeded generator that is NOT secure '
+                             'and only meant for reproducible test fixtures. When given, the '
+                             'backend is recorded in NDJSON/CSV output')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Seed for --rng seeded')
+    parser.add_argument('--metrics', default=None, metavar='FILE',
+                        help='Write generation metrics to FILE on exit '
+                             '(JSON if it ends in .json, else Prometheus text format)')
+    parser.add_argument('--profile', default=None, metavar='FILE',
+                        help='Profile the run with cProfile: write pstats data to FILE '
+                             'and a report to stderr')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='Enable debug logging')
+    return parser
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    return build_parser().parse_args(argv)
+
+def requested_minimums(args):
+    """Per-class minimums given on the command line, as {class name: count}."""
+    return {
+        name: value for name, value in (
+            ('uppercase', args.min_uppercase),
+            ('lowercase', args.min_lowercase),
+            ('digits', args.min_digits),
+            ('symbols', args.min_symbols),
+        ) if value is not None
+    }
 
-def main():
+def rng_backend(args):
+    """
+    The RNG backend selected by --rng and --seed.
+
+    Returns:
+        tuple: (RandomBackend, metadata dict for the output, or None when
+        --rng was not given)
+
+    Raises:
+        ValueError: for a missing or misplaced --seed
+    """
+    import logging
+    import password_rng
+
+    rng = password_rng.get_backend(args.rng or password_rng.DEFAULT_BACKEND, args.seed)
+    if not rng.secure:
+        print(f"WARNING: RNG backend '{rng.name}' is not cryptographically secure; "
+              "use its output for test fixtures only, never for real credentials.",
+              file=sys.stderr)
+    logging.debug("RNG backend: %r", rng)
+    return rng, rng.describe() if args.rng else None
+
+def unique_stream(args, batches, space, fraction, regenerate):
+    """
+    --unique mode: wrap a batch stream so that no password repeats.
+
+    Returns:
+        tuple: (batches, stats dict filled in once the stream is consumed)
+    """
+    from password_unique import check_space, unique_batches
+
+    check_space(args.count, space, fraction)
+    stats = {}
+    batches = unique_batches(batches, regenerate, memory_budget=args.unique_memory << 20,
+                             tmpdir=args.tmpdir, stats=stats)
+    return batches, stats
+
+def score_main(args):
+    """
+    --score mode: stream passwords from stdin and write one strength row per
+    line, checked for conformance against the policy given by the other flags.
+    """
+    import logging
+    from password_output import open_output
+    from password_strength import score_stream
+
+    policy = compile_policy(
+        not args.no_uppercase,
+        not args.no_lowercase,
+        not args.no_digits,
+        not args.no_symbols
+    )
+    out = open_output(args.output)
+    try:
+        scored = score_stream(
+            sys.stdin,
+            out,
+            fmt=args.format or 'plain',
+            charsets=policy if policy else None,
+            minimums=requested_minimums(args) or None
+        )
+        logging.info("%d passwords scored.", scored)
+    except Exception as e:
+        logging.exception("Failed to score passwords.")
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    finally:
+        out.close()
+
+def passphrase_main(args):
+    """--passphrase mode: generate diceware passphrases instead of passwords."""
+    import logging
+    from password_passphrase import (
+        generate_passphrase,
+        generate_passphrases,
+        iter_passphrase_batches,
+        open_wordlist,
+        passphrase_entropy_bits,
+    )
+
+    try:
+        rng, metadata = rng_backend(args)
+        wordlist = open_wordlist(args.passphrase)
+        denylist = None
+        if args.denylist:
+            from password_denylist import open_denylist
+            denylist = open_denylist(args.denylist)
+        logging.info("Passphrase entropy: %.1f bits (%d words from a list of %d).",
+                     passphrase_entropy_bits(wordlist, args.words), args.words, len(wordlist))
+        if args.count == 1 and args.format is None and args.output is None:
+            passphrase = generate_passphrase(wordlist, args.words, denylist=denylist, rng=rng)
+            print(f"Generated passphrase: {passphrase}")
+        else:
+            from password_output import stream_passwords
+            batches = iter_passphrase_batches(args.count, wordlist, args.words, denylist=denylist,
+                                              rng=rng)
+            if args.unique:
+                batches, stats = unique_stream(
+                    args, batches, len(wordlist) ** args.words, 1.0,
+                    lambda k: generate_passphrases(k, wordlist, args.words, denylist=denylist,
+                                                   rng=rng))
+            written = stream_passwords(
+                batches,
+                path=args.output,
+                fmt=args.format or 'plain',
+                metadata=metadata
+            )
+            logging.info("%d passphrases generated successfully.", written)
+            if args.unique:
+                logging.info("%d duplicates regenerated.", stats['duplicates'])
+    except Exception as e:
+        logging.exception("Failed to generate passphrase.")
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+def main(argv=None):
     """
     Main program logic for secure password generator.
     Handles argument parsing, charset selection, error handling, and output.
     """
-    setup_logging()
-    args = parse_args()
+    args = parse_args(argv)
+    setup_logging(args.verbose)
+    run(args)
+
+def run(args):
+    """Generate (or score) passwords as requested by parsed arguments."""
+    if args.metrics is None and args.profile is None:
+        _run(args)
+        return
+
+    import password_metrics
+    registry = None
+    if args.metrics:
+        registry = password_metrics.enable(generator=sys.modules[__name__])
+    try:
+        if args.profile:
+            password_metrics.profile(_run, args, path=args.profile)
+        else:
+            _run(args)
+    finally:
+        if registry is not None:
+            password_metrics.disable()
+            registry.write(args.metrics)
+
+def _run(args):
+    import logging
+
+    if args.score:
+        score_main(args)
+        return
+    if args.passphrase:
+        passphrase_main(args)
+        return
+
     logging.info(f"Password length requested: {args.length}")
 
     if args.length < 4:
@@ -122,22 +578,83 @@ def main():
     include_digits = not args.no_digits
     include_symbols = not args.no_symbols
 
-    charsets = build_charsets(
+    policy = compile_policy(
         include_uppercase,
         include_lowercase,
         include_digits,
         include_symbols
     )
 
-    if not charsets:
+    if not policy:
         logging.error("No character types selected; cannot generate password.")
         print("ERROR: You must select at least one character type.")
         sys.exit(1)
 
+    if args.count < 1:
+        logging.error("Password count must be at least 1.")
+        print("ERROR: Minimum password count is 1.")
+        sys.exit(1)
+
+    minimums = requested_minimums(args)
+    exact = bool(minimums) or args.max_repeat is not None
+
     try:
-        password = generate_password(args.length, charsets)
-        logging.info("Password generated successfully.")
-        print(f"Generated password: {password}")
+        rng, metadata = rng_backend(args)
+        denylist = None
+        if args.denylist:
+            from password_denylist import open_denylist
+            denylist = open_denylist(args.denylist)
+
+        sampler = None
+        if exact:
+            from password_sampler import compile_sampler
+            if args.workers > 1:
+                raise ValueError("--workers cannot be combined with --min-* or --max-repeat.")
+            sampler = compile_sampler(args.length, policy, minimums, args.max_repeat)
+
+        if args.count == 1 and args.format is None and args.output is None:
+            if sampler:
+                password = sampler.sample(denylist, rng)
+            else:
+                password = generate_password(args.length, policy, denylist=denylist, rng=rng)
+            logging.info("Password generated successfully.")
+            print(f"Generated password: {password}")
+        else:
+            from password_output import stream_passwords
+            if sampler:
+                batches = sampler.sample_batches(args.count, denylist=denylist, rng=rng)
+            elif args.workers > 1:
+                from password_parallel import iter_password_batches_parallel
+                batches = iter_password_batches_parallel(
+                    args.count, args.length, policy,
+                    workers=args.workers, ordered=not args.unordered,
+                    denylist=denylist, rng=rng
+                )
+            else:
+                batches = iter_password_batches(args.count, args.length, policy,
+                                                denylist=denylist, rng=rng)
+            if args.unique:
+                if sampler:
+                    space, fraction = sampler.count, 1.0
+                    def regenerate(k):
+                        return [sampler.sample(denylist, rng) for _ in range(k)]
+                else:
+                    space = len(policy.chars) ** args.length
+                    fraction = coverage_probability(policy, args.length)
+                    def regenerate(k):
+                        return generate_passwords(k, args.length, policy, denylist=denylist,
+                                                  rng=rng)
+                batches, stats = unique_stream(args, batches, space, fraction, regenerate)
+            written = stream_passwords(
+                batches,
+                path=args.output,
+                fmt=args.format or 'plain',
+                metadata=metadata
+            )
+            logging.info("%d passwords generated successfully.", written)
+            if args.unique:
+                logging.info("%d duplicates regenerated (%d sorted runs merged).",
+                             stats['duplicates'], stats['runs'])
     except Exception as e:
         logging.exception("Failed to generate password.")
         print(f"ERROR: {e}")